@@ -4,38 +4,241 @@ allowing you to send messages, images, video and documents programmatically usin
 """
 
 
+import dataclasses
 import os
+import re
 import sys
 import time
 import logging
+from datetime import datetime
 from typing import Optional
 from pathlib import Path
 
 from selenium import webdriver
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import (
     UnexpectedAlertPresentException,
+    NoAlertPresentException,
     NoSuchElementException,
     TimeoutException,
+    WebDriverException,
 )
 
+from alright.cache import INVALID, UNKNOWN, VALID, RecipientCache, normalize_number
+from alright.chats import ChatIndex
+from alright.compose import HUMAN, Composer
+from alright.delivery import SENT, DeliveryTracker
+from alright.driver import Driver
+from alright.events import MessageStream
+from alright.history import ChatMessage, iter_history, last_message, write_jsonl
+from alright.instrument import Instrumentation
+from alright.locators import SelectorNotFound, SelectorRegistry
+from alright.media import MediaPreprocessor, media_kind
+from alright.pacing import AIMDPacer
+from alright.session import wait_until_ready
+from alright.summary import ChatSnapshot, ChatSummary
+from alright.waits import AdaptiveWait, WaitEngine, scaled_budgets
+
+CHAT_ROWS_XPATH = '//*[@id="pane-side"]/div[2]/div/div/child::div'
+
+# Shared by the chat list scripts below: turns a rendered chat list row into a plain object
+_CHAT_ROW_JS = """
+const chatRow = (row, i) => {
+    const lines = row.innerText.split('\\n').filter((line) => line.trim() !== '');
+    if (!lines.length) return null;
+    const titled = row.querySelectorAll('span[title]');
+    const sender = titled.length ? titled[0].getAttribute('title') : lines[0];
+    const badge = row.querySelector('span[aria-label*="unread" i]');
+    const badgeText = badge ? badge.textContent.trim() : '';
+    const count = /^\\d+$/.test(badgeText) ? parseInt(badgeText, 10) : 0;
+    let message = titled.length > 1 ? titled[titled.length - 1].getAttribute('title') : '';
+    if (!message && lines.length > 2 && !/^\\d+$/.test(lines[2])) message = lines[2];
+    const keyed = row.querySelector('[data-id]');
+    return {
+        sender: sender,
+        time: lines.length > 1 ? lines[1] : '',
+        message: message,
+        no_of_unread: count,
+        marked_unread: !!badge && !count,
+        group: !!row.querySelector('[data-icon*="default-group"]') || lines.length >= 5,
+        pinned: !!row.querySelector('[data-icon^="pinned"]'),
+        muted: !!row.querySelector('[data-icon^="muted"]'),
+        row_id: keyed ? keyed.getAttribute('data-id') : sender,
+        row_index: rowIndex(row, i),
+    };
+};
+
+const rowIndex = (row, i) => {
+    const host = row.closest('[aria-rowindex]') || row;
+    return parseInt(host.getAttribute('aria-rowindex') || i + 1, 10);
+};
+
+const chatRows = (xpath) => {
+    const snapshot = document.evaluate(
+        xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const rows = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) rows.push(snapshot.snapshotItem(i));
+    return rows;
+};
+"""
+
+# Reads the rendered rows of the chat list in one round trip. The page remembers the
+# fingerprint (FNV-1a of the text and status icons) of every row it handed to the chat
+# index `token`; rows whose fingerprint did not change since come back as
+# {row_id, row_index} only, unparsed. `forget` lists row ids the index no longer holds.
+REFRESH_CHAT_ROWS_JS = _CHAT_ROW_JS + """
+const [rowsXPath, token, forget] = arguments;
+const printed = window.__alrightChatRows || (window.__alrightChatRows = new Map());
+if (!printed.has(token)) printed.set(token, new Map());
+const known = printed.get(token);
+for (const id of forget) known.delete(id);
+const fingerprint = (row) => {
+    const icons = Array.from(row.querySelectorAll('[data-icon]'), (el) => el.getAttribute('data-icon'));
+    const text = row.innerText + '\\u0001' + icons.join(',');
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash ^= text.charCodeAt(i);
+        hash = Math.imul(hash, 0x01000193);
+    }
+    return (hash >>> 0).toString(16);
+};
+const rows = [];
+chatRows(rowsXPath).forEach((row, i) => {
+    const keyed = row.querySelector('[data-id]');
+    const titled = row.querySelector('span[title]');
+    const id = keyed ? keyed.getAttribute('data-id') : titled ? titled.getAttribute('title') : null;
+    const print = fingerprint(row);
+    if (id !== null && known.get(id) === print) {
+        rows.push({row_id: id, row_index: rowIndex(row, i)});
+        return;
+    }
+    const parsed = chatRow(row, i);
+    if (parsed) {
+        known.set(parsed.row_id, print);
+        rows.push(parsed);
+    }
+});
+return rows;
+"""
+
+# Scrolls the chat list and reports where it ended up once the rows were re-rendered
+SCROLL_CHAT_PANE_JS = """
+const done = arguments[arguments.length - 1];
+const pane = document.getElementById('pane-side');
+pane.scrollTop = arguments[0];
+const grid = pane.querySelector('[aria-rowcount]');
+requestAnimationFrame(() => requestAnimationFrame(() => done({
+    scroll_top: pane.scrollTop,
+    scroll_height: pane.scrollHeight,
+    client_height: pane.clientHeight,
+    row_count: grid ? parseInt(grid.getAttribute('aria-rowcount'), 10) || 0 : 0,
+})));
+"""
+
+# Clicks a wa.me link inside the running app, so that WhatsApp's own click handling opens
+# the chat and the page (and its JS boot) is kept instead of reloaded per recipient.
+# Whether the app takes such clicks depends on the WhatsApp Web build and is not verified
+# here (the fake driver simply assumes it). A click nothing in the app took
+# (not defaultPrevented) would navigate the tab away, so that navigation is cancelled and
+# false is returned, and the caller loads the chat URL instead.
+OPEN_CHAT_IN_APP_JS = """
+const url = arguments[0];
+let link = document.getElementById('alright-open-chat');
+if (!link) {
+    link = document.createElement('a');
+    link.id = 'alright-open-chat';
+    link.style.display = 'none';
+    (document.getElementById('app') || document.body).appendChild(link);
+}
+link.href = url;
+let routed = false;
+const settle = (event) => {
+    if (event.target !== link) return;
+    routed = event.defaultPrevented;
+    event.preventDefault();
+};
+window.addEventListener('click', settle);
+try {
+    link.click();
+} finally {
+    window.removeEventListener('click', settle);
+}
+return routed;
+"""
+
+# Result codes of send_message1() and send_message_in_app(), trailing space included
+SENT_CODE = "1 "
+FAILED_CODE = "3 "
+INVALID_CODE = "4 "
+
+# The text of the dialog around an OK button: the "invalid_number_ok" locators match the
+# OK of any app dialog, only its message tells an invalid number from anything else
+DIALOG_TEXT_JS = """
+const ok = arguments[0];
+const dialog = ok.closest('[role="dialog"], [data-animate-modal-popup]')
+    || document.querySelector('[role="dialog"], [data-animate-modal-popup]');
+return (dialog || ok.parentElement || ok).innerText;
+"""
+INVALID_NUMBER_TEXT = re.compile(r"phone number shared via url is invalid|(isn.t|not) on whatsapp", re.I)
+
+# Upload limits of the attachment dialog, in MB (videos keep send_video's margin)
+ATTACHMENT_LIMITS_MB = {"image": 16, "video": 14, "file": 100}
+# Files the media editor accepts in one dialog
+ATTACHMENTS_PER_DIALOG = 30
+
 class WhatsApp(object):
 
     logger: logging.Logger
 
-    def __init__(self, driver: webdriver.Chrome | webdriver.Firefox, timeout:float=60, logger:logging.Logger|None=None):
+    def __init__(self, driver: Driver, timeout:float=60, logger:logging.Logger|None=None, pacer=None, selectors:SelectorRegistry|None=None, recipients:RecipientCache|None=None, instrumentation:Instrumentation|None=None, media:MediaPreprocessor|None=None, chats_as_dicts:bool=True, track_deliveries:bool=False, waits:WaitEngine|None=None, composer:Composer|None=None):
 
         self.driver = driver
-        self.wait = WebDriverWait(driver=self.driver, timeout=timeout) 
+        # paces every send path, see alright.pacing
+        self.pacer = pacer if pacer is not None else AIMDPacer()
+        self.timeout = timeout
+        # per-operation wait budgets polled with exponential backoff, scaled with the
+        # timeout (see alright.waits.scaled_budgets) unless a WaitEngine is given
+        self.waits = waits or WaitEngine(driver, budgets=scaled_budgets(timeout))
+        self.wait = self.waits.wait()
         self.current_mobile = ""
+        self._message_stream: MessageStream | None = None
         if not logger:
             logger = self._build_logger()
         self.logger = logger
+        # element lookups by logical name, see alright.locators - they fail within the
+        # "lookup" budget, also after WaitEngine.tune() changed it
+        self.selectors = selectors or SelectorRegistry(
+            driver, budget=lambda: self.waits.budget("lookup"), logger=logger
+        )
+        # known valid / invalid numbers, see alright.cache - None disables the cache
+        self.recipients = recipients
+        # chat name -> chat list position, filled by every chat list scrape
+        self.chat_index = ChatIndex(self, CHAT_ROWS_XPATH)
+        # chat list APIs return plain dicts as they always did, or the lighter ChatSummary
+        # records (see alright.summary) when set to False
+        self.chats_as_dicts = chats_as_dicts
+        # puts message and caption text in the page, in one call by default, see alright.compose
+        self.composer = composer or Composer(driver, logger=logger)
+        # downscales pictures / re-encodes large videos before upload, see alright.media
+        self.media = media
+        # outgoing messages and their ticks, recorded by the send paths when
+        # track_deliveries is set, see alright.delivery
+        self.track_deliveries = track_deliveries
+        self.deliveries = DeliveryTracker(self)
+        # the record of the message submitted last, what _wait_for_sent() confirms
+        self.last_delivery = None
+        # last readiness probe result, with the seconds it took, see wait_until_ready()
+        self.readiness: dict | None = None
+        # chat -> (chat title, chat list preview, last incoming message), see get_last_messages()
+        self._last_messages: dict[str, tuple] = {}
+        # opt-in command counts and latency histograms, see alright.instrument
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self)
 
     def _build_logger(self) -> logging.Logger:
         """
@@ -54,30 +257,56 @@ class WhatsApp(object):
         logger.setLevel(logging.INFO)
         return logger
 
-    def login(self):
+    def login(self, wait: bool = False, timeout: float | None = None, accept_qr: bool = False) -> dict | None:
+        """login()
+
+        Opens WhatsApp Web. With wait=True it also blocks until the app is usable.
+
+        Args:
+            wait (bool): wait for the chat list, see wait_until_ready()
+            timeout (float, optional): seconds to wait, defaults to the session timeout
+            accept_qr (bool): stop waiting when the QR code shows up
+
+        Returns:
+            dict | None: the readiness result when waiting
+        """
         BASE_URL = "https://web.whatsapp.com/"
+        started = time.perf_counter()
         self.driver.get(BASE_URL)
+        if wait:
+            state = self.wait_until_ready(timeout=timeout, accept_qr=accept_qr)
+            # count the page load itself in the time to ready
+            state["seconds"] = time.perf_counter() - started
+            return state
 
-    def logout(self):
-        prefix = "//div[@id='side']/header/div[2]/div/span/div[3]"
-        dots_button = self.wait.until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    f"{prefix}/div[@role='button']",
-                )
-            )
+    def wait_until_ready(self, timeout: float | None = None, accept_qr: bool = False) -> dict:
+        """wait_until_ready()
+
+        Waits until the account is logged in and the chat list is rendered, with one
+        in-page probe per poll instead of element lookups running into timeouts.
+
+        Args:
+            timeout (float, optional): seconds to wait, defaults to the session timeout
+            accept_qr (bool): also return when the page waits for a QR code scan
+
+        Returns:
+            dict: {"state": "ready" | "qr", "rows", "seconds", "probes"}, also kept as
+            self.readiness
+        """
+        self.readiness = wait_until_ready(
+            self.driver, timeout=self.timeout if timeout is None else timeout,
+            accept_qr=accept_qr,
         )
+        self.logger.info(
+            f"WhatsApp Web {self.readiness['state']} after {self.readiness['seconds']:.2f}s"
+        )
+        return self.readiness
+
+    def logout(self):
+        dots_button = self.selectors.find("menu_button")
         dots_button.click()
 
-        logout_item = self.wait.until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    f"{prefix}/span/div[1]/ul/li[last()]/div[@role='button']",
-                )
-            )
-        )
+        logout_item = self.selectors.find("logout_item")
         logout_item.click()
 
     def get_phone_link(self, mobile:str) -> str:
@@ -98,13 +327,59 @@ class WhatsApp(object):
         catches any sudden alert
         """
         try:
-            WebDriverWait(self.driver, seconds).until(EC.alert_is_present())
+            AdaptiveWait(self.driver, seconds).until(EC.alert_is_present())
             alert = self.driver.switch_to.alert.accept()
             return True
         except Exception as e:
             self.logger.exception(f"An exception occurred: {e}")
             return False
 
+    def _check_alert(self) -> bool:
+        # Non blocking alert check used after sends: an alert means we are going too fast
+        try:
+            self.driver.switch_to.alert.accept()
+        except NoAlertPresentException:
+            return False
+        self.logger.warning("Alert raised after sending, slowing down.")
+        self.pacer.back_off()
+        return True
+
+    def _sent(self, text: str | None = None, mobile: str | None = None):
+        if not self._check_alert():
+            self.pacer.success()
+        if self.track_deliveries and text is not None:
+            self.last_delivery = self.deliveries.track(text, mobile)
+
+    def _recipient_status(self, mobile: str) -> str:
+        if self.recipients is None:
+            return UNKNOWN
+        return self.recipients.get(mobile)
+
+    def _remember_recipient(self, mobile: str, status: str):
+        if self.recipients is not None:
+            self.recipients.set(mobile, status)
+
+    def _dismiss_dialog(self, mobile: str, ok_button) -> bool:
+        # closes the dialog found instead of the chat; True when it said the number is
+        # not on WhatsApp, which is then cached - any other dialog is not
+        try:
+            text = self.driver.execute_script(DIALOG_TEXT_JS, ok_button) or ""
+        except WebDriverException:
+            text = ""
+        ok_button.send_keys(Keys.ENTER)
+        if INVALID_NUMBER_TEXT.search(text):
+            self._remember_recipient(mobile, INVALID)
+            return True
+        self.logger.warning(f"Unexpected dialog instead of the chat of {mobile}: {text!r}")
+        return False
+
+    def _find_any(self, names: list[str], operation: str) -> tuple[str, object]:
+        # selector probes within the operation's budget, timed for WaitEngine.tune()
+        started = time.monotonic()
+        found = self.selectors.find_any(names, timeout=self.waits.budget(operation))
+        self.waits.observe(operation, time.monotonic() - started)
+        return found
+
     def find_user(self, mobile:str) -> bool:
         """
         Tries to acces the chat for the given user.
@@ -114,22 +389,29 @@ class WhatsApp(object):
         Returns:
             bool: Wheter the contact exists or not.
         """
+        if self._recipient_status(mobile) == INVALID:
+            self.logger.info(f"{mobile} is cached as not on Whatsapp.")
+            return False
         try:
             self.current_mobile = mobile
             link = self.get_phone_link(mobile)
             self.driver.get(link)
             #waits to see if the message field exists
-            #if it doesn't, then the user probably is not on whatsapp.
-            inp_xpath = '//*[@id="main"]/footer/div[1]/div/span/div/div[2]/div[1]/div/div[1]/p'
-            message_field = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, inp_xpath))
-            )
+            #if the "invalid number" dialog shows up instead, the user is not on whatsapp.
+            found, element = self._find_any(["message_box", "invalid_number_ok"], "page_load")
+            if found == "invalid_number_ok":
+                if self._dismiss_dialog(mobile, element):
+                    self.logger.warning(f"{mobile} is not on Whatsapp.")
+                return False
+            self._remember_recipient(mobile, VALID)
             return True
-        except TimeoutException:
+        except (TimeoutException, SelectorNotFound):
             self.logger.warning(f"Timeout: {mobile} is probably not on Whatsapp.")
             return False
         except UnexpectedAlertPresentException as bug:
             self.logger.exception(f"An exception occurred: {bug}")
+            # Selenium already dismissed the alert, it still means we are going too fast
+            self.pacer.back_off()
             time.sleep(1)
             return self.find_user(mobile)
 
@@ -142,33 +424,38 @@ class WhatsApp(object):
         Args:
             query (str): the username or number to be queried
         """
-        search_box = self.wait.until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    "/html/body/div[1]/div/div/div[4]/div/div[1]/div/div/div[2]/div/div[1]",
-                )
-            )
-        )
+        return self._search_chat(query) is not None
+
+    def _chat_title(self) -> str | None:
+        # title of the chat open right now, if any
+        opened_chat = self.selectors.probe(["chat_title"])
+        return opened_chat[1].get_attribute("title") if opened_chat else None
+
+    def _search_chat(self, query: str) -> str | None:
+        # opens the first search result and returns its title, once the header shows a
+        # chat matching the query - None when it does not, so another chat is never taken
+        # for the one searched
+        search_box = self._find_any(["search_box"], "search")[1]
         search_box.clear()
         search_box.send_keys(query)
         search_box.send_keys(Keys.ENTER)
-        try:
-            opened_chat = self.driver.find_elements(
-                By.XPATH, '//div[@id="main"]/header/div[2]/div[1]/div[1]/span'
-            )
-            if len(opened_chat):
-                title = opened_chat[0].get_attribute("title")
-                if title.upper() == query.upper(): #type: ignore
-                    self.logger.info(f'Successfully fetched chat "{query}"')
-                return True
-            else:
-                self.logger.info(f'It was not possible to fetch chat "{query}"')
-                return False
-        except NoSuchElementException:
-            self.logger.exception(f'It was not possible to fetch chat "{query}"')
+        needle = query.upper()
+        digits = normalize_number(query)
+
+        def matching(driver):
+            title = self._chat_title()
+            if title and (needle in title.upper() or (digits and digits == normalize_number(title))):
+                return title
             return False
 
+        try:
+            title = self.waits.wait("search").until(matching)
+        except TimeoutException:
+            self.logger.info(f'It was not possible to fetch chat "{query}"')
+            return None
+        self.logger.info(f'Successfully fetched chat "{query}"')
+        return title
+
     def username_exists(self, username):
         """username_exists ()
 
@@ -178,18 +465,11 @@ class WhatsApp(object):
             username ([type]): [description]
         """
         try:
-            search_box = self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//*[@id="side"]/div[1]/div/label/div/div[2]')
-                )
-            )
+            search_box = self.selectors.find("search_box")
             search_box.clear()
             search_box.send_keys(username)
             search_box.send_keys(Keys.ENTER)
-            opened_chat = self.driver.find_element(
-                By.XPATH,
-                "/html/body/div/div[1]/div[1]/div[4]/div[1]/header/div[2]/div[1]/div/span",
-            )
+            opened_chat = self.selectors.find("chat_title")
             title = opened_chat.get_attribute("title")
             if title.upper() == username.upper(): #type:ignore
                 return True
@@ -207,11 +487,21 @@ class WhatsApp(object):
             ignore_pinned (boolean): parameter that flags if the pinned chats should or not be ignored - standard value: True (it will ignore pinned chats!)
         """
         try:
-            search_box = self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//div[@id="side"]/div[1]/div/div/div/div')
-                )
-            )
+            self.scroll_chat_pane(0)
+            chats = self.get_list_of_messages()
+            if ignore_pinned:
+                chats = [chat for chat in chats if not chat.get("pinned")]
+            chats = [chat for chat in chats if chat.get("row_index") is not None]
+            if chats:
+                first = min(chats, key=lambda chat: chat["row_index"])
+                if self.chat_index.open(first["sender"], exact=True):
+                    self.logger.info(f'Successfully selected chat "{first["sender"]}"')
+                    return
+        except WebDriverException as bug:
+            self.logger.warning(f"Indexed chat lookup failed, walking the list: {bug.msg}")
+
+        try:
+            search_box = self.selectors.find("chat_list_search")
             search_box.click()
             search_box.send_keys(Keys.ARROW_DOWN)
             chat = self.driver.switch_to.active_element
@@ -244,11 +534,17 @@ class WhatsApp(object):
             query (string): query value to be located in the chat name
         """
         try:
-            search_box = self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//div[@id="side"]/div[1]/div/div/div/div')
-                )
-            )
+            chat = self.chat_index.open(query)
+            if chat is not None:
+                self.logger.info(f'Successfully selected chat "{chat["sender"]}"')
+            else:
+                self.logger.info(f'Could not locate chat "{query}"')
+            return
+        except WebDriverException as bug:
+            self.logger.warning(f"Indexed chat lookup failed, walking the list: {bug.msg}")
+
+        try:
+            search_box = self.selectors.find("chat_list_search")
             search_box.click()
             search_box.send_keys(Keys.ARROW_DOWN)
             chat = self.driver.switch_to.active_element
@@ -282,80 +578,73 @@ class WhatsApp(object):
     def get_list_of_messages(self):
         """get_list_of_messages()
 
-        gets the list of messages in the page
+        gets the list of messages in the page, reading every visible row in a single
+        in-page call and falling back to reading the rows one by one. Rows that did not
+        change since the previous call are served from the chat index instead of being
+        parsed again
         """
-        messages = self.wait.until(
+        self.waits.wait("lookup").until(
+            EC.presence_of_element_located(
+                (By.XPATH, CHAT_ROWS_XPATH)
+            )
+        )
+        try:
+            rows = self.driver.execute_script(
+                REFRESH_CHAT_ROWS_JS, CHAT_ROWS_XPATH, self.chat_index.token, self.chat_index.take_forgotten()
+            )
+            if rows:
+                return self._chat_records(self.chat_index.apply(rows, self._clean_chat_row))
+        except WebDriverException as bug:
+            self.logger.warning(f"Bulk chat list extraction failed, falling back: {bug.msg}")
+        return self._chat_records(self._get_list_of_messages_by_element())
+
+    def _chat_records(self, chats: list[ChatSummary]) -> list:
+        if self.chats_as_dicts:
+            return [chat.to_dict() for chat in chats]
+        return chats
+
+    def _clean_chat_row(self, row: dict) -> ChatSummary:
+        no_of_unread = row.get("no_of_unread") or 0
+        return ChatSummary(
+            sender=row["sender"],
+            time=row["time"],
+            message=row["message"],
+            unread=no_of_unread > 0 or bool(row.get("marked_unread")),
+            no_of_unread=no_of_unread,
+            group=bool(row["group"]),
+            pinned=bool(row["pinned"]),
+            muted=bool(row["muted"]),
+            row_id=row["row_id"],
+            row_index=row["row_index"],
+        )
+
+    def _get_list_of_messages_by_element(self):
+        # One WebDriver round trip per row - only used when the in-page extraction fails
+        messages = self.waits.wait("lookup").until(
             EC.presence_of_all_elements_located(
-                (By.XPATH, '//*[@id="pane-side"]/div[2]/div/div/child::div')
+                (By.XPATH, CHAT_ROWS_XPATH)
             )
         )
 
         clean_messages = []
         for message in messages:
             _message = message.text.split("\n")
-            if len(_message) == 2:
-                clean_messages.append(
-                    {
-                        "sender": _message[0],
-                        "time": _message[1],
-                        "message": "",
-                        "unread": False,
-                        "no_of_unread": 0,
-                        "group": False,
-                    }
-                )
-            elif len(_message) == 3:
-                clean_messages.append(
-                    {
-                        "sender": _message[0],
-                        "time": _message[1],
-                        "message": _message[2],
-                        "unread": False,
-                        "no_of_unread": 0,
-                        "group": False,
-                    }
-                )
-            elif len(_message) == 4:
-                clean_messages.append(
-                    {
-                        "sender": _message[0],
-                        "time": _message[1],
-                        "message": _message[2],
-                        "unread": _message[-1].isdigit(),
-                        "no_of_unread": int(_message[-1])
-                        if _message[-1].isdigit()
-                        else 0,
-                        "group": False,
-                    }
-                )
-            elif len(_message) == 5:
-                clean_messages.append(
-                    {
-                        "sender": _message[0],
-                        "time": _message[1],
-                        "message": "",
-                        "unread": _message[-1].isdigit(),
-                        "no_of_unread": int(_message[-1])
-                        if _message[-1].isdigit()
-                        else 0,
-                        "group": True,
-                    }
-                )
-            elif len(_message) == 6:
-                clean_messages.append(
-                    {
-                        "sender": _message[0],
-                        "time": _message[1],
-                        "message": _message[4],
-                        "unread": _message[-1].isdigit(),
-                        "no_of_unread": int(_message[-1])
-                        if _message[-1].isdigit()
-                        else 0,
-                        "group": True,
-                    }
-                )
-            else:
+            if not 2 <= len(_message) <= 6:
                 self.logger.info(f"Unknown message format: {_message}")
+                continue
+            # 2-4 lines: contact (name, time, message, unread count), 5-6 lines: group
+            group = len(_message) >= 5
+            counted = len(_message) >= 4 and _message[-1].isdigit()
+            clean_messages.append(
+                ChatSummary(
+                    sender=_message[0],
+                    time=_message[1],
+                    message={3: _message[2], 4: _message[2], 6: _message[4]}.get(len(_message), ""),
+                    unread=counted,
+                    no_of_unread=int(_message[-1]) if counted else 0,
+                    group=group,
+                )
+            )
         return clean_messages
 
     def check_if_given_chat_has_unread_messages(self, query):
@@ -367,16 +656,17 @@ class WhatsApp(object):
             query (string): query value to be located in the chat name
         """
         try:
-            list_of_messages = self.get_list_of_messages()
-            for chat in list_of_messages:
-                if query.upper() == chat["sender"].upper():
-                    if chat["unread"]:
-                        self.logger.info(
-                            f'Yup, {chat["no_of_unread"]} new message(s) on chat <{chat["sender"]}>.'
-                        )
-                        return True
-                    self.logger.info(f'There are no new messages on chat "{query}".')
-                    return False
+            # refreshes the changed rows, then answers from the chat index
+            self.get_list_of_messages()
+            chat = self.chat_index.lookup(query, exact=True)
+            if chat is not None:
+                if chat["unread"]:
+                    self.logger.info(
+                        f'Yup, {chat["no_of_unread"]} new message(s) on chat <{chat["sender"]}>.'
+                    )
+                    return True
+                self.logger.info(f'There are no new messages on chat "{query}".')
+                return False
             self.logger.info(f'Could not locate chat "{query}"')
 
         except Exception as bug:
@@ -393,162 +683,309 @@ class WhatsApp(object):
         #   3 = Error or Failure to Send Message
         #   4 = Not a WhatsApp Number
         return_msg = ""
+        if self._recipient_status(mobile) == INVALID:
+            self.logger.info(f"4 (cached) {mobile}")
+            return INVALID_CODE
         try:
+            self.pacer.acquire()
             # Browse to a "Blank" message state
             self.driver.get(f"https://web.whatsapp.com/send?phone={mobile}&text")
 
-            # This is the XPath of the message textbox
-            inp_xpath = (
-                '//*[@id="main"]/footer/div[1]/div/span[2]/div/div[2]/div[1]/div/div[2]'
-            )
-            # This is the XPath of the "ok button" if the number was not found
-            nr_not_found_xpath = (
-                '//*[@id="app"]/div/span[2]/div/span/div/div/div/div/div/div[2]/div/div'
-            )
-
             # If the number is NOT a WhatsApp number then there will be an OK Button, not the Message Textbox
-            # Test for both situations -> find_elements returns a List
-            ctrl_element = self.wait.until(
-                lambda ctrl_self: ctrl_self.find_elements(By.XPATH, nr_not_found_xpath)
-                or ctrl_self.find_elements(By.XPATH, inp_xpath)
-            )
-            # Iterate through the list of elements to test each if they are a textBox or a Button
-            for i in ctrl_element:
-                if i.aria_role == "textbox":
-                    # This is a WhatsApp Number -> Send Message
-
-                    for line in message.split("\n"):
-                        i.send_keys(line)
-                        ActionChains(self.driver).key_down(Keys.SHIFT).key_down(
-                            Keys.ENTER
-                        ).key_up(Keys.ENTER).key_up(Keys.SHIFT).perform()
-                    i.send_keys(Keys.ENTER)
-
-                    return_msg = f"1 "  # Message was sent successfully
-                    # Found alert issues when we send messages too fast, so I called the below line to catch any alerts
-                    self.catch_alert()
-
-                elif i.aria_role == "button":
-                    # Did not find the Message Text box
-                    # BUT we possibly found the XPath of the error "Phone number shared via url is invalid."
-                    if i.text == "OK":
-                        # This is NOT a WhatsApp Number -> Press enter and continue
-                        i.send_keys(Keys.ENTER)
-                        return_msg = f"4 "  # Not a WhatsApp Number
+            # Test for both situations in a single probe
+            found, i = self._find_any(["invalid_number_ok", "message_box"], "page_load")
+            if found == "message_box":
+                # This is a WhatsApp Number -> Send Message
+                self._type_message(i, message)
+                i.send_keys(Keys.ENTER)
+
+                return_msg = SENT_CODE  # Message was sent successfully
+                self._remember_recipient(mobile, VALID)
+                # Found alert issues when we send messages too fast: the pacer backs off when one shows up
+                self._sent(message, mobile)
+
+            else:
+                # Did not find the Message Text box
+                # BUT we possibly found the error "Phone number shared via url is invalid."
+                if i.text == "OK":
+                    # This is NOT a WhatsApp Number (when the dialog says so) -> Press enter and continue
+                    if self._dismiss_dialog(mobile, i):
+                        return_msg = INVALID_CODE  # Not a WhatsApp Number
+                    else:
+                        return_msg = FAILED_CODE
+
+        except UnexpectedAlertPresentException as bug:
+            self.logger.exception(f"An exception occurred: {bug}")
+            # Selenium already dismissed the alert, it still means we are going too fast
+            self.pacer.back_off()
+            return_msg = FAILED_CODE
 
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"An exception occurred: {bug}")
-            return_msg = "3 "
+            self.pacer.back_off()
+            return_msg = FAILED_CODE
 
         finally:
             self.logger.info(f"{return_msg}")
             return return_msg
 
-    def send_message_to_current_chat(self, message: str, timeout:float=0.0):
+    def _type_message(self, input_box, message: str):
+        self.composer.write(input_box, message)
+
+    def open_chat_in_app(self, mobile: str, timeout: float | None = None):
+        """open_chat_in_app()
+
+        Opens the chat for the given number inside the already loaded WhatsApp Web app,
+        falling back to a full page load when the in-app navigation does not happen.
+        In-app routing relies on WhatsApp handling clicks on wa.me links; on builds that
+        do not, every call costs a page load, like send_message1().
+
+        Args:
+            mobile (str): The desired phone number. Must not contain '+' sign.
+            timeout (float, optional): how long to wait for the in-app navigation before
+                falling back, the "chat_open" wait budget by default
+
+        Returns:
+            WebElement | None: the message textbox, or None if the number is not on WhatsApp
+
+        Raises:
+            WebDriverException: another dialog showed up instead of the chat
+        """
+        previous = self.selectors.probe(["message_box"])
+        self.current_mobile = mobile
+
+        def chat_switched(driver):
+            found = self.selectors.probe(["invalid_number_ok", "message_box"])
+            if not found:
+                return False
+            if found[0] == "message_box" and previous and found[1] == previous[1]:
+                return False
+            return found
+
+        try:
+            routed = self.driver.execute_script(
+                OPEN_CHAT_IN_APP_JS, f"https://wa.me/{mobile}"
+            )
+            if not routed:
+                raise TimeoutException("WhatsApp did not handle the chat link")
+            ctrl_element = self.waits.wait("chat_open", timeout).until(chat_switched)
+        except TimeoutException:
+            self.logger.warning(
+                f"In-app navigation to {mobile} did not happen, reloading the page."
+            )
+            self.driver.get(f"https://web.whatsapp.com/send?phone={mobile}&text")
+            previous = None
+            ctrl_element = self.waits.wait("page_load").until(chat_switched)
+
+        found, element = ctrl_element
+        if found == "message_box":
+            return element
+        if self._dismiss_dialog(mobile, element):
+            return None
+        raise WebDriverException(f"A dialog showed up instead of the chat of {mobile}")
+
+    def send_message_in_app(self, mobile: str, message: str) -> str:
+        """send_message_in_app()
+
+        Sends a message through open_chat_in_app(), without reloading WhatsApp Web.
+        The message is submitted but not waited for.
+
+        Args:
+            mobile (str): The desired phone number. Must not contain '+' sign.
+            message (str): the message to be sent
+
+        Returns:
+            str: the send_message1() codes, "1 " sent, "3 " failure, "4 " not a WhatsApp number
+        """
+        status = FAILED_CODE
+        try:
+            if self._recipient_status(mobile) == INVALID:
+                return INVALID_CODE
+            self.pacer.acquire()
+            input_box = self.open_chat_in_app(mobile)
+            if input_box is None:
+                status = INVALID_CODE
+            else:
+                self._type_message(input_box, message)
+                input_box.send_keys(Keys.ENTER)
+                status = SENT_CODE
+                self._remember_recipient(mobile, VALID)
+                self._sent(message, mobile)
+        except UnexpectedAlertPresentException as bug:
+            self.logger.exception(f"An exception occurred: {bug}")
+            # Selenium already dismissed the alert, it still means we are going too fast
+            self.pacer.back_off()
+        except (NoSuchElementException, Exception) as bug:
+            self.logger.exception(f"Failed to send a message to {mobile} - {bug}")
+            self.pacer.back_off()
+        self.logger.info(f"{status} {mobile}")
+        return status
+
+    def send_bulk(self, recipients, message: str, wait_for_delivery: bool = True) -> dict:
+        """send_bulk()
+
+        Sends the same message to many recipients without reloading WhatsApp Web between them.
+        Each message is submitted and the next chat is opened right away, so the previous
+        message keeps delivering while the next lookup runs.
+
+        Args:
+            recipients (Iterable[str]): phone numbers, without the '+' sign
+            message (str): the message to be sent
+            wait_for_delivery (bool): wait for the last pending clock icon before returning
+
+        Returns:
+            dict: {"results": [...], "summary": {...}} where every result carries the
+            send_message1 status code ("1 " sent, "3 " failure, "4 " not a WhatsApp number)
+        """
+        if not self.driver.find_elements(By.ID, "app"):
+            self.login()
+
+        results = []
+        started = time.perf_counter()
+        for mobile in recipients:
+            sent_at = time.perf_counter()
+            status = self.send_message_in_app(mobile, message)
+            results.append(
+                {
+                    "mobile": mobile,
+                    "status": status,
+                    "seconds": time.perf_counter() - sent_at,
+                }
+            )
+
+        if wait_for_delivery and any(r["status"] == SENT_CODE for r in results):
+            try:
+                self.waits.wait("delivery").until_not(
+                    EC.presence_of_element_located(self.selectors.locator("pending_icon"))
+                )
+            except TimeoutException:
+                self.logger.warning("Last message is still pending.")
+
+        elapsed = time.perf_counter() - started
+        sent = sum(1 for r in results if r["status"] == SENT_CODE)
+        summary = {
+            "total": len(results),
+            "sent": sent,
+            "invalid": sum(1 for r in results if r["status"] == INVALID_CODE),
+            "failed": sum(1 for r in results if r["status"] == FAILED_CODE),
+            "elapsed": elapsed,
+            "messages_per_minute": sent * 60 / elapsed if elapsed else 0.0,
+            "paced_rate": self.pacer.rate,
+        }
+        self.logger.info(
+            f"Bulk send finished: {sent}/{len(results)} sent, "
+            f"{summary['messages_per_minute']:.1f} messages/minute"
+        )
+        return {"results": results, "summary": summary}
+
+    def precheck_numbers(self, mobiles) -> dict:
+        """precheck_numbers()
+
+        Checks which numbers are on WhatsApp without sending anything, opening each chat
+        in-app. Numbers with a fresh cached status are not probed again.
+
+        Args:
+            mobiles (Iterable[str]): phone numbers, without the '+' sign
+
+        Returns:
+            dict: mobile -> "valid", "invalid" or "unknown" (the probe failed)
+        """
+        mobiles = list(mobiles)
+        if self.recipients is not None:
+            statuses = self.recipients.statuses(mobiles)
+        else:
+            statuses = dict.fromkeys(mobiles, UNKNOWN)
+
+        if any(status == UNKNOWN for status in statuses.values()) and not self.driver.find_elements(By.ID, "app"):
+            self.login()
+        for mobile, status in statuses.items():
+            if status != UNKNOWN:
+                continue
+            try:
+                input_box = self.open_chat_in_app(mobile)
+                statuses[mobile] = INVALID if input_box is None else VALID
+                self._remember_recipient(mobile, statuses[mobile])
+            except (NoSuchElementException, Exception) as bug:
+                self.logger.exception(f"Could not check {mobile} - {bug}")
+        invalid = sum(1 for status in statuses.values() if status == INVALID)
+        self.logger.info(f"Pre-checked {len(statuses)} numbers, {invalid} are not on Whatsapp.")
+        return statuses
+
+    def export_recipients(self, path, status: str | None = None) -> int:
+        """Writes the cached recipient statuses to a CSV file, see RecipientCache.export()."""
+        if self.recipients is None:
+            raise ValueError("No recipient cache was given to this session")
+        return self.recipients.export(path, status=status)
+
+    def send_message_to_current_chat(self, message: str, timeout:float=0.0, human:bool=False):
         """
         Sends a message to the current chat on screen
 
         Args:
             message (str): The message to be sent
             timeout (float): time to wait after typing and before sending
+            human (bool): type word by word like a person instead of inserting the
+                whole message at once
         """
         try:
-            inp_xpath = '//*[@id="main"]/footer/div[1]/div/span/div/div[2]/div[1]/div/div[1]/p'
-            input_box = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, inp_xpath))
-            )
-            for line in message.split("\n"):
-                # mimick human like typing behaviour
-                for word in line.split():
-                    input_box.send_keys(word)
-                    input_box.send_keys(Keys.SPACE)
-                    time.sleep(0.8)
-                ActionChains(self.driver).key_down(Keys.SHIFT).key_down(
-                    Keys.ENTER
-                ).key_up(Keys.ENTER).key_up(Keys.SHIFT).perform()
+            input_box = self.selectors.find("message_box")
+            self.composer.write(input_box, message, mode=HUMAN if human else None)
             if timeout:
                 time.sleep(timeout)
+            self.pacer.acquire()
             input_box.send_keys(Keys.ENTER)
+            self._sent(message, self.current_mobile)
             self.logger.info(f"Message sent successfuly to {self.current_mobile}")
             return True
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a message to {self.current_mobile} - {bug}")
+            self.pacer.back_off()
             #self.logger.info("send_message() finished running!")
         return False
 
     def find_attachment(self):
-        clipButton = self.wait.until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    '//*[@id="main"]/footer//*[@data-icon="attach-menu-plus"]/..',
-                )
-            )
-        )
+        clipButton = self.selectors.find("attach_button")
         clipButton.click()
 
     def add_caption(self, message: str, media_type: str = "image"):
-        xpath_map = {
-            "image": "/html/body/div[1]/div/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[1]/div[3]/div/div/div[2]/div[1]/div[1]",
-            "video": "/html/body/div[1]/div/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[1]/div[3]/div/div/div[1]/div[1]",
-            "file": "/html/body/div[1]/div/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[1]/div[3]/div/div/div[1]/div[1]",
-        }
-        inp_xpath = xpath_map[media_type]
-        input_box = self.wait.until(
-            EC.presence_of_element_located((By.XPATH, inp_xpath))
-        )
-        for line in message.split("\n"):
-            input_box.send_keys(line)
-            ActionChains(self.driver).key_down(Keys.SHIFT).key_down(Keys.ENTER).key_up(
-                Keys.ENTER
-            ).key_up(Keys.SHIFT).perform()
+        input_box = self.selectors.find(f"caption_{media_type}")
+        self.composer.write(input_box, message)
 
     def send_attachment(self):
         # Waiting for the pending clock icon to disappear
-        self.wait.until_not(
-            EC.presence_of_element_located(
-                (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-            )
+        self.waits.wait("upload").until_not(
+            EC.presence_of_element_located(self.selectors.locator("pending_icon"))
         )
 
-        sendButton = self.wait.until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    '//*[@id="app"]/div[1]/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[2]/div[2]/div/div/span',
-                )
-            )
-        )
+        sendButton = self.selectors.find("media_send_button")
+        self.pacer.acquire()
         sendButton.click()
 
+        if self.track_deliveries:
+            # the tracker follows the upload, no need to block on it here
+            self._sent("", self.current_mobile)
+            return
         # Waiting for the pending clock icon to disappear again - workaround for large files or loading videos.
         # Appropriate solution for the presented issue. [nCKbr]
-        self.wait.until_not(
-            EC.presence_of_element_located(
-                (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-            )
+        self.waits.wait("upload").until_not(
+            EC.presence_of_element_located(self.selectors.locator("pending_icon"))
         )
+        self._sent()
 
-    def send_picture(self, picture: Path, message: Optional[str] = None):
+    def send_picture(self, picture: Path, message: Optional[str] = None, prepared: bool = False):
         """send_picture ()
 
         Sends a picture to a target user
 
         Args:
             picture ([type]): [description]
+            prepared (bool): the file already went through the session's MediaPreprocessor
         """
         try:
-            filename = os.path.realpath(picture)
+            filename = self._prepared(picture, "image", prepared)
             self.find_attachment()
             # To send an Image
-            imgButton = self.wait.until(
-                EC.presence_of_element_located(
-                    (
-                        By.XPATH,
-                        '//*[@id="main"]/footer/div[1]/div/span[2]/div/div[1]/div[2]/div/span/div/ul/div/div[2]/li/div/input',
-                    )
-                )
-            )
+            imgButton = self.selectors.find("attach_media_input")
             imgButton.send_keys(filename)
             if message:
                 self.add_caption(message, media_type="image")
@@ -556,6 +993,7 @@ class WhatsApp(object):
             self.logger.info(f"Picture has been successfully sent to {self.current_mobile}")
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a message to {self.current_mobile} - {bug}")
+            self.pacer.back_off()
         finally:
             self.logger.info("send_picture() finished running!")
 
@@ -578,30 +1016,26 @@ class WhatsApp(object):
                 size /= 1024
         raise TypeError('Parameter "to" must be in ["BYTES", "KB", "MB", "GB", "TB"]')
 
-    def send_video(self, video: Path, message: Optional[str] = None):
+    def send_video(self, video: Path, message: Optional[str] = None, prepared: bool = False):
         """send_video ()
         Sends a video to a target user
         CJM - 2022/06/10: Only if file is less than 14MB (WhatsApp limit is 15MB)
+        Larger videos are re-encoded first when the session has a MediaPreprocessor
+        and ffmpeg is installed.
 
         Args:
             video ([type]): the video file to be sent.
+            prepared (bool): the file already went through the session's MediaPreprocessor
         """
         try:
-            filename = os.path.realpath(video)
+            filename = self._prepared(video, "video", prepared)
             f_size = os.path.getsize(filename)
             x = self._convert_bytes_to(f_size, "MB")
             if x < 14:
                 # File is less than 14MB
                 self.find_attachment()
                 # To send a Video
-                video_button = self.wait.until(
-                    EC.presence_of_element_located(
-                        (
-                            By.XPATH,
-                            '//*[@id="main"]/footer/div[1]/div/span[2]/div/div[1]/div[2]/div/span/div/ul/div/div[2]/li/div/input',
-                        )
-                    )
-                )
+                video_button = self.selectors.find("attach_media_input")
 
                 video_button.send_keys(filename)
                 if message:
@@ -612,9 +1046,40 @@ class WhatsApp(object):
                 self.logger.info(f"Video larger than 14MB")
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a message to {self.current_mobile} - {bug}")
+            self.pacer.back_off()
         finally:
             self.logger.info("send_video() finished running!")
 
+    def _prepared(self, path: str | Path, kind: str, prepared: bool = False) -> str:
+        # the file to upload: the preprocessed copy when the session has a preprocessor
+        if self.media is None or prepared:
+            return os.path.realpath(path)
+        return self.media.process(path, kind)
+
+    def send_media(self, paths: list[str | Path], message: Optional[str] = None):
+        """send_media()
+
+        Sends pictures, videos and documents to the current chat, one attachment each.
+        With a MediaPreprocessor the next files are preprocessed on its process pool
+        while the current one uploads.
+
+        Args:
+            paths (list): the files to send, in order
+            message (str, optional): caption added to every attachment
+        """
+        if self.media is None:
+            pairs = ((path, path) for path in paths)
+        else:
+            pairs = self.media.prefetch(paths)
+        for original, prepared in pairs:
+            kind = media_kind(original)
+            if kind == "image":
+                self.send_picture(prepared, message, prepared=True)
+            elif kind == "video":
+                self.send_video(prepared, message, prepared=True)
+            else:
+                self.send_file(original, message)
+
     def send_file(self, file_path: str, message: Optional[str] = None):
         """send_file()
 
@@ -626,23 +1091,112 @@ class WhatsApp(object):
         try:
             file_path = os.path.realpath(file_path)
             self.find_attachment()
-            document_button = self.wait.until(
-                EC.presence_of_element_located(
-                    (
-                        By.XPATH,
-                        '//*[@id="main"]/footer/div[1]/div/span[2]/div/div[1]/div[2]/div/span/div/ul/div/div[1]/li/div/input',
-                    )
-                )
-            )
+            document_button = self.selectors.find("attach_document_input")
             document_button.send_keys(file_path)
             if message:
                 self.add_caption(message, media_type="file")
             self.send_attachment()
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a file to {self.current_mobile} - {bug}")
+            self.pacer.back_off()
         finally:
             self.logger.info("send_file() finished running!")
 
+    def send_attachments(self, paths: list[str | Path], captions: list[str | None] | str | None = None) -> bool:
+        """send_attachments()
+
+        Sends several files to the current chat through as few attachment dialogs as
+        possible: pictures and videos go together as an album, documents in a dialog of
+        their own. Every size is checked before anything is uploaded, and each dialog
+        waits for the previous upload's pending icon to clear before it opens.
+
+        Args:
+            paths (list): the files to send, in order
+            captions (list | str, optional): one caption per file (None for no caption),
+                or a single caption added to every file, as send_media() does
+
+        Returns:
+            bool: False when a file is missing or too large (nothing is sent) or the
+            upload failed
+        """
+        if isinstance(captions, str):
+            captions = [captions] * len(paths)
+        captions = list(captions or [])
+        captions += [None] * (len(paths) - len(captions))
+
+        items, rejected = [], []
+        for path, caption in zip(paths, captions):
+            kind = media_kind(path)
+            try:
+                filename = self._prepared(path, kind) if kind != "file" else os.path.realpath(path)
+                size = self._convert_bytes_to(os.path.getsize(filename), "MB")
+            except OSError as bug:
+                rejected.append(f"{path} ({bug})")
+                continue
+            if size >= ATTACHMENT_LIMITS_MB[kind]:
+                rejected.append(f"{path} ({size:.1f}MB, {kind} limit is {ATTACHMENT_LIMITS_MB[kind]}MB)")
+                continue
+            items.append((filename, kind, caption))
+        if rejected:
+            self.logger.error(f"Not sending any attachment, rejected: {', '.join(rejected)}")
+            return False
+
+        media = [item for item in items if item[1] != "file"]
+        documents = [item for item in items if item[1] == "file"]
+        dialogs = [
+            (group[start:start + ATTACHMENTS_PER_DIALOG], input_name)
+            for group, input_name in ((media, "attach_media_input"), (documents, "attach_document_input"))
+            for start in range(0, len(group), ATTACHMENTS_PER_DIALOG)
+        ]
+        try:
+            for position, (batch, input_name) in enumerate(dialogs):
+                if position:
+                    # the next dialog does not open over an upload still in flight
+                    self.waits.wait("upload").until_not(
+                        EC.presence_of_element_located(self.selectors.locator("pending_icon"))
+                    )
+                self.find_attachment()
+                self.selectors.find(input_name).send_keys("\n".join(name for name, _, _ in batch))
+                for index, (_, kind, caption) in enumerate(batch):
+                    if not caption:
+                        continue
+                    if index:
+                        self.selectors.find_all("media_thumbnail")[index].click()
+                    self.add_caption(caption, media_type=kind)
+                send_button = self.selectors.find("media_send_button")
+                self.pacer.acquire()
+                send_button.click()
+            if self.track_deliveries:
+                self._sent(items[-1][2] or "", self.current_mobile)
+            else:
+                self.waits.wait("upload").until_not(
+                    EC.presence_of_element_located(self.selectors.locator("pending_icon"))
+                )
+                self._sent()
+            self.logger.info(f"{len(items)} attachments have been successfully sent to {self.current_mobile}")
+            return True
+        except (NoSuchElementException, Exception) as bug:
+            self.logger.exception(f"Failed to send attachments to {self.current_mobile} - {bug}")
+            self.pacer.back_off()
+            return False
+        finally:
+            self.logger.info("send_attachments() finished running!")
+
+    def _wait_for_sent(self):
+        if self.track_deliveries and self.last_delivery is not None:
+            # only the message just sent, in the chat still open
+            if not self.deliveries.wait(SENT, deliveries=[self.last_delivery]):
+                raise TimeoutException("Message still pending")
+            return
+        # Waiting for the pending clock icon shows and disappear
+        wait = self.waits.wait("delivery")
+        wait.until(
+            EC.presence_of_element_located(self.selectors.locator("pending_icon"))
+        )
+        wait.until_not(
+            EC.presence_of_element_located(self.selectors.locator("pending_icon"))
+        )
+
     def close_when_message_successfully_sent(self):
         """close_when_message_successfully_sent() [nCKbr]
 
@@ -655,17 +1209,7 @@ class WhatsApp(object):
 
         self.logger.info("Waiting for message status update to close browser...")
         try:
-            # Waiting for the pending clock icon shows and disappear
-            self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-                )
-            )
-            self.wait.until_not(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-                )
-            )
+            self._wait_for_sent()
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a message to {self.current_mobile} - {bug}")
         finally:
@@ -682,118 +1226,226 @@ class WhatsApp(object):
 
         self.logger.info("Waiting for message status update to before continuing...")
         try:
-            # Waiting for the pending clock icon shows and disappear
-            self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-                )
-            )
-            self.wait.until_not(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]')
-                )
-            )
+            self._wait_for_sent()
         except (NoSuchElementException, Exception) as bug:
             self.logger.exception(f"Failed to send a message to {self.current_mobile} - {bug}")
 
-    def get_last_message_received(self, query: str):
+    def _open_chat(self, query: str) -> tuple[bool, str | None]:
+        # opens a chat by phone number or name; returns whether it opened and the title
+        # the chat header shows, so only that chat is read afterwards
+        if normalize_number(query) == query.lstrip("+").replace(" ", ""):
+            # the page was loaded for this number, the header is its chat
+            if not self.find_user(query):
+                return False, None
+            title = self._chat_title()
+            return title is not None, title
+        try:
+            chat = self.chat_index.open(query)
+            if chat is not None:
+                return True, chat["sender"]
+        except WebDriverException as bug:
+            self.logger.warning(f"Indexed chat lookup failed, searching instead: {bug.msg}")
+        title = self._search_chat(query)
+        return title is not None, title
+
+    def get_last_message_received(self, query: str, timeout: float = 10.0) -> ChatMessage | None:
         """get_last_message_received() [nCKbr]
 
-        fetches the last message receive in a given chat, along with couple metadata, retrieved by the "query" parameter provided.
+        fetches the last message received in a given chat, located by the "query" parameter
+        provided. The chat header and the message are read in a single in-page call, which
+        also waits for the chat to render.
 
         Args:
-            query (string): query value to be located in the chat name
+            query (string): phone number, or value to be located in the chat name
+            timeout (float): seconds to wait for the chat to render
+
+        Returns:
+            ChatMessage | None: sender, timestamp, text, media kind and quoted reply of the
+            last incoming message, None when the chat could not be opened or has none
         """
+        return self._last_message_received(query, timeout)[1]
+
+    def _last_message_received(self, query: str, timeout: float) -> tuple[str | None, ChatMessage | None]:
+        # the title of the chat that was read (None when it did not open) and its last message
         try:
-            if self.query_chats(query):
-                self.wait.until(
-                    EC.presence_of_element_located(
-                        (
-                            By.XPATH,
-                            "/html/body/div[1]/div/div/div[4]/div/div[1]/div/div/div[2]/div/div[1]/p",
-                        )
-                    )
-                )
+            opened, title = self._open_chat(query)
+            if not opened:
+                self.logger.info(f'It was not possible to fetch chat "{query}"')
+                return None, None
+            message = last_message(self.driver, title, timeout=timeout)
+            if message is None:
+                self.logger.info(f'No incoming message in "{query}"')
+            else:
+                self.logger.info(f"Message sender: {message.sender}. Message time: {message.timestamp}.")
+            return title, message
+        except Exception as bug:
+            self.logger.exception(f"Exception raised while getting the last message: {bug}")
+            return None, None
 
-                time.sleep(
-                    3
-                )  # clueless on why the previous wait is not respected - we need this sleep to load tha list.
+    def get_last_messages(self, chats, skip_unchanged: bool = True, timeout: float = 10.0) -> dict:
+        """get_last_messages()
 
-                list_of_messages = self.wait.until(
-                    EC.presence_of_all_elements_located((
-                        By.XPATH,
-                        '//div[@id="main"]/div[3]/div[1]/div[2]/div[3]/child::div[contains(@class,"message-in")]')
-                    )
-                )
+        get_last_message_received() for many chats, back to back.
 
-                if len(list_of_messages) == 0:
-                    self.logger.exception(
-                        "It was not possible to retrieve the last message - probably it does not exist."
-                    )
-                else:
-                    msg = list_of_messages[-1]
-
-                    is_default_user = self.wait.until(
-                        EC.presence_of_element_located(
-                            (
-                                By.XPATH,
-                                '//div[@id="main"]/header/div[1]/div[1]/div[1]/span',
-                            )
-                        )
-                    ).get_attribute("data-testid")
-                    if is_default_user == "default-user":
-                        msg_sender = query
-                    else:
-                        msg_sender = msg.text.split("\n")[0]
-
-                    if len(msg.text.split("\n")) > 1:
-                        when = msg.text.split("\n")[-1]
-                        msg = (
-                            msg.text.split("\n")
-                            if "media-play" not in msg.get_attribute("innerHTML") #type:ignore
-                            else "Video or Image"
-                        )
-                    else:
-                        when = msg.text.split("\n")[0]
-                        msg = "Non-text message (maybe emoji?)"
-
-                    header_group = self.wait.until(
-                        EC.presence_of_element_located(
-                            (
-                                By.XPATH,
-                                '//div[@id="main"]/header/div[1]/div[1]/div[1]/span',
-                            )
-                        )
-                    )
-                    header_text = self.wait.until(
-                        EC.presence_of_element_located(
-                            (By.XPATH, '//div[@id="main"]/header/div[2]/div[2]/span')
-                        )
-                    )
+        With skip_unchanged, the chat list is read once up front and a chat whose preview
+        (time and last message) has not changed since the previous call is not opened
+        again, its previous result is returned instead. A chat that gets a new message
+        moves to the top of the list, so the visible rows are enough to notice it.
 
-                    if (
-                        header_group.get_attribute("data-testid") == "default-group"
-                        and msg_sender.strip() in header_text.text
-                    ):
-                        self.logger.info(f"Message sender: {msg_sender}.")
-                    elif (
-                        msg_sender.strip() != msg[0].strip()
-                    ):  # it is not a messages combo
-                        self.logger.info(f"Message sender: {msg_sender}.")
-                    else:
-                        self.logger.info(
-                            f"Message sender: retrievable from previous messages."
-                        )
+        Args:
+            chats (list[str]): phone numbers or chat names
+            skip_unchanged (bool): reuse the previous result of unchanged chats
+            timeout (float): seconds to wait for each chat to render
 
-                    # DISCLAIMER: messages answering other messages carry the previous ones in the text.
-                    # Example: Message text: ['John', 'Mary', 'Hi, John!', 'Hi, Mary! How are you?', '14:01']
-                    # TODO: Implement 'filter_answer' boolean paramenter to sanitize this text based on previous messages search.
+        Returns:
+            dict: chat -> ChatMessage | None
+        """
+        def preview(title):
+            row = self.chat_index.lookup(title, exact=True) if title else None
+            return (row["time"], row["message"]) if row else None
+
+        if skip_unchanged:
+            self.get_list_of_messages()
+        results = {}
+        for chat in chats:
+            previous = self._last_messages.get(chat)
+            # the chat list shows a phone number's chat under its title, known once opened
+            if skip_unchanged and previous and previous[1] is not None and preview(previous[0]) == previous[1]:
+                results[chat] = previous[2]
+                continue
+            title, results[chat] = self._last_message_received(chat, timeout)
+            self._last_messages[chat] = (title, preview(title), results[chat])
+        return results
+
+    def iter_chat_history(self, chat: str | None = None, since: datetime | None = None,
+                          batch_timeout: float = 3.0, max_batches: int | None = None,
+                          date_order: str | None = None):
+        """iter_chat_history()
+
+        Opens the chat and yields its messages newest first, scrolling the message pane
+        back one batch at a time. Only a bounded window of message ids is kept (for
+        de-duplication), so arbitrarily long conversations can be streamed.
 
-                    self.logger.info(f"Message text: {msg}.")
-                    self.logger.info(f"Message time: {when}.")
+        Args:
+            chat (str, optional): phone number or chat name, None for the open chat
+            since (datetime, optional): stop at the first message older than this
+            batch_timeout (float): seconds to wait for an older batch to render
+            max_batches (int, optional): stop after this many scroll-backs
+            date_order (str, optional): order of the day, month and year in the message
+                dates ("DMY", "MDY" or "YMD"), read from the page locale by default
+
+        Yields:
+            ChatMessage: id, chat, sender, timestamp, text, media, quoted, outgoing
+        """
+        if chat is not None and not self._open_chat(chat)[0]:
+            return
+        title = self.selectors.find("chat_title").get_attribute("title") or chat or ""
+        yield from iter_history(
+            self.driver, title, since=since, batch_timeout=batch_timeout,
+            max_batches=max_batches, date_order=date_order,
+        )
 
-        except Exception as bug:
-            self.logger.exception(f"Exception raised while getting first chat: {bug}")
+    def export_chat_history(self, chat: str | None, path, since: datetime | None = None) -> int:
+        """export_chat_history()
+
+        Streams a conversation to a JSON lines file, one message per line, newest first.
+
+        Returns:
+            int: the number of messages written
+        """
+        count = write_jsonl(self.iter_chat_history(chat, since=since), path)
+        self.logger.info(f"Exported {count} messages to {path}")
+        return count
+
+    def scroll_chat_pane(self, position: int) -> dict:
+        """Scrolls the chat list to the given pixel offset and returns the pane geometry
+        (scroll_top, scroll_height, client_height, row_count) once the rows re-rendered."""
+        return self.driver.execute_async_script(SCROLL_CHAT_PANE_JS, position)
+
+    def iter_unread_chats(self, start: int | None = None, limit: int | None = None):
+        """iter_unread_chats()
+
+        yields the unread chats as they scroll into view, one pane height at a time.
+        Every chat carries the "scroll_top" it was seen at, which can be passed back as
+        "start" to resume a scan.
+
+        Args:
+            start (int | None): scroll position (in pixels) to start from, None for the top
+            limit (int | None): stop after this many chats were scanned, None for all of them
+        """
+        position = 0 if start is None else start
+        seen = set()
+        while True:
+            state = self.scroll_chat_pane(position)
+            for chat in self.get_list_of_messages():
+                key = chat.get("row_id") or chat["sender"]
+                if key in seen:
+                    continue
+                seen.add(key)
+                if chat["unread"]:
+                    if isinstance(chat, ChatSummary):
+                        # a copy: the chat index and earlier callers hold the cached record
+                        yield dataclasses.replace(chat, scroll_top=state["scroll_top"])
+                    else:
+                        yield {**chat, "scroll_top": state["scroll_top"]}
+                if limit and len(seen) >= limit:
+                    return
+
+            row_count = state["row_count"]
+            if start is None and row_count and len(seen) >= row_count:
+                return
+            if state["scroll_top"] + state["client_height"] >= state["scroll_height"]:
+                return
+            position = state["scroll_top"] + state["client_height"]
+            self.logger.debug(f"Scanned {len(seen)} of {row_count} chats.")
+
+    def snapshot_chats(self) -> ChatSnapshot:
+        """snapshot_chats()
+
+        Reads the whole chat list, one pane height per round trip, into a columnar
+        ChatSnapshot. Diff two snapshots with ChatSnapshot.diff().
+        """
+        snapshot = ChatSnapshot()
+        seen = set()
+        position = 0
+        while True:
+            state = self.scroll_chat_pane(position)
+            for chat in self.get_list_of_messages():
+                key = chat["row_id"] or chat["sender"]
+                if key not in seen:
+                    seen.add(key)
+                    snapshot.append(chat)
+            if state["scroll_top"] + state["client_height"] >= state["scroll_height"]:
+                break
+            position = state["scroll_top"] + state["client_height"]
+        self.scroll_chat_pane(0)
+        self.chat_index.prune(seen)
+        self.chat_index.complete = True
+        return snapshot
+
+    def chat_changes_since(self, version: int = 0, refresh: bool = True) -> dict:
+        """chat_changes_since()
+
+        The chats added, updated or removed after `version` of the chat index. Chats
+        with new messages move to the top, so refreshing the visible rows (one call,
+        re-parsing only the rows that changed) is usually enough to see them.
+
+            changes = whatsapp.chat_changes_since(0)
+            ...
+            changes = whatsapp.chat_changes_since(changes["version"])
+
+        Args:
+            version (int): the "version" of the previous call, 0 for everything
+            refresh (bool): refresh the visible rows first, False answers from memory
+
+        Returns:
+            dict: {"version": int, "changed": [chat], "removed": [row_id]}
+        """
+        if refresh:
+            self.get_list_of_messages()
+        changes = self.chat_index.changes_since(version)
+        changes["changed"] = self._chat_records(changes["changed"])
+        return changes
 
     def fetch_all_unread_chats(self, limit=True, top=50):
         """fetch_all_unread_chats()  [nCKbr]
@@ -802,61 +1454,16 @@ class WhatsApp(object):
 
         Args:
             limit (boolean): should we limit the counting to a certain number of chats (True) or let it count it all (False)? [default = True]
-            top (int): once limiting, what is the *approximate* number of chats that should be considered? [generally, there are natural chunks of 10-22]
-
-        DISCLAIMER: Apparently, fetch_all_unread_chats functionallity works on most updated browser versions
-        (for example, Chrome Version 102.0.5005.115 (Official Build) (x86_64)). If it fails with you, please
-        consider updating your browser while we work on an alternative for non-updated broswers.
+            top (int): once limiting, what is the number of chats that should be considered?
 
+        See iter_unread_chats() to get the unread chats while the scan is still running.
         """
         try:
-            counter = 0
-            pane = self.wait.until(
-                EC.presence_of_element_located(
-                    (By.XPATH, '//div[@id="pane-side"]/div[2]')
-                )
-            )
-            list_of_messages = self.get_list_of_messages()
-            read_names = []
-            names = []
-            names_data = []
-
-            while True:
-                last_counter = counter
-                for item in list_of_messages:
-                    name = item["sender"]
-                    if name not in read_names:
-                        read_names.append(name)
-                        counter += 1
-                    if item["unread"]:
-                        if name not in names:
-                            names.append(name)
-                            names_data.append(item)
-
-                pane.send_keys(Keys.PAGE_DOWN)
-                pane.send_keys(Keys.PAGE_DOWN)
-
-                list_of_messages = self.get_list_of_messages()
-
-                side_panel = self.wait.until(EC.presence_of_element_located(
-                    (By.XPATH, '//div[@id="pane-side"]/div[2]')))
-                some_weird_counter = side_panel.get_attribute("aria-rowcount")
-                if type(some_weird_counter) is not int:
-                    raise TypeError
-                
-                if (
-                    last_counter == counter
-                    and counter >= int(some_weird_counter) * 0.9
-                ):
-                    break
-                if limit and counter >= top:
-                    break
-
-                self.logger.info(f"The counter value at this chunk is: {counter}.")
-
+            names_data = list(self.iter_unread_chats(limit=top if limit else None))
+            names = [item["sender"] for item in names_data]
             if limit:
                 self.logger.info(
-                    f"The list of unread chats, considering the first {counter} messages, is: {names}."
+                    f"The list of unread chats, considering the first {top} chats, is: {names}."
                 )
             else:
                 self.logger.info(f"The list of all unread chats is: {names}.")
@@ -865,3 +1472,24 @@ class WhatsApp(object):
         except Exception as bug:
             self.logger.exception(f"Exception raised while getting first chat: {bug}")
             return []
+
+    @property
+    def message_stream(self) -> MessageStream:
+        """Incoming message events of this session, see alright.events.MessageStream."""
+        if self._message_stream is None:
+            self._message_stream = MessageStream(self)
+        return self._message_stream
+
+    def on_message(self, callback, kind: str | None = "message"):
+        """on_message()
+
+        Calls the callback for every new incoming message (or unread counter change)
+        pushed by the in-page observer. Use it as a decorator, then iterate
+        self.message_stream or call self.message_stream.run().
+
+        Args:
+            callback (Callable): receives the event dict
+            kind (str | None): "message", "unread", or None for every event
+        """
+        self.message_stream.install()
+        return self.message_stream.on_message(callback, kind)
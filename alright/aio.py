@@ -0,0 +1,148 @@
+"""
+AsyncWhatsApp exposes the blocking WhatsApp methods as coroutines, so that many sessions
+can be driven from a single asyncio event loop.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+
+class AsyncWhatsApp(object):
+    """AsyncWhatsApp()
+
+    Every call runs on a single-thread executor owned by the session, so the driver is
+    only ever used by one thread at a time and calls run in the order they were awaited.
+
+    A call that is cancelled, or whose deadline passes, while it is still queued never
+    reaches the browser. A call that is already running cannot be interrupted mid
+    command; it finishes in the background and the next queued call waits for it.
+
+    Args:
+        whatsapp (WhatsApp): the blocking session to wrap
+        deadline (float | None): default per-call deadline in seconds, None for no deadline
+    """
+
+    def __init__(self, whatsapp, deadline: float | None = None):
+        self.whatsapp = whatsapp
+        self.deadline = deadline
+        self.logger: logging.Logger = whatsapp.logger
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="alright-session"
+        )
+
+    @classmethod
+    def from_driver(cls, driver, deadline: float | None = None, **kwargs):
+        """Builds the blocking WhatsApp session for the driver and wraps it."""
+        from alright import WhatsApp
+
+        return cls(WhatsApp(driver, **kwargs), deadline=deadline)
+
+    async def call(self, method: str, *args, deadline: float | None = None, **kwargs) -> Any:
+        """call()
+
+        Runs any WhatsApp method on the session executor.
+
+        Args:
+            method (str): name of the WhatsApp method
+            deadline (float | None): seconds to wait for the result, defaults to self.deadline
+
+        Raises:
+            asyncio.TimeoutError: the deadline passed before the method returned
+        """
+        loop = asyncio.get_running_loop()
+        func = functools.partial(getattr(self.whatsapp, method), *args, **kwargs)
+        future = loop.run_in_executor(self._executor, func)
+        if deadline is None:
+            deadline = self.deadline
+        if deadline is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"{method}() missed its {deadline}s deadline")
+            raise
+
+    def __getattr__(self, name: str):
+        # Any other public WhatsApp method becomes awaitable too
+        if name.startswith("_") or not callable(getattr(self.whatsapp, name, None)):
+            raise AttributeError(name)
+
+        async def method(*args, deadline: float | None = None, **kwargs):
+            return await self.call(name, *args, deadline=deadline, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    async def login(self, deadline: float | None = None):
+        return await self.call("login", deadline=deadline)
+
+    async def find_user(self, mobile: str, deadline: float | None = None) -> bool:
+        return await self.call("find_user", mobile, deadline=deadline)
+
+    async def send_message1(self, mobile: str, message: str, deadline: float | None = None) -> str:
+        return await self.call("send_message1", mobile, message, deadline=deadline)
+
+    async def send_message_to_current_chat(
+        self, message: str, timeout: float = 0.0, deadline: float | None = None
+    ) -> bool:
+        return await self.call(
+            "send_message_to_current_chat", message, timeout=timeout, deadline=deadline
+        )
+
+    async def send_bulk(self, recipients, message: str, deadline: float | None = None) -> dict:
+        return await self.call("send_bulk", list(recipients), message, deadline=deadline)
+
+    async def send_picture(
+        self, picture: Path, message: Optional[str] = None, deadline: float | None = None
+    ):
+        return await self.call("send_picture", picture, message, deadline=deadline)
+
+    async def send_video(
+        self, video: Path, message: Optional[str] = None, deadline: float | None = None
+    ):
+        return await self.call("send_video", video, message, deadline=deadline)
+
+    async def send_file(
+        self, file_path: str, message: Optional[str] = None, deadline: float | None = None
+    ):
+        return await self.call("send_file", file_path, message, deadline=deadline)
+
+    async def get_list_of_messages(self, deadline: float | None = None) -> list:
+        return await self.call("get_list_of_messages", deadline=deadline)
+
+    async def fetch_all_unread_chats(
+        self, limit=True, top=50, deadline: float | None = None
+    ) -> list:
+        return await self.call("fetch_all_unread_chats", limit, top, deadline=deadline)
+
+    async def get_last_message_received(self, query: str, deadline: float | None = None):
+        return await self.call("get_last_message_received", query, deadline=deadline)
+
+    async def close(self, quit_driver: bool = False, cancel_pending: bool = False):
+        """close()
+
+        Shuts the executor down, waiting for the call that is running (and, unless
+        cancel_pending, the queued ones) to finish, then quits the browser if asked.
+        The driver is never quit while a call may still be using it.
+
+        Args:
+            quit_driver (bool): quit the webdriver once no call is running anymore
+            cancel_pending (bool): cancel the calls still queued instead of running them
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None,
+            functools.partial(self._executor.shutdown, wait=True, cancel_futures=cancel_pending),
+        )
+        if quit_driver:
+            await loop.run_in_executor(None, self.whatsapp.driver.quit)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
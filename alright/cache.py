@@ -0,0 +1,155 @@
+"""
+On-disk cache of which phone numbers are on WhatsApp, so repeat campaigns skip the
+numbers already known to be dead instead of probing them again.
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+VALID = "valid"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+DAY = 24 * 60 * 60
+
+
+def normalize_number(mobile: str) -> str:
+    """Keeps only the digits of a phone number, so "+255 (71) 2" and "255712" match."""
+    return "".join(ch for ch in str(mobile) if ch.isdigit())
+
+
+def default_cache_dir() -> Path:
+    try:
+        from platformdirs import user_cache_dir
+    except ImportError:
+        return Path(os.path.expanduser("~/.cache/alright"))
+    return Path(user_cache_dir("alright"))
+
+
+class RecipientCache(object):
+    """RecipientCache()
+
+    SQLite backed map of normalized phone number -> valid / invalid, with a TTL per status.
+    Expired entries read as unknown.
+
+    Args:
+        path (str | Path | None): database file, defaults to the user cache directory
+        valid_ttl (float): seconds a "valid" status is trusted
+        invalid_ttl (float): seconds an "invalid" status is trusted
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        valid_ttl: float = 30 * DAY,
+        invalid_ttl: float = 14 * DAY,
+    ):
+        if path is None:
+            path = default_cache_dir() / "recipients.sqlite3"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = {VALID: valid_ttl, INVALID: invalid_ttl}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS recipients ("
+            " number TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " checked_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _fresh(self, status: str, checked_at: float, now: float) -> bool:
+        return now - checked_at < self.ttl.get(status, 0)
+
+    def get(self, mobile: str) -> str:
+        """Returns VALID, INVALID or UNKNOWN for the number."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, checked_at FROM recipients WHERE number = ?",
+                (normalize_number(mobile),),
+            ).fetchone()
+        if row and self._fresh(row[0], row[1], time.time()):
+            return row[0]
+        return UNKNOWN
+
+    def statuses(self, mobiles: Iterable[str]) -> dict[str, str]:
+        """Looks up many numbers at once, keyed by the numbers as given."""
+        mobiles = list(mobiles)
+        numbers = {normalize_number(mobile) for mobile in mobiles}
+        found = {}
+        now = time.time()
+        with self._lock:
+            rows = []
+            numbers = list(numbers)
+            # stay under SQLite's host parameter limit
+            for start in range(0, len(numbers), 500):
+                chunk = numbers[start:start + 500]
+                rows += self._db.execute(
+                    "SELECT number, status, checked_at FROM recipients"
+                    f" WHERE number IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+        for number, status, checked_at in rows:
+            if self._fresh(status, checked_at, now):
+                found[number] = status
+        return {mobile: found.get(normalize_number(mobile), UNKNOWN) for mobile in mobiles}
+
+    def set(self, mobile: str, status: str):
+        self.set_many([(mobile, status)])
+
+    def set_many(self, items: Iterable[tuple[str, str]]):
+        """Records (mobile, status) pairs in one transaction. UNKNOWN forgets the number."""
+        now = time.time()
+        known = []
+        forget = []
+        for mobile, status in items:
+            number = normalize_number(mobile)
+            if status == UNKNOWN:
+                forget.append((number,))
+            elif status in self.ttl:
+                known.append((number, status, now))
+            else:
+                raise ValueError(f"Unknown recipient status {status!r}")
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO recipients (number, status, checked_at) VALUES (?, ?, ?)",
+                known,
+            )
+            self._db.executemany("DELETE FROM recipients WHERE number = ?", forget)
+
+    def export(self, path: str | Path, status: str | None = None) -> int:
+        """export()
+
+        Writes the cached numbers to a CSV file with the columns number, status, checked_at.
+
+        Args:
+            path (str | Path): the CSV file to write
+            status (str | None): only export numbers with this status, e.g. INVALID
+
+        Returns:
+            int: number of rows written
+        """
+        query = "SELECT number, status, checked_at FROM recipients"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        written = 0
+        with self._lock, open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["number", "status", "checked_at"])
+            for row in self._db.execute(query, params):
+                writer.writerow(row)
+                written += 1
+        return written
+
+    def close(self):
+        with self._lock:
+            self._db.close()
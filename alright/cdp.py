@@ -0,0 +1,722 @@
+"""
+Chrome DevTools Protocol backend: drives Chrome over one persistent websocket instead of
+sending every command to chromedriver over HTTP, which then relays it to the browser.
+
+CDPDriver implements the driver surface alright uses (alright.driver.Driver), so it can
+be handed to WhatsApp in place of a Selenium driver:
+
+    driver = CDPDriver.launch(user_data_dir=profile_dir("shop-1"))
+    messenger = WhatsApp(driver)
+
+Scripts run through Runtime.evaluate with Selenium's calling convention (`arguments`,
+a callback as last argument for async scripts, elements in and out), navigation goes
+through Page.navigate, typing through Input.insertText / Input.dispatchKeyEvent, and
+file inputs are filled with DOM.setFileInputFiles.
+
+Needs websocket-client, which Selenium already depends on.
+"""
+
+import itertools
+import json
+import logging
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoAlertPresentException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    UnexpectedAlertPresentException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.command import Command
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# Installed in each document on first use: element handles are page-unique ids kept in
+# a WeakMap / WeakRef registry, so elements can cross the wire in both directions
+_PRELUDE_JS = """
+const A = window.__alright || (window.__alright = (() => {
+    const page = Math.random().toString(36).slice(2);
+    const ids = new WeakMap();
+    const nodes = new Map();
+    let next = 0;
+    const isNode = (value) => value instanceof Element || value instanceof Document;
+    const ref = (el) => {
+        let id = ids.get(el);
+        if (id === undefined) {
+            id = page + ':' + (++next);
+            ids.set(el, id);
+            nodes.set(id, new WeakRef(el));
+        }
+        return {__alright_node__: id};
+    };
+    const node = (id) => {
+        const held = nodes.get(id);
+        const el = held && held.deref();
+        if (!el || !el.isConnected) {
+            nodes.delete(id);
+            throw new Error('stale element reference: ' + id);
+        }
+        return el;
+    };
+    const wrap = (value) => {
+        if (value === undefined || value === null) return null;
+        if (isNode(value)) return ref(value);
+        if (value instanceof NodeList || value instanceof HTMLCollection || Array.isArray(value)) {
+            return Array.from(value, wrap);
+        }
+        if (typeof value === 'object') {
+            const out = {};
+            for (const key of Object.keys(value)) out[key] = wrap(value[key]);
+            return out;
+        }
+        return value;
+    };
+    const unwrap = (value) => {
+        if (Array.isArray(value)) return value.map(unwrap);
+        if (value && typeof value === 'object') {
+            if (typeof value.__alright_node__ === 'string') return node(value.__alright_node__);
+            const out = {};
+            for (const key of Object.keys(value)) out[key] = unwrap(value[key]);
+            return out;
+        }
+        return value;
+    };
+    return {ref, node, wrap, unwrap};
+})());
+"""
+
+# Sent instead of the prelude once it is installed, which keeps every command small
+_PRELUDE_MISSING = "alright prelude missing"
+_INSTALLED_JS = f"const A = window.__alright; if (!A) throw new Error('{_PRELUDE_MISSING}');"
+
+# Selenium's locator strategies, run in the page: [using, value, root element or null]
+FIND_ELEMENTS_JS = """
+const [using, value, root] = arguments;
+const scope = root || document;
+switch (using) {
+    case 'id':
+        return Array.from(scope.querySelectorAll('#' + CSS.escape(value)));
+    case 'css selector':
+        return Array.from(scope.querySelectorAll(value));
+    case 'tag name':
+        return Array.from(scope.getElementsByTagName(value));
+    case 'class name':
+        return Array.from(scope.querySelectorAll('.' + CSS.escape(value)));
+    case 'name':
+        return Array.from(scope.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+    case 'link text':
+    case 'partial link text':
+        return Array.from(scope.querySelectorAll('a')).filter((a) => using === 'link text'
+            ? a.innerText.trim() === value : a.innerText.includes(value));
+    case 'xpath': {
+        const found = document.evaluate(value, scope, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const out = [];
+        for (let i = 0; i < found.snapshotLength; i++) out.push(found.snapshotItem(i));
+        return out;
+    }
+}
+throw new Error('Unsupported locator strategy: ' + using);
+"""
+
+# Scrolls the element into view and returns the centre of its box, or null when it
+# has no box (hidden inputs), in which case it was clicked in the page instead
+CLICK_POINT_JS = """
+const el = arguments[0];
+el.scrollIntoView({block: 'center', inline: 'center'});
+const box = el.getBoundingClientRect();
+if (!box.width || !box.height) {
+    el.click();
+    return null;
+}
+return [box.left + box.width / 2, box.top + box.height / 2];
+"""
+
+# Attribute first, then property, like WebElement.get_attribute
+GET_ATTRIBUTE_JS = """
+const [el, name] = arguments;
+if (el.hasAttribute(name)) return el.getAttribute(name);
+const value = el[name];
+return value === undefined || typeof value === 'function' ? null : value;
+"""
+
+# Focuses the element and tells whether it is a file input
+FOCUS_JS = """
+const el = arguments[0];
+if (el.tagName === 'INPUT' && el.type === 'file') return 'file';
+if (document.activeElement !== el) el.focus();
+return 'text';
+"""
+
+CLEAR_JS = """
+const el = arguments[0];
+el.focus();
+if ('value' in el && (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA')) {
+    el.value = '';
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return;
+}
+document.execCommand('selectAll');
+document.execCommand('delete');
+"""
+
+TEXT_JS = "return arguments[0].innerText;"
+
+ACTIVE_ELEMENT_JS = "return document.activeElement || document.body;"
+
+# Selenium key -> (key, code, Windows virtual key code, text typed)
+KEY_EVENTS = {
+    Keys.ENTER: ("Enter", "Enter", 13, "\r"),
+    Keys.RETURN: ("Enter", "Enter", 13, "\r"),
+    Keys.SPACE: (" ", "Space", 32, " "),
+    Keys.TAB: ("Tab", "Tab", 9, "\t"),
+    Keys.BACKSPACE: ("Backspace", "Backspace", 8, None),
+    Keys.DELETE: ("Delete", "Delete", 46, None),
+    Keys.ESCAPE: ("Escape", "Escape", 27, None),
+    Keys.ARROW_DOWN: ("ArrowDown", "ArrowDown", 40, None),
+    Keys.ARROW_UP: ("ArrowUp", "ArrowUp", 38, None),
+    Keys.ARROW_LEFT: ("ArrowLeft", "ArrowLeft", 37, None),
+    Keys.ARROW_RIGHT: ("ArrowRight", "ArrowRight", 39, None),
+    Keys.PAGE_DOWN: ("PageDown", "PageDown", 34, None),
+    Keys.PAGE_UP: ("PageUp", "PageUp", 33, None),
+    Keys.HOME: ("Home", "Home", 36, None),
+    Keys.END: ("End", "End", 35, None),
+}
+# Selenium modifier key -> (key, code, virtual key code, CDP modifier bit)
+MODIFIERS = {
+    Keys.SHIFT: ("Shift", "ShiftLeft", 16, 8),
+    Keys.CONTROL: ("Control", "ControlLeft", 17, 2),
+    Keys.ALT: ("Alt", "AltLeft", 18, 1),
+    Keys.COMMAND: ("Meta", "MetaLeft", 91, 4),
+}
+
+
+class CDPElement(object):
+    """An element of the page, referenced by its id in the page-side registry."""
+
+    def __init__(self, parent: "CDPDriver", id: str):
+        self.parent = parent
+        self.id = id
+
+    def __eq__(self, other):
+        return isinstance(other, CDPElement) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<CDPElement {self.id}>"
+
+    @property
+    def text(self) -> str:
+        return self.parent.execute_script(TEXT_JS, self) or ""
+
+    def get_attribute(self, name: str):
+        return self.parent.execute_script(GET_ATTRIBUTE_JS, self, name)
+
+    def click(self):
+        point = self.parent.execute_script(CLICK_POINT_JS, self)
+        if point is not None:
+            self.parent.click_at(*point)
+
+    def clear(self):
+        self.parent.execute_script(CLEAR_JS, self)
+
+    def send_keys(self, *value):
+        text = "".join(str(part) for part in value)
+        if self.parent.execute_script(FOCUS_JS, self) == "file":
+            self.parent.set_files(self, [path for path in text.split("\n") if path])
+        else:
+            self.parent.type_text(text)
+
+    def find_elements(self, by=By.ID, value=None) -> list:
+        return self.parent.find_elements(by, value, root=self)
+
+    def find_element(self, by=By.ID, value=None):
+        return self.parent.find_element(by, value, root=self)
+
+
+class CDPAlert(object):
+    """The JavaScript dialog open in the page, like selenium's Alert."""
+
+    def __init__(self, parent: "CDPDriver", dialog: dict):
+        self.parent = parent
+        self._dialog = dialog
+        self._prompt = None
+
+    @property
+    def text(self) -> str:
+        return self._dialog.get("message", "")
+
+    def send_keys(self, text: str):
+        self._prompt = text
+
+    def accept(self):
+        self.parent.handle_dialog(True, self._prompt)
+
+    def dismiss(self):
+        self.parent.handle_dialog(False)
+
+
+class CDPSwitchTo(object):
+    def __init__(self, parent: "CDPDriver"):
+        self.parent = parent
+
+    @property
+    def alert(self) -> CDPAlert:
+        self.parent.pump()
+        if self.parent.dialog is None:
+            raise NoAlertPresentException()
+        return CDPAlert(self.parent, self.parent.dialog)
+
+    @property
+    def active_element(self) -> CDPElement:
+        return self.parent.execute_script(ACTIVE_ELEMENT_JS)
+
+
+class CDPDriver(object):
+    """CDPDriver()
+
+    Args:
+        ws_url (str): webSocketDebuggerUrl of the page target
+        process (subprocess.Popen | None): the Chrome process to stop on quit()
+        owned_dir (str | None): a temporary profile directory to delete on quit()
+        timeout (float): seconds to wait for the answer to a command, on top of
+            script_timeout for async scripts
+        page_load_timeout (float): seconds get() waits for the load event
+        script_timeout (float): seconds an async script may take to call back
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, ws_url: str, process: subprocess.Popen | None = None,
+                 owned_dir: str | None = None, timeout: float = 30,
+                 page_load_timeout: float = 60, script_timeout: float = 30,
+                 logger: logging.Logger | None = None):
+        if websocket is None:
+            raise ImportError("CDPDriver needs websocket-client: pip install websocket-client")
+        self.ws_url = ws_url
+        self.process = process
+        self.owned_dir = owned_dir
+        self.timeout = timeout
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout = script_timeout
+        self.logger = logger or logging.getLogger("alright")
+        self.switch_to = CDPSwitchTo(self)
+        self.dialog: dict | None = None
+        self.current_url = "about:blank"
+        self._modifiers = 0
+        self._loaded = threading.Event()
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self.execute("Page.enable")
+        history = self.execute("Page.getNavigationHistory")["value"]
+        if history.get("entries"):
+            self.current_url = history["entries"][history["currentIndex"]]["url"]
+
+    # -- starting -------------------------------------------------------------
+
+    @classmethod
+    def connect(cls, host: str = "127.0.0.1", port: int = 9222, **kwargs) -> "CDPDriver":
+        """Attaches to the first page of a Chrome started with --remote-debugging-port."""
+        with urllib.request.urlopen(f"http://{host}:{port}/json/list", timeout=10) as response:
+            targets = json.load(response)
+        pages = [target for target in targets if target.get("type") == "page"]
+        if not pages:
+            raise WebDriverException(f"No page target on {host}:{port}")
+        return cls(pages[0]["webSocketDebuggerUrl"], **kwargs)
+
+    @classmethod
+    def launch(cls, binary: str | None = None, user_data_dir: str | Path | None = None,
+               headless: bool = False, arguments: tuple = (), startup_timeout: float = 30,
+               **kwargs) -> "CDPDriver":
+        """launch()
+
+        Starts Chrome with remote debugging on a free port and connects to it.
+
+        Args:
+            binary (str | None): the Chrome executable, looked up on PATH by default
+            user_data_dir (str | Path | None): the profile, a temporary one by default
+            headless (bool): run without a window
+            arguments (tuple): extra Chrome command line switches
+            startup_timeout (float): seconds to wait for the DevTools endpoint
+        """
+        binary = binary or next(filter(None, map(shutil.which, CHROME_BINARIES)), None)
+        if binary is None:
+            raise WebDriverException(f"No Chrome binary found, tried {', '.join(CHROME_BINARIES)}")
+        owned_dir = None
+        if user_data_dir is None:
+            user_data_dir = owned_dir = tempfile.mkdtemp(prefix="alright-cdp-")
+        profile = Path(user_data_dir)
+        profile.mkdir(parents=True, exist_ok=True)
+        # Chrome writes the port it picked here; a leftover file would point at a dead one
+        port_file = profile / "DevToolsActivePort"
+        port_file.unlink(missing_ok=True)
+        command = [
+            binary,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={profile}",
+            "--profile-directory=Default",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *(["--headless=new"] if headless else []),
+            *arguments,
+            "about:blank",
+        ]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise WebDriverException(f"Chrome exited with code {process.returncode} on startup")
+            lines = port_file.read_text().split() if port_file.exists() else []
+            if lines:
+                break
+            if time.monotonic() >= deadline:
+                process.kill()
+                raise TimeoutException(f"Chrome did not open its DevTools port within {startup_timeout}s")
+            time.sleep(0.05)
+        try:
+            return cls.connect(port=int(lines[0]), process=process, owned_dir=owned_dir, **kwargs)
+        except Exception:
+            process.kill()
+            raise
+
+    # -- protocol -------------------------------------------------------------
+
+    def _event(self, message: dict):
+        method, params = message["method"], message.get("params", {})
+        if method == "Page.javascriptDialogOpening":
+            self.dialog = params
+        elif method == "Page.javascriptDialogClosed":
+            self.dialog = None
+        elif method == "Page.loadEventFired":
+            self._loaded.set()
+        elif method == "Page.frameNavigated" and not params["frame"].get("parentId"):
+            self.current_url = params["frame"]["url"]
+        elif method == "Page.navigatedWithinDocument":
+            self.current_url = params["url"]
+        elif method in ("Inspector.detached", "Inspector.targetCrashed"):
+            raise WebDriverException(f"DevTools connection lost: {method} {params}")
+
+    def _receive(self) -> dict:
+        try:
+            return json.loads(self._ws.recv())
+        except (websocket.WebSocketTimeoutException, BlockingIOError, ssl.SSLWantReadError):
+            # the last two: nothing to read on a non-blocking socket, see _receive_within()
+            raise TimeoutException("No answer from Chrome over DevTools") from None
+        except (websocket.WebSocketException, OSError) as bug:
+            raise WebDriverException(f"DevTools connection lost: {bug}") from None
+
+    def _receive_within(self, timeout: float) -> dict | None:
+        # the next message if one comes within `timeout` seconds (0: only one already
+        # there), None otherwise. Reading through websocket-client rather than selecting
+        # on its socket also returns what it (or TLS) already buffered.
+        self._ws.settimeout(timeout)
+        try:
+            return self._receive()
+        except TimeoutException:
+            return None
+        finally:
+            self._ws.settimeout(self.timeout)
+
+    def pump(self):
+        """Handles the events already received, without waiting."""
+        with self._lock:
+            while (message := self._receive_within(0)) is not None:
+                if "method" in message:
+                    self._event(message)
+
+    def _dismiss_unexpected_dialog(self):
+        # like chromedriver's default "dismiss and notify"
+        text = self.dialog.get("message", "")
+        self.handle_dialog(False)
+        raise UnexpectedAlertPresentException(alert_text=text)
+
+    def execute(self, driver_command: str, params: dict | None = None,
+                timeout: float | None = None) -> dict:
+        """execute()
+
+        Sends one DevTools command ("Domain.method") and returns {"value": result}.
+        Selenium's W3C "actions" commands (what ActionChains sends) are translated to
+        Input events.
+
+        Args:
+            timeout (float | None): seconds to wait for the answer, self.timeout by default
+        """
+        if driver_command == Command.W3C_ACTIONS:
+            self._perform_actions(params["actions"])
+            return {"value": None}
+        if driver_command == Command.W3C_CLEAR_ACTIONS:
+            self._modifiers = 0
+            return {"value": None}
+        with self._lock:
+            if self.dialog is not None and not driver_command.startswith("Page."):
+                self._dismiss_unexpected_dialog()
+            command_id = next(self._ids)
+            self._ws.send(json.dumps({"id": command_id, "method": driver_command, "params": params or {}}))
+            if timeout is not None:
+                self._ws.settimeout(timeout)
+            try:
+                while True:
+                    message = self._receive()
+                    if message.get("id") == command_id:
+                        break
+                    if "method" in message:
+                        self._event(message)
+                        # a dialog blocks scripts until it is handled: answer for it
+                        if self.dialog is not None and driver_command.startswith("Runtime."):
+                            self._dismiss_unexpected_dialog()
+            finally:
+                if timeout is not None:
+                    self._ws.settimeout(self.timeout)
+        if "error" in message:
+            error = message["error"]
+            raise WebDriverException(f"{driver_command} failed: {error.get('message')} {error.get('data', '')}".strip())
+        return {"value": message.get("result", {})}
+
+    def handle_dialog(self, accept: bool, prompt: str | None = None):
+        params = {"accept": accept}
+        if prompt is not None:
+            params["promptText"] = prompt
+        self.execute("Page.handleJavaScriptDialog", params)
+        self.dialog = None
+
+    # -- scripts --------------------------------------------------------------
+
+    def _encode(self, value):
+        if isinstance(value, CDPElement):
+            return {"__alright_node__": value.id}
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        return value
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, dict):
+            if isinstance(value.get("__alright_node__"), str) and len(value) == 1:
+                return CDPElement(self, value["__alright_node__"])
+            return {key: self._decode(item) for key, item in value.items()}
+        return value
+
+    def _evaluate(self, body: str, await_promise: bool = False, by_value: bool = True) -> dict:
+        """Runs a function body that sees the element registry as `A`."""
+        try:
+            return self._run("(() => {" + _INSTALLED_JS + body + "})()", await_promise, by_value)
+        except JavascriptException as bug:
+            if _PRELUDE_MISSING not in bug.msg:
+                raise
+        # first command in this document
+        return self._run("(() => {" + _PRELUDE_JS + body + "})()", await_promise, by_value)
+
+    def _run(self, expression: str, await_promise: bool, by_value: bool) -> dict:
+        # an awaited promise may take script_timeout to settle, the page's own timer
+        # must fire before the websocket gives up on the answer
+        result = self.execute("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": by_value,
+            "awaitPromise": await_promise,
+            "userGesture": True,
+        }, timeout=self.script_timeout + self.timeout if await_promise else None)["value"]
+        details = result.get("exceptionDetails")
+        if details:
+            exception = details.get("exception") or {}
+            message = exception.get("description") or details.get("text", "")
+            if "stale element reference" in message:
+                raise StaleElementReferenceException(message)
+            raise JavascriptException(message)
+        return result["result"]
+
+    def execute_script(self, script: str, *args):
+        """Runs a script with Selenium's conventions, in one Runtime.evaluate."""
+        body = (
+            "const args = A.unwrap(" + json.dumps(self._encode(list(args))) + ");"
+            + "return A.wrap((function() {\n" + script + "\n}).apply(window, args));"
+        )
+        return self._decode(self._evaluate(body).get("value"))
+
+    def execute_async_script(self, script: str, *args):
+        """Runs a script that calls back (its last argument), awaiting it in the page."""
+        body = (
+            "const args = A.unwrap(" + json.dumps(self._encode(list(args))) + ");"
+            + "return new Promise((resolve, reject) => {"
+            + f"const timer = setTimeout(() => reject(new Error('script timeout')), {int(self.script_timeout * 1000)});"
+            + "args.push((value) => { clearTimeout(timer); resolve(A.wrap(value)); });"
+            + "try { (function() {\n" + script + "\n}).apply(window, args); }"
+            + " catch (e) { clearTimeout(timer); reject(e); }"
+            + "});"
+        )
+        try:
+            return self._decode(self._evaluate(body, await_promise=True).get("value"))
+        except JavascriptException as bug:
+            if "script timeout" in bug.msg:
+                raise TimeoutException(f"Script did not call back within {self.script_timeout}s") from None
+            raise
+
+    # -- navigation and elements ----------------------------------------------
+
+    def get(self, url: str):
+        """Navigates and waits for the load event, like WebDriver's get."""
+        self._loaded.clear()
+        result = self.execute("Page.navigate", {"url": url})["value"]
+        if result.get("errorText"):
+            raise WebDriverException(f"Navigation to {url} failed: {result['errorText']}")
+        self.current_url = url
+        if not result.get("loaderId"):
+            # same-document navigation, no load event comes
+            return
+        deadline = time.monotonic() + self.page_load_timeout
+        while not self._loaded.is_set():
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"{url} did not load within {self.page_load_timeout}s")
+            with self._lock:
+                message = self._receive_within(min(0.05, max(0.0, deadline - time.monotonic())))
+                if message is not None and "method" in message:
+                    self._event(message)
+
+    def find_elements(self, by=By.ID, value=None, root: CDPElement | None = None) -> list:
+        return self.execute_script(FIND_ELEMENTS_JS, by, value, root)
+
+    def find_element(self, by=By.ID, value=None, root: CDPElement | None = None) -> CDPElement:
+        found = self.find_elements(by, value, root=root)
+        if not found:
+            raise NoSuchElementException(f"Unable to locate element: {by}={value}")
+        return found[0]
+
+    def object_id(self, element: CDPElement) -> str:
+        """The DevTools RemoteObject id of an element, for DOM.* commands."""
+        return self._evaluate(f"return A.node({json.dumps(element.id)});", by_value=False)["objectId"]
+
+    def set_files(self, element: CDPElement, paths: list[str]):
+        """Fills a file input, which fires its input and change events."""
+        files = [str(Path(path).resolve()) for path in paths]
+        self.execute("DOM.setFileInputFiles", {"files": files, "objectId": self.object_id(element)})
+
+    # -- input ----------------------------------------------------------------
+
+    def click_at(self, x: float, y: float):
+        for kind in ("mousePressed", "mouseReleased"):
+            self.execute("Input.dispatchMouseEvent", {
+                "type": kind, "x": x, "y": y, "button": "left", "clickCount": 1,
+                "modifiers": self._modifiers,
+            })
+
+    def _key(self, kind: str, key: str):
+        if key in MODIFIERS:
+            name, code, key_code, bit = MODIFIERS[key]
+            self._modifiers = self._modifiers | bit if kind == "keyDown" else self._modifiers & ~bit
+            self.execute("Input.dispatchKeyEvent", {
+                "type": "rawKeyDown" if kind == "keyDown" else "keyUp", "key": name, "code": code,
+                "windowsVirtualKeyCode": key_code, "modifiers": self._modifiers,
+            })
+            return
+        if key in KEY_EVENTS:
+            name, code, key_code, text = KEY_EVENTS[key]
+        else:
+            name, code, key_code, text = key, "", ord(key.upper()) if len(key) == 1 else 0, key
+        event = {
+            "type": kind, "key": name, "code": code, "windowsVirtualKeyCode": key_code,
+            "modifiers": self._modifiers,
+        }
+        if kind == "keyDown" and text:
+            event["text"] = text
+        elif kind == "keyDown":
+            event["type"] = "rawKeyDown"
+        self.execute("Input.dispatchKeyEvent", event)
+
+    def type_text(self, text: str):
+        """type_text()
+
+        Types into the focused element: runs of plain text in one Input.insertText each,
+        Selenium keys (and newlines, as Enter) as key events. Modifiers stay down until
+        pressed again or the end of the text, like send_keys.
+        """
+        run = []
+
+        def flush():
+            if run:
+                self.execute("Input.insertText", {"text": "".join(run)})
+                run.clear()
+
+        for char in text:
+            if char == "\n":
+                char = Keys.ENTER
+            if char in MODIFIERS:
+                flush()
+                bit = MODIFIERS[char][3]
+                self._key("keyUp" if self._modifiers & bit else "keyDown", char)
+            elif char in KEY_EVENTS or (self._modifiers and char.strip()):
+                flush()
+                self._key("keyDown", char)
+                self._key("keyUp", char)
+            else:
+                run.append(char)
+        flush()
+        for key, (_, _, _, bit) in MODIFIERS.items():
+            if self._modifiers & bit:
+                self._key("keyUp", key)
+
+    def _perform_actions(self, actions: list):
+        # W3C actions run tick by tick, one action per input source and tick; the pointer
+        # and wheel sources ActionChains always sends are only pauses for key chains
+        ticks = max((len(device["actions"]) for device in actions), default=0)
+        for tick in range(ticks):
+            pause = 0
+            for device in actions:
+                if tick >= len(device["actions"]):
+                    continue
+                action = device["actions"][tick]
+                if action["type"] in ("keyDown", "keyUp"):
+                    self._key(action["type"], action["value"])
+                elif action["type"] == "pause":
+                    pause = max(pause, action.get("duration") or 0)
+                else:
+                    raise WebDriverException(f"CDPDriver only supports key actions, not {action['type']}")
+            if pause:
+                time.sleep(pause / 1000)
+
+    # -- closing --------------------------------------------------------------
+
+    def close(self):
+        """Closes the page, which ends the session."""
+        try:
+            self.execute("Page.close")
+        except WebDriverException:
+            pass
+        self.quit()
+
+    def quit(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.owned_dir is not None:
+            shutil.rmtree(self.owned_dir, ignore_errors=True)
+            self.owned_dir = None
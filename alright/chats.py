@@ -0,0 +1,232 @@
+"""
+In-memory index of the chat list, so a chat can be opened by name without walking the
+list row by row with the arrow keys.
+
+It doubles as a cache: the page keeps a fingerprint of every row it handed over,
+refreshes only re-parse the rows whose fingerprint changed, and each change bumps a
+version so callers can ask for what changed since they last looked. Cached records are
+never changed in place, a changed row is stored as a new ChatSummary.
+"""
+
+import dataclasses
+import logging
+import uuid
+
+from alright.summary import ChatSummary
+
+# Scrolls the (virtualized) chat list so the row is rendered and returns it, or null
+JUMP_TO_ROW_JS = """
+const [rowIndex, rowId, name, rowsXPath] = arguments;
+const done = arguments[arguments.length - 1];
+const pane = document.getElementById('pane-side');
+const sample = pane.querySelector('[aria-rowindex]');
+const height = sample ? sample.getBoundingClientRect().height || 72 : 72;
+pane.scrollTop = Math.max(0, (rowIndex - 1) * height - pane.clientHeight / 2);
+requestAnimationFrame(() => requestAnimationFrame(() => {
+    const snapshot = document.evaluate(
+        rowsXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        const row = snapshot.snapshotItem(i);
+        const keyed = row.querySelector('[data-id]');
+        const title = row.querySelector('span[title]');
+        if ((rowId && keyed && keyed.getAttribute('data-id') === rowId)
+            || (title && title.getAttribute('title') === name)) {
+            done(row);
+            return;
+        }
+    }
+    done(null);
+}));
+"""
+
+
+def _content(chat) -> tuple:
+    return (chat["sender"], chat["time"], chat["message"], chat["unread"],
+            chat["no_of_unread"], chat["group"], chat.get("pinned"), chat.get("muted"))
+
+
+class ChatIndex(object):
+    """ChatIndex()
+
+    Maps chat names and row ids to their position in the chat list. Every chat list
+    scrape of the session updates it, and a full rebuild scrolls the pane one page at a
+    time. Opening an indexed chat costs one scroll-and-find call plus one click.
+
+    Rows are ChatSummary records keyed by row id. `version` goes up with every row
+    that is added, changed or removed; see changes_since().
+
+    Args:
+        whatsapp (WhatsApp): the session whose chat list is indexed
+        rows_xpath (str): XPath of the chat list rows
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, whatsapp, rows_xpath: str):
+        self.whatsapp = whatsapp
+        self.rows_xpath = rows_xpath
+        self.logger = whatsapp.logger
+        self._rows: dict[str, ChatSummary] = {}
+        self._names: dict[str, str] = {}
+        # names this index's row fingerprints in the page; ids it dropped are sent back
+        # with the next refresh so the page parses those rows again
+        self.token = uuid.uuid4().hex
+        self._forgotten: set[str] = set()
+        # row id -> version of its last change, or of its removal
+        self._changed: dict[str, int] = {}
+        self._removed: dict[str, int] = {}
+        self.version = 0
+        self.complete = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _store(self, key: str, chat: ChatSummary):
+        previous = self._rows.get(key)
+        if previous is not None and previous["sender"] != chat["sender"]:
+            self._names.pop(previous["sender"].upper(), None)
+        self._rows[key] = chat
+        self._names[chat["sender"].upper()] = key
+        if previous is None or _content(previous) != _content(chat):
+            self.version += 1
+            self._changed[key] = self.version
+            self._removed.pop(key, None)
+
+    def take_forgotten(self) -> list[str]:
+        """The row ids to drop from the page's fingerprints, for REFRESH_CHAT_ROWS_JS."""
+        forgotten = list(self._forgotten)
+        self._forgotten.clear()
+        return forgotten
+
+    def apply(self, rows: list[dict], parse) -> list[ChatSummary]:
+        """apply()
+
+        Merges the result of REFRESH_CHAT_ROWS_JS. Unchanged rows only carry their id and
+        position and are answered from memory; the others are parsed with `parse`. A row
+        that moved is stored as a copy with its new position, which is not a change.
+
+        Args:
+            rows (list[dict]): the rows returned by the script, in page order
+            parse (Callable): turns a full row into a ChatSummary
+
+        Returns:
+            list[ChatSummary]: the rendered rows, in page order
+        """
+        chats = []
+        for row in rows:
+            key = row["row_id"]
+            chat = self._rows.get(key) if "sender" not in row else None
+            if chat is None:
+                if "sender" not in row:
+                    # known to the page but no longer held here, it comes back parsed next time
+                    self._forgotten.add(key)
+                    continue
+                chat = parse(row)
+                self._store(key, chat)
+            elif chat.row_index != row["row_index"]:
+                chat = dataclasses.replace(chat, row_index=row["row_index"])
+                self._store(key, chat)
+            chats.append(chat)
+        return chats
+
+    def prune(self, seen):
+        """Drops the rows whose id is not in `seen`, after a walk of the whole list."""
+        for key in [key for key in self._rows if key not in seen]:
+            chat = self._rows.pop(key)
+            if self._names.get(chat["sender"].upper()) == key:
+                del self._names[chat["sender"].upper()]
+            self._forgotten.add(key)
+            self._changed.pop(key, None)
+            self.version += 1
+            self._removed[key] = self.version
+
+    def changes_since(self, version: int) -> dict:
+        """changes_since()
+
+        What changed in the chat list after `version`, from memory.
+
+        Returns:
+            dict: {"version": current version, "changed": [ChatSummary] added or updated,
+            in list order, "removed": [row_id]}
+        """
+        changed = [self._rows[key] for key, at in self._changed.items() if at > version]
+        changed.sort(key=lambda chat: chat["row_index"] or 0)
+        removed = [key for key, at in self._removed.items() if at > version]
+        return {"version": self.version, "changed": changed, "removed": removed}
+
+    def rebuild(self):
+        """Walks the whole chat list, one pane height per round trip, re-parsing only
+        the rows that changed, and drops the chats that are gone."""
+        seen = set()
+        position = 0
+        while True:
+            state = self.whatsapp.scroll_chat_pane(position)
+            for chat in self.whatsapp.get_list_of_messages():
+                seen.add(chat["row_id"] or chat["sender"])
+            if state["scroll_top"] + state["client_height"] >= state["scroll_height"]:
+                break
+            position = state["scroll_top"] + state["client_height"]
+        self.whatsapp.scroll_chat_pane(0)
+        self.prune(seen)
+        self.complete = True
+        self.logger.info(f"Indexed {len(self._rows)} chats.")
+
+    def lookup(self, query: str, exact: bool = False) -> ChatSummary | None:
+        """lookup()
+
+        Finds a chat in memory, without touching the driver.
+
+        Args:
+            query (str): the chat name, or part of it unless exact is set
+            exact (bool): only match the whole name (case insensitive)
+
+        Returns:
+            ChatSummary | None: the chat row, with its "row_index"
+        """
+        needle = query.upper()
+        key = self._names.get(needle)
+        if key is None and not exact:
+            matches = [
+                row for row in self._rows.values() if needle in row["sender"].upper()
+            ]
+            if matches:
+                return min(matches, key=lambda row: row["row_index"])
+        return self._rows.get(key) if key else None
+
+    def _jump(self, chat: dict):
+        return self.whatsapp.driver.execute_async_script(
+            JUMP_TO_ROW_JS,
+            chat["row_index"],
+            chat.get("row_id"),
+            chat["sender"],
+            self.rows_xpath,
+        )
+
+    def open(self, query: str, exact: bool = False) -> ChatSummary | None:
+        """open()
+
+        Scrolls straight to the chat and clicks it. A miss (or a row that moved) refreshes
+        the index once and retries.
+
+        Returns:
+            ChatSummary | None: the opened chat row, None if there is no such chat
+        """
+        for attempt in range(2):
+            chat = self.lookup(query, exact=exact)
+            if chat is not None:
+                row = self._jump(chat)
+                if row is not None:
+                    row.click()
+                    return chat
+            if attempt == 0:
+                if chat is None and self.complete:
+                    # a complete index that does not know the name: look at the top
+                    # of the list only, where new chats show up
+                    self.whatsapp.scroll_chat_pane(0)
+                    self.whatsapp.get_list_of_messages()
+                    if self.lookup(query, exact=exact) is None:
+                        return None
+                else:
+                    self.rebuild()
+        return None
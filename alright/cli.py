@@ -0,0 +1,309 @@
+"""
+The `alright` command: bulk sends from a CSV or JSON lines campaign file.
+
+    alright send campaign.csv --message "Hi {name}, your order {order} shipped" \
+        --accounts shop-1 shop-2 --results results.csv
+
+Rows are streamed from the file and handed to one worker thread per browser session
+through a bounded queue, and every result is written (and flushed) as soon as it is
+known, so memory stays flat whatever the size of the file.
+"""
+
+import argparse
+import csv
+import functools
+import io
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TextIO
+
+from alright.cache import normalize_number
+
+STATUSES = {"1": "sent", "3": "failed", "4": "invalid"}
+RESULT_FIELDS = ["row", "mobile", "status", "seconds", "session", "error"]
+
+# sentinel a worker puts on the result queue when it stops
+_DONE = object()
+
+
+def _open(path: str) -> TextIO:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def read_rows(path: str, fmt: str | None = None) -> Iterator[dict]:
+    """read_rows()
+
+    Streams the rows of a CSV or JSON lines file as dicts, one at a time.
+
+    Args:
+        path (str): the file, "-" for stdin
+        fmt (str | None): "csv" or "jsonl", guessed from the extension by default
+    """
+    fmt = fmt or ("jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson") else "csv")
+    with _open(path) as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ResultWriter(object):
+    """Appends one CSV line per result and flushes it, so a crash loses nothing."""
+
+    def __init__(self, path: str):
+        self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, result: dict):
+        self._writer.writerow(result)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class Progress(object):
+    """Progress()
+
+    One status line on stderr, redrawn at most every `every` seconds. With draw=False it
+    only counts.
+    """
+
+    def __init__(self, stream: TextIO | None = None, every: float = 0.5, draw: bool = True):
+        self.stream = stream or sys.stderr
+        self.every = every
+        self.draw = draw
+        self.counts = {status: 0 for status in (*STATUSES.values(), "skipped")}
+        self.started = time.monotonic()
+        self._drawn = 0.0
+        self._width = 0
+
+    @property
+    def done(self) -> int:
+        return sum(self.counts.values())
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.counts["sent"] / elapsed if elapsed else 0.0
+        minutes, seconds = divmod(int(elapsed), 60)
+        counts = " ".join(f"{status} {count}" for status, count in self.counts.items())
+        return f"{self.done} rows | {counts} | {rate:.2f} msg/s | {minutes:02d}:{seconds:02d}"
+
+    def update(self, status: str):
+        self.counts[status] += 1
+        now = time.monotonic()
+        if self.draw and now - self._drawn >= self.every:
+            self._drawn = now
+            self._redraw()
+
+    def _redraw(self, end: str = ""):
+        line = self.line()
+        # pad over the end of a longer previous line
+        self.stream.write("\r" + line.ljust(self._width) + end)
+        self.stream.flush()
+        self._width = len(line)
+
+    def finish(self):
+        if self.draw:
+            self._redraw("\n")
+
+
+def _send_row(messenger, row: dict, template: str | None, mobile_column: str,
+              file_column: str | None) -> tuple[str, str, str | None]:
+    mobile = normalize_number(row.get(mobile_column) or "")
+    if not mobile:
+        return mobile, "skipped", f"no {mobile_column!r} value"
+    try:
+        message = template.format_map(row) if template is not None else row.get("message")
+    except (KeyError, IndexError, ValueError) as bug:
+        return mobile, "skipped", f"template: {bug!r}"
+    path = row.get(file_column) if file_column else None
+    if path:
+        if messenger.open_chat_in_app(mobile) is None:
+            return mobile, "invalid", None
+        if messenger.send_attachments([path], [message]):
+            return mobile, "sent", None
+        return mobile, "failed", "send_attachments failed"
+    if not message:
+        return mobile, "skipped", "empty message"
+    return mobile, STATUSES.get(messenger.send_message_in_app(mobile, message).strip(), "failed"), None
+
+
+def _worker(session: str, messenger, rows: queue.Queue, results: queue.Queue, send: Callable):
+    try:
+        while True:
+            item = rows.get()
+            if item is None:
+                break
+            number, row = item
+            started = time.perf_counter()
+            try:
+                mobile, status, error = send(messenger, row)
+            except Exception as bug:
+                mobile, status, error = "", "failed", repr(bug)
+            results.put({
+                "row": number,
+                "mobile": mobile,
+                "status": status,
+                "seconds": f"{time.perf_counter() - started:.3f}",
+                "session": session,
+                "error": error or "",
+            })
+    finally:
+        results.put(_DONE)
+
+
+def send_campaign(rows: Iterable[dict], messengers: dict, write: Callable[[dict], None],
+                  template: str | None = None, mobile_column: str = "mobile",
+                  file_column: str | None = None, progress: Progress | None = None,
+                  backlog: int = 4) -> dict:
+    """send_campaign()
+
+    Sends one message per row, spread over the given sessions.
+
+    Args:
+        rows (Iterable[dict]): the campaign rows, consumed lazily
+        messengers (dict): session name -> ready WhatsApp session, one worker each
+        write (Callable): called with every result dict (RESULT_FIELDS) as it comes in
+        template (str | None): message template filled with the row's columns
+            (str.format_map), None sends the row's "message" column
+        mobile_column (str): the column holding the phone number
+        file_column (str | None): a column holding a file to send, with the message as
+            caption
+        progress (Progress | None): live status line
+        backlog (int): rows queued per session ahead of the workers
+
+    Returns:
+        dict: results per status, with the elapsed seconds and messages per second
+    """
+    progress = progress or Progress(draw=False)
+    pending: queue.Queue = queue.Queue(maxsize=backlog * len(messengers))
+    results: queue.Queue = queue.Queue()
+    send = functools.partial(
+        _send_row, template=template, mobile_column=mobile_column, file_column=file_column
+    )
+    workers = [
+        threading.Thread(target=_worker, args=(name, messenger, pending, results, send), daemon=True)
+        for name, messenger in messengers.items()
+    ]
+    for worker in workers:
+        worker.start()
+
+    unreadable = []
+
+    def feed():
+        try:
+            for number, row in enumerate(rows, start=1):
+                pending.put((number, row))
+        except Exception as bug:
+            # e.g. a malformed JSON line: stop feeding, let the workers finish, re-raise
+            unreadable.append(bug)
+        finally:
+            for _ in workers:
+                pending.put(None)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    running = len(workers)
+    while running:
+        result = results.get()
+        if result is _DONE:
+            running -= 1
+            continue
+        write(result)
+        progress.update(result["status"])
+    feeder.join()
+    progress.finish()
+    if unreadable:
+        raise unreadable[0]
+    elapsed = time.monotonic() - progress.started
+    return {
+        **progress.counts,
+        "elapsed": elapsed,
+        "messages_per_second": progress.counts["sent"] / elapsed if elapsed else 0.0,
+    }
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="alright", description="WhatsApp Web automation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    send = commands.add_parser("send", help="send one message per row of a CSV / JSONL file")
+    send.add_argument("input", help='campaign file (.csv, .jsonl), "-" for stdin')
+    send.add_argument("--format", choices=("csv", "jsonl"), help="input format, by extension by default")
+    text = send.add_mutually_exclusive_group()
+    text.add_argument("--message", help='template filled with the row, e.g. "Hi {name}"')
+    text.add_argument("--message-file", help="file holding the template")
+    send.add_argument("--mobile-column", default="mobile", help='phone number column (default "mobile")')
+    send.add_argument("--file-column", help="column with a file to send, the message becomes its caption")
+    send.add_argument("--results", default="-", help='results CSV, written row by row (default stdout)')
+    sessions = send.add_mutually_exclusive_group()
+    sessions.add_argument("--accounts", nargs="+", help="browser profiles to send from, one session each")
+    sessions.add_argument("--concurrency", type=int, default=1,
+                          help="number of sessions, using profiles alright-1..N (default 1)")
+    send.add_argument("--profile-root", help="where the browser profiles live")
+    send.add_argument("--headless", action="store_true", help="run the browsers headless")
+    send.add_argument("--backend", choices=("selenium", "cdp"), default="selenium",
+                      help="drive Chrome through chromedriver or over a DevTools websocket")
+    send.add_argument("--timeout", type=float, default=60, help="seconds to wait for a session to be ready")
+    send.add_argument("--log-level", default="WARNING", help="logging level (default WARNING)")
+    return parser
+
+
+def _send(args) -> int:
+    from alright.session import Session, cdp_driver, chrome_driver
+
+    template = args.message
+    if args.message_file:
+        template = Path(args.message_file).read_text(encoding="utf-8")
+    accounts = args.accounts or [f"alright-{n}" for n in range(1, args.concurrency + 1)]
+    factory = cdp_driver if args.backend == "cdp" else chrome_driver
+    driver_factory = functools.partial(factory, headless=args.headless)
+    started = [Session(account, root=args.profile_root, driver_factory=driver_factory,
+                       timeout=args.timeout) for account in accounts]
+    writer = None
+    try:
+        messengers = {session.account: session.start() for session in started}
+        writer = ResultWriter(args.results)
+        summary = send_campaign(
+            read_rows(args.input, args.format),
+            messengers,
+            writer.write,
+            template=template,
+            mobile_column=args.mobile_column,
+            file_column=args.file_column,
+            progress=Progress(),
+        )
+    except KeyboardInterrupt:
+        sys.stderr.write("\nInterrupted, the results file has every row finished so far.\n")
+        return 130
+    finally:
+        if writer is not None:
+            writer.close()
+        for session in started:
+            session.close()
+    logging.getLogger("alright").info(f"Campaign finished: {summary}")
+    return 0 if not summary["failed"] else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s - %(name)s -- [%(levelname)s] >> %(message)s")
+    if args.command == "send":
+        return _send(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Puts message text into the compose box or a caption box.
+
+By default the whole message goes in with one in-page call: a synthetic paste, which
+WhatsApp's editor handles like a real one (line breaks stay in one bubble), with
+execCommand insertText as the fallback. It takes emoji and other characters outside the
+BMP, which ChromeDriver's send_keys rejects. Keystrokes and human-like typing stay
+available as explicit modes.
+"""
+
+import logging
+import random
+import time
+import unicodedata
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.keys import Keys
+
+INSERT = "insert"
+KEYS = "keys"
+HUMAN = "human"
+
+MODES = (INSERT, KEYS, HUMAN)
+
+# Shared by the scripts below: the text of a box as typed, emoji rendered as <img alt>
+# included (innerText leaves them out)
+_BOX_TEXT_JS = """
+const boxText = (node) => {
+    let out = '';
+    for (const child of node.childNodes) {
+        if (child.nodeType === Node.TEXT_NODE) out += child.data;
+        else if (child.nodeName === 'IMG') out += child.getAttribute('alt') || '';
+        else if (child.nodeName === 'BR') out += '\\n';
+        else if (child.nodeType === Node.ELEMENT_NODE) {
+            const inner = boxText(child);
+            out += /^(P|DIV)$/.test(child.nodeName) && out ? '\\n' + inner : inner;
+        }
+    }
+    return out;
+};
+"""
+
+# Appends text at the end of a contenteditable box and returns the box text before and
+# after
+INSERT_TEXT_JS = _BOX_TEXT_JS + """
+const [box, text] = arguments;
+const squash = (s) => (s || '').replace(/\\s+/g, '');
+box.focus();
+const selection = window.getSelection();
+const range = document.createRange();
+range.selectNodeContents(box);
+range.collapse(false);
+selection.removeAllRanges();
+selection.addRange(range);
+const before = boxText(box);
+const data = new DataTransfer();
+data.setData('text/plain', text);
+box.dispatchEvent(new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+if (squash(boxText(box)) === squash(before) && squash(text)) {
+    // the editor ignored the synthetic paste
+    text.split('\\n').forEach((line, index) => {
+        if (index) document.execCommand('insertLineBreak');
+        if (line) document.execCommand('insertText', false, line);
+    });
+}
+return {before: before, after: boxText(box)};
+"""
+
+# Empties the box, so a failed insertion is not typed a second time, and returns what
+# is left in it
+CLEAR_BOX_JS = _BOX_TEXT_JS + """
+const box = arguments[0];
+box.focus();
+const selection = window.getSelection();
+const range = document.createRange();
+range.selectNodeContents(box);
+selection.removeAllRanges();
+selection.addRange(range);
+document.execCommand('delete');
+return boxText(box);
+"""
+
+
+def _normalize(text: str) -> str:
+    # what must survive an insertion: no whitespace (the editor re-flows line breaks),
+    # no emoji variation selectors (the <img alt> of an emoji may drop them)
+    text = unicodedata.normalize("NFC", text or "").replace("\ufe0f", "")
+    return "".join(text.split())
+
+
+def outside_bmp(text: str) -> bool:
+    """True when the text has characters send_keys cannot type, like most emoji."""
+    return any(ord(char) > 0xFFFF for char in text)
+
+
+class Composer(object):
+    """Composer()
+
+    Writes text into message and caption boxes.
+
+    Args:
+        driver: the webdriver of the session
+        mode (str): "insert" (one in-page call), "keys" (send_keys, Shift+Enter between
+            lines) or "human" (word by word with pauses)
+        word_delay (float): average pause after each word in "human" mode
+        logger (logging.Logger | None): where fallbacks are reported
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, driver, mode: str = INSERT, word_delay: float = 0.8,
+                 logger: logging.Logger | None = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown typing mode {mode!r}, expected one of {MODES}")
+        self.driver = driver
+        self.mode = mode
+        self.word_delay = word_delay
+        self.logger = logger or logging.getLogger("alright")
+
+    def write(self, box, text: str, mode: str | None = None):
+        """write()
+
+        Appends text to the box. Nothing is submitted.
+
+        Args:
+            box (WebElement): the compose box or a caption box
+            text (str): the text, lines separated by "\\n"
+            mode (str, optional): overrides the composer's mode for this text
+        """
+        mode = mode or self.mode
+        if mode == INSERT:
+            self.insert(box, text)
+        elif outside_bmp(text):
+            self.logger.info("Text has characters send_keys cannot type, inserting it instead.")
+            self.insert(box, text)
+        elif mode == HUMAN:
+            self.type_like_human(box, text)
+        else:
+            self.type_keys(box, text)
+
+    def insert(self, box, text: str):
+        """insert()
+
+        Inserts the whole text in one in-page call. When the box does not end up
+        holding exactly what it held before plus the text, the box is emptied and the
+        whole of it is typed with keystrokes instead, so nothing is sent twice.
+        """
+        before = ""
+        try:
+            result = self.driver.execute_script(INSERT_TEXT_JS, box, text) or {}
+            before = result.get("before") or ""
+            if _normalize(result.get("after")) == _normalize(before + text):
+                return
+            self.logger.warning("In-page text insertion did not take, typing the text instead.")
+        except WebDriverException as bug:
+            self.logger.warning(f"In-page text insertion failed, typing the text instead: {bug.msg}")
+        # the insertion may have landed partly: start over from an empty box
+        left = self.driver.execute_script(CLEAR_BOX_JS, box)
+        if _normalize(left):
+            raise ValueError("Could not empty the box after a failed text insertion")
+        text = before + text
+        if outside_bmp(text):
+            raise ValueError("Text has characters send_keys cannot type and could not be inserted")
+        self.type_keys(box, text)
+
+    def _line_break(self):
+        # Shift+Enter keeps multi-line messages in a single bubble
+        ActionChains(self.driver).key_down(Keys.SHIFT).key_down(Keys.ENTER).key_up(
+            Keys.ENTER
+        ).key_up(Keys.SHIFT).perform()
+
+    def type_keys(self, box, text: str):
+        """Types the text line by line with send_keys."""
+        for index, line in enumerate(text.split("\n")):
+            if index:
+                self._line_break()
+            if line:
+                box.send_keys(line)
+
+    def type_like_human(self, box, text: str):
+        """Types the text word by word, pausing around word_delay after each word."""
+        for index, line in enumerate(text.split("\n")):
+            if index:
+                self._line_break()
+            for word in line.split():
+                box.send_keys(word + Keys.SPACE)
+                time.sleep(random.uniform(0.5, 1.5) * self.word_delay)
@@ -0,0 +1,299 @@
+"""
+Delivery tracking for outgoing messages without blocking the send path.
+
+A message is recorded right after it is submitted, then the status of every message
+still in flight is read in one execute_script call per poll: from its row when the chat
+is open, otherwise from the status tick of the chat list preview. A message that can be
+seen neither way anymore (another message replaced the preview) is marked unobservable
+and no longer polled, so a long campaign only ever polls the last few chats.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from selenium.common.exceptions import WebDriverException
+
+from alright.waits import backoff
+
+PENDING = "pending"
+SENT = "sent"
+DELIVERED = "delivered"
+READ = "read"
+
+# Statuses in the order a message goes through them
+ORDER = {PENDING: 0, SENT: 1, DELIVERED: 2, READ: 3}
+
+# Shared by the scripts below: the status tick of a message row or chat list row
+_STATUS_OF_JS = """
+const statusOf = (el) => {
+    const icon = el && el.querySelector('[data-icon^="msg-"]');
+    if (!icon) return null;
+    const name = icon.getAttribute('data-icon');
+    const labelled = icon.closest('[aria-label]');
+    const label = labelled ? labelled.getAttribute('aria-label') : '';
+    if (/\\bread\\b/i.test(label) || name.endsWith('-ack')) return 'read';
+    if (name.startsWith('msg-dblcheck')) return 'delivered';
+    if (name.startsWith('msg-check')) return 'sent';
+    if (name.startsWith('msg-time')) return 'pending';
+    return null;
+};
+"""
+
+# Waits briefly for the message just submitted in the open chat to render and returns
+# its id, the chat title and its status
+TRACK_OUTGOING_JS = _STATUS_OF_JS + """
+const [text, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = Date.now();
+const read = () => {
+    const main = document.getElementById('main');
+    if (!main) return null;
+    const header = main.querySelector('header span[title]');
+    const rows = main.querySelectorAll('div[role="row"] [data-id^="true_"]');
+    if (!rows.length) return null;
+    const row = rows[rows.length - 1];
+    const body = row.querySelector('span.selectable-text');
+    if (text && (!body || body.innerText.trim() !== text.trim())) return null;
+    return {
+        id: row.getAttribute('data-id'),
+        chat: header ? header.getAttribute('title') : null,
+        status: statusOf(row) || 'pending',
+    };
+};
+const timer = setInterval(() => {
+    const result = read();
+    if (result || Date.now() - started > timeoutMs) {
+        clearInterval(timer);
+        done(result);
+    }
+}, 10);
+"""
+
+# One status (or null when it cannot be seen) per [id, chat, text] record
+DELIVERY_STATUS_JS = _STATUS_OF_JS + """
+const records = arguments[0];
+const previews = new Map();
+const pane = document.getElementById('pane-side');
+if (pane) {
+    for (const row of pane.querySelectorAll('[role="row"], [role="listitem"]')) {
+        const titled = row.querySelectorAll('span[title]');
+        if (!titled.length) continue;
+        previews.set(titled[0].getAttribute('title'), {
+            row: row,
+            text: titled.length > 1 ? titled[titled.length - 1].getAttribute('title') : row.innerText,
+        });
+    }
+}
+return records.map(([id, chat, text]) => {
+    if (id) {
+        const row = document.querySelector('[data-id="' + CSS.escape(id) + '"]');
+        if (row) return statusOf(row);
+    }
+    const preview = chat && previews.get(chat);
+    const first = (text || '').split('\\n')[0].trim();
+    if (preview && first && (preview.text || '').includes(first)) return statusOf(preview.row);
+    return null;
+});
+"""
+
+
+@dataclass(slots=True)
+class Delivery:
+    """An outgoing message and the furthest status it was seen in."""
+
+    id: str | None
+    mobile: str | None
+    chat: str | None
+    text: str
+    status: str = PENDING
+    sent_at: float = 0.0
+    updated_at: float = 0.0
+    # False once neither its row nor its chat preview shows it anymore
+    observable: bool = True
+
+    @property
+    def key(self) -> str:
+        return self.id or f"{self.mobile or self.chat}:{self.sent_at}"
+
+
+class DeliveryTracker(object):
+    """DeliveryTracker()
+
+    Records outgoing messages of a WhatsApp session and follows their status
+    (pending -> sent -> delivered -> read) in the background of the send loop.
+
+        whatsapp = WhatsApp(driver, track_deliveries=True)
+        whatsapp.deliveries.on_status(print)
+        whatsapp.send_bulk(numbers, "hello", wait_for_delivery=False)
+        whatsapp.deliveries.wait(SENT)
+
+    Args:
+        whatsapp (WhatsApp): the session sending the messages
+        until (str): status at which a message stops being polled
+        poll_interval (float): longest pause between polls while waiting
+        render_timeout (float): seconds track() waits for a submitted message to render
+        max_tracked (int): records kept, the oldest are dropped first
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, whatsapp, until: str = SENT, poll_interval: float = 0.5,
+                 render_timeout: float = 0.5, max_tracked: int = 1000):
+        self.whatsapp = whatsapp
+        self.driver = whatsapp.driver
+        self.logger = whatsapp.logger
+        self.until = until
+        self.poll_interval = poll_interval
+        self.render_timeout = render_timeout
+        self.max_tracked = max_tracked
+        self._tracked: OrderedDict[str, Delivery] = OrderedDict()
+        self._callbacks: list[tuple[Callable[[Delivery], None], str | None]] = []
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def track(self, text: str, mobile: str | None = None) -> Delivery:
+        """track()
+
+        Records the message just submitted in the open chat. Costs one round trip.
+
+        Returns:
+            Delivery: the record, updated in place by poll()
+        """
+        now = time.time()
+        try:
+            seen = self.driver.execute_async_script(
+                TRACK_OUTGOING_JS, text, int(self.render_timeout * 1000)
+            ) or {}
+        except WebDriverException as bug:
+            self.logger.warning(f"Could not read the sent message back: {bug.msg}")
+            seen = {}
+        delivery = Delivery(
+            id=seen.get("id"),
+            mobile=mobile,
+            chat=seen.get("chat"),
+            text=text,
+            status=seen.get("status") or PENDING,
+            sent_at=now,
+            updated_at=now,
+        )
+        self._tracked[delivery.key] = delivery
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+        return delivery
+
+    def on_status(self, callback: Callable[[Delivery], None], status: str | None = None):
+        """on_status()
+
+        Registers a callback called with a Delivery every time its status moves on.
+
+        Args:
+            callback (Callable): receives the Delivery
+            status (str | None): only call it for this status, None for every change
+        """
+        self._callbacks.append((callback, status))
+        return callback
+
+    def pending(self) -> list[Delivery]:
+        """The observable tracked messages that have not reached `until` yet."""
+        target = ORDER[self.until]
+        return [d for d in self._tracked.values() if d.observable and ORDER[d.status] < target]
+
+    def status(self, key: str) -> str | None:
+        delivery = self._tracked.get(key)
+        return delivery.status if delivery else None
+
+    def statuses(self) -> dict[str, str]:
+        return {key: delivery.status for key, delivery in self._tracked.items()}
+
+    def poll(self, deliveries: list[Delivery] | None = None) -> list[Delivery]:
+        """poll()
+
+        Reads the status of every pending message (or only the given ones) in one call
+        and dispatches the changes to the callbacks. Messages that cannot be seen
+        anymore are marked unobservable.
+
+        Returns:
+            list[Delivery]: the messages whose status moved on
+        """
+        pending = self.pending() if deliveries is None else [d for d in deliveries if d.observable]
+        if not pending:
+            return []
+        seen = self.driver.execute_script(
+            DELIVERY_STATUS_JS, [[d.id, d.chat, d.text] for d in pending]
+        )
+        changed = []
+        now = time.time()
+        for delivery, status in zip(pending, seen):
+            if status is None:
+                delivery.observable = False
+                delivery.updated_at = now
+            elif ORDER[status] > ORDER[delivery.status]:
+                delivery.status = status
+                delivery.updated_at = now
+                changed.append(delivery)
+        for delivery in changed:
+            for callback, status in self._callbacks:
+                if status is None or status == delivery.status:
+                    try:
+                        callback(delivery)
+                    except Exception as bug:
+                        self.logger.exception(f"Delivery callback failed: {bug}")
+        return changed
+
+    def wait(self, status: str = SENT, timeout: float | None = None,
+             deliveries: list[Delivery] | None = None) -> bool:
+        """wait()
+
+        Polls until every observable tracked message (or every given one) reached at
+        least `status`.
+
+        Args:
+            status (str): the status to wait for
+            timeout (float | None): seconds, the "delivery" wait budget by default
+            deliveries (list[Delivery] | None): only wait for these messages
+
+        Returns:
+            bool: False when the timeout ran out first, or when a given message became
+            unobservable before reaching `status`
+        """
+        budget = self.whatsapp.waits.budget("delivery") if timeout is None else timeout
+        started = time.monotonic()
+        delays = backoff(maximum=self.poll_interval)
+        target = ORDER[status]
+        watched = list(self._tracked.values()) if deliveries is None else list(deliveries)
+        while True:
+            waiting = [d for d in watched if d.observable and ORDER[d.status] < target]
+            if not waiting:
+                break
+            if time.monotonic() - started >= budget:
+                return False
+            if self.poll(waiting):
+                delays = backoff(maximum=self.poll_interval)
+            else:
+                time.sleep(next(delays))
+        self.whatsapp.waits.observe("delivery", time.monotonic() - started)
+        return deliveries is None or all(ORDER[d.status] >= target for d in watched)
+
+    def forget(self, status: str | None = None) -> int:
+        """Drops the messages that reached `status` (default: `until`) or became
+        unobservable, returns how many."""
+        target = ORDER[status or self.until]
+        done = [
+            key for key, d in self._tracked.items()
+            if ORDER[d.status] >= target or not d.observable
+        ]
+        for key in done:
+            del self._tracked[key]
+        return len(done)
+
+    def __iter__(self) -> Iterator[Delivery]:
+        """Yields status changes until nothing is pending anymore."""
+        while self.pending():
+            changed = self.poll()
+            yield from changed
+            if not changed:
+                time.sleep(self.poll_interval)
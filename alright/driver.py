@@ -0,0 +1,53 @@
+"""
+The driver surface alright uses. Selenium's WebDriver satisfies it, and so do
+alright.cdp.CDPDriver (Chrome over a DevTools websocket) and the FakeDriver of
+tests/fake.py.
+"""
+
+from typing import Any, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class Element(Protocol):
+    """A page element, as returned by find_element(s) and the in-page scripts."""
+
+    @property
+    def text(self) -> str: ...
+
+    def get_attribute(self, name: str) -> Any: ...
+
+    def click(self) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def send_keys(self, *value) -> None: ...
+
+    def find_elements(self, by: str = ..., value: str | None = None) -> list: ...
+
+
+@runtime_checkable
+class Driver(Protocol):
+    """Driver()
+
+    execute() is the single choke point every other call goes through, which is what
+    alright.instrument wraps. ActionChains sends its W3C "actions" through it too.
+    """
+
+    def execute(self, driver_command: str, params: dict | None = None) -> dict: ...
+
+    def get(self, url: str) -> None: ...
+
+    def execute_script(self, script: str, *args) -> Any: ...
+
+    def execute_async_script(self, script: str, *args) -> Any: ...
+
+    def find_element(self, by: str = ..., value: str | None = None) -> Element: ...
+
+    def find_elements(self, by: str = ..., value: str | None = None) -> list[Element]: ...
+
+    @property
+    def switch_to(self) -> Any: ...
+
+    def close(self) -> None: ...
+
+    def quit(self) -> None: ...
@@ -0,0 +1,245 @@
+"""
+Push based incoming message events.
+
+A MutationObserver injected into WhatsApp Web records new messages and unread counter
+changes into an in-page ring buffer, which Python drains in batches with one call.
+
+Only messages that arrive below the newest one already shown count as new: the messages
+rendered while a chat opens (for OPEN_SETTLE_MS after it) are taken as its baseline, and
+older messages loaded when the history scrolls back are ignored.
+"""
+
+import logging
+import time
+from typing import Callable, Iterator
+
+from selenium.common.exceptions import WebDriverException
+
+# Installs the observer once per page load, the buffer lives on window.__alright_events
+INSTALL_OBSERVER_JS = """
+const capacity = arguments[0];
+if (window.__alright_events) {
+    window.__alright_events.capacity = capacity;
+    return false;
+}
+const OPEN_SETTLE_MS = 1000;
+const state = {
+    buffer: [], capacity: capacity, dropped: 0, seq: 0, counters: new Map(), seen: new Set(),
+    main: null, chat: null, newest: null, settleUntil: 0,
+};
+window.__alright_events = state;
+
+const push = (event) => {
+    event.seq = ++state.seq;
+    event.timestamp = Date.now() / 1000;
+    state.buffer.push(event);
+    if (state.buffer.length > state.capacity) {
+        state.buffer.shift();
+        state.dropped++;
+    }
+};
+
+const chatRow = (node) => {
+    const row = node.closest && node.closest('[role="row"], [role="listitem"], [aria-rowindex]');
+    if (!row) return;
+    const titled = row.querySelectorAll('span[title]');
+    if (!titled.length) return;
+    const chat = titled[0].getAttribute('title');
+    const badge = row.querySelector('span[aria-label*="unread" i]');
+    const count = badge && /^\\d+$/.test(badge.textContent.trim()) ? parseInt(badge.textContent, 10) : 0;
+    const preview = titled.length > 1 ? titled[titled.length - 1].getAttribute('title') : '';
+    const previous = state.counters.get(chat) || 0;
+    state.counters.set(chat, count);
+    if (count > previous) {
+        push({type: 'unread', chat: chat, count: count, text: preview, id: null});
+    }
+};
+
+const MESSAGES = '.message-in, .message-out';
+
+const messageId = (message) => {
+    const keyed = message.closest('[data-id]') || message.querySelector('[data-id]');
+    return keyed ? keyed.getAttribute('data-id') : null;
+};
+
+// Ids already reported or baselined, the least recently seen dropped first (a Set keeps
+// insertion order), so re-rendered rows of the current chat are never reported again
+const SEEN_LIMIT = 5000;
+const remember = (id) => {
+    if (!id) return;
+    state.seen.delete(id);
+    state.seen.add(id);
+    while (state.seen.size > SEEN_LIMIT) state.seen.delete(state.seen.values().next().value);
+};
+
+const chatTitle = () => {
+    const header = document.querySelector('#main header span[title], #main header span[dir="auto"]');
+    return header ? (header.getAttribute('title') || header.textContent) : null;
+};
+
+const lastMessage = (main) => {
+    const messages = main.querySelectorAll(MESSAGES);
+    return messages.length ? messages[messages.length - 1] : null;
+};
+
+// A newly opened chat: whatever it renders now is history, not incoming
+const baseline = (main) => {
+    state.main = main;
+    state.chat = chatTitle();
+    state.settleUntil = Date.now() + OPEN_SETTLE_MS;
+    state.seen.clear();
+    main.querySelectorAll(MESSAGES).forEach((message) => remember(messageId(message)));
+    state.newest = lastMessage(main);
+};
+
+const incoming = (node) => {
+    const messages = [];
+    if (node.matches && node.matches('.message-in')) messages.push(node);
+    if (node.querySelectorAll) messages.push(...node.querySelectorAll('.message-in'));
+    const settling = Date.now() < state.settleUntil;
+    for (const message of messages) {
+        const id = messageId(message);
+        const known = id && state.seen.has(id);
+        remember(id);
+        if (known) continue;
+        if (settling) continue;
+        // Rendered above the newest message: loaded from the history, not received
+        if (state.newest && state.newest.isConnected && state.newest !== message
+            && message.compareDocumentPosition(state.newest) & Node.DOCUMENT_POSITION_FOLLOWING) {
+            continue;
+        }
+        const text = message.querySelector('span.selectable-text');
+        push({
+            type: 'message',
+            chat: state.chat,
+            count: null,
+            text: text ? text.innerText : message.innerText,
+            id: id,
+        });
+    }
+};
+
+const observer = new MutationObserver((mutations) => {
+    const main = document.getElementById('main');
+    if (main && (main !== state.main || chatTitle() !== state.chat)) {
+        baseline(main);
+    }
+    let appended = false;
+    for (const mutation of mutations) {
+        const target = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+        if (!target) continue;
+        if (target.closest('#pane-side')) {
+            chatRow(target);
+            mutation.addedNodes.forEach((node) => node.nodeType === 1 && chatRow(node));
+        } else if (target.closest('#main')) {
+            mutation.addedNodes.forEach((node) => node.nodeType === 1 && incoming(node));
+            appended = appended || mutation.addedNodes.length > 0;
+        }
+    }
+    if (main && appended) {
+        state.newest = lastMessage(main) || state.newest;
+    }
+});
+if (document.getElementById('main')) baseline(document.getElementById('main'));
+observer.observe(document.getElementById('app') || document.body, {
+    childList: true, subtree: true, characterData: true,
+});
+return true;
+"""
+
+# Hands the buffered events to Python and empties the buffer
+DRAIN_EVENTS_JS = """
+const state = window.__alright_events;
+if (!state) return null;
+const events = state.buffer.splice(0, arguments[0] || state.buffer.length);
+const dropped = state.dropped;
+state.dropped = 0;
+return {events: events, dropped: dropped};
+"""
+
+
+class MessageStream(object):
+    """MessageStream()
+
+    Drains the in-page event buffer of a WhatsApp session. Events are dicts with the
+    keys "type" ("message" or "unread"), "chat", "text", "count", "id", "seq" and
+    "timestamp". The observer is re-installed automatically after a page reload.
+
+    Args:
+        whatsapp (WhatsApp): the session to listen to
+        poll_interval (float): seconds between drains while iterating
+        capacity (int): size of the in-page ring buffer; older events are dropped first
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, whatsapp, poll_interval: float = 0.25, capacity: int = 1000):
+        self.whatsapp = whatsapp
+        self.driver = whatsapp.driver
+        self.logger = whatsapp.logger
+        self.poll_interval = poll_interval
+        self.capacity = capacity
+        self.dropped = 0
+        self._callbacks: list[tuple[Callable, str | None]] = []
+        self._running = False
+
+    def install(self) -> bool:
+        """Injects the observer, returns False if it was already running on the page."""
+        return self.driver.execute_script(INSTALL_OBSERVER_JS, self.capacity)
+
+    def on_message(self, callback: Callable[[dict], None], kind: str | None = "message"):
+        """on_message()
+
+        Registers a callback called with every drained event of the given kind.
+
+        Args:
+            callback (Callable): receives the event dict
+            kind (str | None): "message", "unread", or None for every event
+        """
+        self._callbacks.append((callback, kind))
+        return callback
+
+    def drain(self, max_events: int | None = None) -> list[dict]:
+        """Returns the events buffered since the last drain, in one execute_script call."""
+        batch = self.driver.execute_script(DRAIN_EVENTS_JS, max_events)
+        if batch is None:
+            self.logger.info("Event observer is not installed, installing it.")
+            self.install()
+            return []
+        if batch["dropped"]:
+            self.dropped += batch["dropped"]
+            self.logger.warning(f"{batch['dropped']} events were dropped by the ring buffer.")
+        return batch["events"]
+
+    def poll(self) -> list[dict]:
+        """Drains the buffer and dispatches every event to the registered callbacks."""
+        events = self.drain()
+        for event in events:
+            for callback, kind in self._callbacks:
+                if kind is None or kind == event["type"]:
+                    try:
+                        callback(event)
+                    except Exception as bug:
+                        self.logger.exception(f"Event callback failed: {bug}")
+        return events
+
+    def __iter__(self) -> Iterator[dict]:
+        self._running = True
+        self.install()
+        while self._running:
+            try:
+                events = self.poll()
+            except WebDriverException as bug:
+                self.logger.warning(f"Could not drain events: {bug.msg}")
+                events = []
+            yield from events
+            if not events:
+                time.sleep(self.poll_interval)
+
+    def run(self):
+        """Dispatches events to the callbacks until stop() is called."""
+        for _ in self:
+            pass
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,285 @@
+"""
+Conversation history of the open chat, read by scrolling the message pane back one
+batch at a time. Each batch is scrolled, waited for and extracted in a single in-page
+call, and only the rows older than the previous batch cross the wire.
+"""
+
+import json
+import re
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterator
+
+# Shared by the scripts below: turns a message row of #main into a plain object
+_MESSAGE_ROW_JS = """
+const mediaKind = (row) => {
+    if (row.querySelector('[data-icon="audio-play"], [data-icon^="ptt"], audio')) return 'audio';
+    if (row.querySelector('[data-icon="media-play"], [data-icon="media-gif"], video')) return 'video';
+    if (row.querySelector('[data-icon^="document"], [data-icon^="doc-"]')) return 'document';
+    if (row.querySelector('img[alt*="sticker" i]')) return 'sticker';
+    if (row.querySelector('img[src^="blob:"], img[src^="data:image"]')) return 'image';
+    return null;
+};
+
+const messageRow = (row) => {
+    const id = row.getAttribute('data-id');
+    const meta = row.querySelector('[data-pre-plain-text]');
+    const quotedEl = row.querySelector('[aria-label="Quoted message" i], [data-testid="quoted-message"]');
+    const texts = Array.from(row.querySelectorAll('span.selectable-text'))
+        .filter((span) => !(quotedEl && quotedEl.contains(span)));
+    let quoted = null;
+    if (quotedEl) {
+        const author = quotedEl.querySelector('span[dir="auto"]');
+        const body = quotedEl.querySelector('.quoted-mention, span.selectable-text');
+        quoted = {
+            sender: author ? author.innerText : null,
+            text: body ? body.innerText : quotedEl.innerText,
+        };
+    }
+    return {
+        id: id,
+        outgoing: id.startsWith('true_'),
+        pre: meta ? meta.getAttribute('data-pre-plain-text') : '',
+        text: texts.length ? texts[0].innerText : '',
+        media: mediaKind(row),
+        quoted: quoted,
+    };
+};
+
+// Order of the day, month and year in the dates of the page locale: "DMY", "MDY" or "YMD"
+const dateOrder = () => new Intl.DateTimeFormat(navigator.language)
+    .formatToParts(new Date(2006, 10, 22))
+    .filter((part) => ['day', 'month', 'year'].includes(part.type))
+    .map((part) => part.type[0].toUpperCase())
+    .join('');
+"""
+
+# Scrolls the message pane of #main to the top (when asked), waits for older messages to
+# render, then returns the rows older than beforeId in page order
+EXTRACT_HISTORY_JS = _MESSAGE_ROW_JS + """
+const [beforeId, scroll, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const main = document.getElementById('main');
+const rows = () => main ? main.querySelectorAll('div[role="row"] [data-id]') : [];
+if (!rows().length) {
+    done({rows: [], at_top: true, date_order: dateOrder()});
+    return;
+}
+let pane = rows()[0];
+while (pane && pane !== main && pane.scrollHeight <= pane.clientHeight) pane = pane.parentElement;
+const firstId = () => rows()[0].getAttribute('data-id');
+
+const extract = () => {
+    const out = [];
+    for (const row of rows()) {
+        if (row.getAttribute('data-id') === beforeId) break;
+        out.push(messageRow(row));
+    }
+    return out;
+};
+
+if (!scroll) {
+    done({rows: extract(), at_top: false, date_order: dateOrder()});
+    return;
+}
+const before = firstId();
+pane.scrollTop = 0;
+const started = Date.now();
+const timer = setInterval(() => {
+    if (firstId() !== before || Date.now() - started > timeoutMs) {
+        clearInterval(timer);
+        done({rows: extract(), at_top: firstId() === before, date_order: dateOrder()});
+    }
+}, 50);
+"""
+
+# Waits (in the page) until the chat titled `title` is open and its messages rendered,
+# then returns the chat header and the last incoming message
+LAST_MESSAGE_JS = _MESSAGE_ROW_JS + """
+const [title, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = Date.now();
+const read = () => {
+    const main = document.getElementById('main');
+    const header = main && main.querySelector('header span[title]');
+    const current = header ? header.getAttribute('title') : null;
+    const rows = main ? main.querySelectorAll('div[role="row"] [data-id]') : [];
+    const opened = current !== null && current.toUpperCase() === title.toUpperCase();
+    if (!opened || !rows.length) return null;
+    const incoming = main.querySelectorAll('div[role="row"] [data-id^="false_"]');
+    return {
+        title: current,
+        group: !!main.querySelector('header [data-icon*="default-group"]'),
+        date_order: dateOrder(),
+        message: incoming.length ? messageRow(incoming[incoming.length - 1]) : null,
+    };
+};
+const timer = setInterval(() => {
+    const result = read();
+    if (result || Date.now() - started > timeoutMs) {
+        clearInterval(timer);
+        done(result);
+    }
+}, 25);
+"""
+
+# "[10:32, 18/10/2026] Jane Doe: " - the order of the date parts follows the locale
+PRE_PLAIN_TEXT = re.compile(r"^\[(?P<time>[^,\]]+),\s*(?P<date>[^\]]+)\]\s*(?P<sender>.*?):?\s*$")
+TIME_FORMATS = ("%H:%M", "%I:%M %p", "%H:%M:%S")
+# Date formats per order of the day, month and year. "03/04/2024" is 3 April or 4 March
+# depending on the locale, so the order is read from the page, never guessed per date
+DATE_FORMATS = {
+    "DMY": ("%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%d/%m/%y", "%d.%m.%y"),
+    "MDY": ("%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y"),
+    "YMD": ("%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d"),
+}
+DEFAULT_DATE_ORDER = "DMY"
+
+
+@dataclass(slots=True)
+class ChatMessage:
+    """One message of a conversation, as rendered by WhatsApp Web."""
+
+    id: str
+    chat: str
+    sender: str | None
+    timestamp: datetime | None
+    text: str
+    media: str | None = None
+    quoted: dict | None = None
+    outgoing: bool = False
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat() if self.timestamp else None
+        return data
+
+
+def parse_pre_plain_text(pre: str, date_order: str | None = None) -> tuple[datetime | None, str | None]:
+    """parse_pre_plain_text()
+
+    Reads the timestamp and sender out of a row's data-pre-plain-text attribute.
+
+    Args:
+        pre (str): the attribute
+        date_order (str | None): "DMY", "MDY" or "YMD", DEFAULT_DATE_ORDER by default
+    """
+    match = PRE_PLAIN_TEXT.match(pre or "")
+    if not match:
+        return None, None
+    sender = match["sender"] or None
+    clock, day = match["time"].strip(), match["date"].strip()
+    order = date_order or DEFAULT_DATE_ORDER
+    if order not in DATE_FORMATS:
+        raise ValueError(f"Unknown date order {order!r}, expected one of {tuple(DATE_FORMATS)}")
+    # year first dates are never ambiguous
+    formats = DATE_FORMATS[order] + (DATE_FORMATS["YMD"] if order != "YMD" else ())
+    for date_format in formats:
+        for time_format in TIME_FORMATS:
+            try:
+                return datetime.strptime(f"{day} {clock}", f"{date_format} {time_format}"), sender
+            except ValueError:
+                continue
+    return None, sender
+
+
+def _page_order(result: dict) -> str | None:
+    # the order the page reported, when it is one parse_pre_plain_text knows
+    order = (result or {}).get("date_order")
+    return order if order in DATE_FORMATS else None
+
+
+def to_message(row: dict, chat: str, date_order: str | None = None) -> ChatMessage:
+    """Builds a ChatMessage from a row extracted by the in-page scripts."""
+    timestamp, sender = parse_pre_plain_text(row["pre"], date_order)
+    return ChatMessage(
+        id=row["id"],
+        chat=chat,
+        sender=sender,
+        timestamp=timestamp,
+        text=row["text"],
+        media=row["media"],
+        quoted=row["quoted"],
+        outgoing=row["outgoing"],
+    )
+
+
+def last_message(driver, title: str, timeout: float = 10.0,
+                 date_order: str | None = None) -> ChatMessage | None:
+    """last_message()
+
+    Waits for the chat to be open and returns its last incoming message, in one call.
+    Until the header shows `title`, whatever chat is open is not read.
+
+    Args:
+        driver: the webdriver
+        title (str): the title of the chat to read, another open chat is never read
+        timeout (float): seconds to wait for the chat to render
+        date_order (str, optional): "DMY", "MDY" or "YMD", the page locale's by default
+
+    Returns:
+        ChatMessage | None: None when the chat did not open or has no incoming message
+    """
+    result = driver.execute_async_script(LAST_MESSAGE_JS, title, int(timeout * 1000))
+    if not result or not result["message"]:
+        return None
+    return to_message(result["message"], result["title"], date_order or _page_order(result))
+
+
+def iter_history(driver, chat: str, since: datetime | None = None,
+                 batch_timeout: float = 3.0, max_batches: int | None = None,
+                 remember: int = 5000, date_order: str | None = None) -> Iterator[ChatMessage]:
+    """iter_history()
+
+    Yields the messages of the open chat, newest first, until the start of the
+    conversation, `since` or `max_batches` is reached.
+
+    Args:
+        driver: the webdriver, with the chat open
+        chat (str): chat name put on every message
+        since (datetime, optional): stop at the first message older than this
+        batch_timeout (float): seconds to wait for an older batch to render
+        max_batches (int, optional): stop after this many scroll-backs
+        remember (int): message ids kept for de-duplication, which bounds memory
+        date_order (str, optional): "DMY", "MDY" or "YMD", the page locale's by default
+    """
+    seen: deque[str] = deque(maxlen=remember)
+    known: set[str] = set()
+    before = None
+    batches = 0
+    while True:
+        result = driver.execute_async_script(
+            EXTRACT_HISTORY_JS, before, batches > 0, int(batch_timeout * 1000)
+        )
+        rows = (result or {}).get("rows") or []
+        order = date_order or _page_order(result)
+        for row in reversed(rows):
+            if row["id"] in known:
+                continue
+            if len(seen) == seen.maxlen:
+                known.discard(seen[0])
+            seen.append(row["id"])
+            known.add(row["id"])
+            message = to_message(row, chat, order)
+            if since is not None and message.timestamp is not None and message.timestamp < since:
+                return
+            yield message
+        if rows:
+            before = rows[0]["id"]
+        batches += 1
+        if not result or (result.get("at_top") and not rows):
+            return
+        if max_batches is not None and batches > max_batches:
+            return
+
+
+def write_jsonl(messages, path) -> int:
+    """Streams messages to a JSON lines file, one message per line. Returns the count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for message in messages:
+            f.write(json.dumps(message.to_dict(), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,249 @@
+"""
+Opt-in instrumentation of a WhatsApp session: WebDriver command counts and latency
+histograms per public method and per selector, exportable as JSON or Prometheus text.
+
+Nothing is wrapped unless an Instrumentation is attached, so a session without one pays
+nothing.
+"""
+
+import bisect
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Seconds, Prometheus style upper bounds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram(object):
+    """Fixed bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+class Instrumentation(object):
+    """Instrumentation()
+
+    Attach to a WhatsApp session (WhatsApp(driver, instrumentation=Instrumentation()) or
+    instrumentation.attach(whatsapp)) to record:
+
+    - every WebDriver command, counted per command name and timed
+    - command latency per public WhatsApp method that issued it (the innermost one)
+    - command latency per selector (locator value or logical element name)
+    - wall time per public method, split into driver time and idle time, which is
+      where WebDriverWait polling and hard sleeps show up
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.commands: Counter = Counter()
+        self.command_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.method_commands: dict[str, Histogram] = defaultdict(Histogram)
+        self.selector_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.method_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.method_driver_seconds: Counter = Counter()
+        self.method_idle_seconds: Counter = Counter()
+        self._attached = []
+
+    # -- attaching ------------------------------------------------------------
+
+    def attach(self, whatsapp):
+        """Wraps the session's driver.execute() and public methods."""
+        driver = whatsapp.driver
+        execute = driver.execute
+        self._selectors = getattr(whatsapp, "selectors", None)
+
+        @functools.wraps(execute)
+        def timed_execute(driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._record_command(driver_command, params, time.perf_counter() - started)
+
+        driver.execute = timed_execute
+        self._attached.append((driver, "execute"))
+
+        for name, func in inspect.getmembers(type(whatsapp), inspect.isfunction):
+            if name.startswith("_"):
+                continue
+            bound = getattr(whatsapp, name)
+            if inspect.isgeneratorfunction(func):
+                wrapper = self._wrap_generator(name, bound)
+            else:
+                wrapper = self._wrap(name, bound)
+            setattr(whatsapp, name, wrapper)
+            self._attached.append((whatsapp, name))
+        return self
+
+    def detach(self):
+        """Removes every wrapper, the session goes back to the plain methods."""
+        for owner, name in self._attached:
+            try:
+                delattr(owner, name)
+            except AttributeError:
+                pass
+        self._attached = []
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str):
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def _exit(self):
+        name, started, driver_seconds = self._stack().pop()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.method_latency[name].observe(elapsed)
+            self.method_driver_seconds[name] += driver_seconds
+            self.method_idle_seconds[name] += max(0.0, elapsed - driver_seconds)
+
+    def _wrap(self, name, bound):
+        @functools.wraps(bound)
+        def wrapper(*args, **kwargs):
+            self._enter(name)
+            try:
+                return bound(*args, **kwargs)
+            finally:
+                self._exit()
+
+        return wrapper
+
+    def _wrap_generator(self, name, bound):
+        @functools.wraps(bound)
+        def wrapper(*args, **kwargs):
+            iterator = bound(*args, **kwargs)
+            while True:
+                self._enter(name)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self._exit()
+                yield item
+
+        return wrapper
+
+    # -- recording ------------------------------------------------------------
+
+    def _selector_key(self, params) -> str | None:
+        if not params:
+            return None
+        if "using" in params:
+            return f"{params['using']}={params['value']}"
+        args = params.get("args")
+        if self._selectors is not None and args and isinstance(args[0], list) and args[0] \
+                and isinstance(args[0][0], list):
+            # a locator probe: report the logical element names
+            names = self._selectors.names_for(args[0])
+            if names:
+                return ",".join(names)
+        return None
+
+    def _record_command(self, driver_command, params, seconds):
+        stack = self._stack()
+        method = stack[-1][0] if stack else "<outside>"
+        if stack:
+            stack[-1][2] += seconds
+        selector = self._selector_key(params)
+        with self._lock:
+            self.commands[driver_command] += 1
+            self.command_latency[driver_command].observe(seconds)
+            self.method_commands[method].observe(seconds)
+            if selector:
+                self.selector_latency[selector].observe(seconds)
+
+    # -- exporting ------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "commands": dict(self.commands),
+                "command_latency": {k: v.to_dict() for k, v in self.command_latency.items()},
+                "method_commands": {k: v.to_dict() for k, v in self.method_commands.items()},
+                "method_latency": {
+                    k: {
+                        **v.to_dict(),
+                        "driver_seconds": self.method_driver_seconds[k],
+                        "idle_seconds": self.method_idle_seconds[k],
+                    }
+                    for k, v in self.method_latency.items()
+                },
+                "selector_latency": {k: v.to_dict() for k, v in self.selector_latency.items()},
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "alright") -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(metric, label, items):
+            lines.append(f"# TYPE {prefix}_{metric} histogram")
+            for key, hist in items:
+                value = _escape(key)
+                cumulative = 0
+                for bound, count in zip([str(b) for b in BUCKETS] + ["+Inf"], hist.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_{metric}_sum{{{label}="{value}"}} {hist.sum}')
+                lines.append(f'{prefix}_{metric}_count{{{label}="{value}"}} {hist.count}')
+
+        with self._lock:
+            lines.append(f"# TYPE {prefix}_driver_commands_total counter")
+            for command, count in sorted(self.commands.items()):
+                lines.append(f'{prefix}_driver_commands_total{{command="{_escape(command)}"}} {count}')
+            histogram("driver_command_seconds", "command", sorted(self.command_latency.items()))
+            histogram("method_command_seconds", "method", sorted(self.method_commands.items()))
+            histogram("method_seconds", "method", sorted(self.method_latency.items()))
+            histogram("selector_seconds", "selector", sorted(self.selector_latency.items()))
+            lines.append(f"# TYPE {prefix}_method_idle_seconds_total counter")
+            for method, seconds in sorted(self.method_idle_seconds.items()):
+                lines.append(f'{prefix}_method_idle_seconds_total{{method="{_escape(method)}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,283 @@
+"""
+Versioned registry of the WhatsApp Web elements alright interacts with.
+
+Every logical element has an ordered list of locators. All of them are probed in one
+in-page call, the locator that matched is remembered and tried first next time, and an
+element that none of them finds fails within a short budget instead of a full
+WebDriverWait timeout.
+"""
+
+import logging
+import time
+from collections import Counter
+from typing import Callable, Iterable
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from alright.waits import backoff
+
+SELECTORS_VERSION = "2025.10"
+
+_FOOTER = '//*[@id="main"]/footer'
+_MEDIA_EDITOR = "/html/body/div[1]/div/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[1]/div[3]/div/div"
+
+SELECTORS: dict[str, list[tuple[str, str]]] = {
+    "search_box": [
+        (By.XPATH, "/html/body/div[1]/div/div/div[4]/div/div[1]/div/div/div[2]/div/div[1]"),
+        (By.XPATH, '//*[@id="side"]/div[1]/div/label/div/div[2]'),
+        (By.CSS_SELECTOR, '#side div[contenteditable="true"][role="textbox"]'),
+    ],
+    "chat_list_search": [
+        (By.XPATH, '//div[@id="side"]/div[1]/div/div/div/div'),
+        (By.CSS_SELECTOR, '#side div[contenteditable="true"]'),
+    ],
+    "chat_title": [
+        (By.XPATH, '//div[@id="main"]/header/div[2]/div[1]/div[1]/span'),
+        (By.XPATH, "/html/body/div/div[1]/div[1]/div[4]/div[1]/header/div[2]/div[1]/div/span"),
+        (By.CSS_SELECTOR, "#main header span[title]"),
+    ],
+    "chat_avatar": [
+        (By.XPATH, '//div[@id="main"]/header/div[1]/div[1]/div[1]/span'),
+        (By.CSS_SELECTOR, "#main header [data-icon^='default-']"),
+    ],
+    "chat_subtitle": [
+        (By.XPATH, '//div[@id="main"]/header/div[2]/div[2]/span'),
+        (By.CSS_SELECTOR, "#main header div + div > span[title]"),
+    ],
+    "message_box": [
+        (By.XPATH, f"{_FOOTER}/div[1]/div/span[2]/div/div[2]/div[1]/div/div[2]"),
+        (By.XPATH, f"{_FOOTER}/div[1]/div/span/div/div[2]/div[1]/div/div[1]/p"),
+        (By.CSS_SELECTOR, '#main footer div[contenteditable="true"][role="textbox"]'),
+    ],
+    "invalid_number_ok": [
+        (By.XPATH, '//*[@id="app"]/div/span[2]/div/span/div/div/div/div/div/div[2]/div/div'),
+        (By.XPATH, '//div[@role="dialog"]//button[.//div[text()="OK"] or text()="OK"]'),
+    ],
+    "attach_button": [
+        (By.XPATH, f'{_FOOTER}//*[@data-icon="attach-menu-plus"]/..'),
+        (By.CSS_SELECTOR, '#main footer [data-icon="plus-rounded"]'),
+    ],
+    "attach_media_input": [
+        (By.XPATH, f"{_FOOTER}/div[1]/div/span[2]/div/div[1]/div[2]/div/span/div/ul/div/div[2]/li/div/input"),
+        (By.CSS_SELECTOR, 'input[type="file"][accept*="image"]'),
+    ],
+    "attach_document_input": [
+        (By.XPATH, f"{_FOOTER}/div[1]/div/span[2]/div/div[1]/div[2]/div/span/div/ul/div/div[1]/li/div/input"),
+        (By.CSS_SELECTOR, 'input[type="file"][accept="*"]'),
+    ],
+    "caption_image": [
+        (By.XPATH, f"{_MEDIA_EDITOR}/div[2]/div[1]/div[1]"),
+        (By.CSS_SELECTOR, 'div[role="dialog"] div[contenteditable="true"]'),
+    ],
+    "caption_video": [
+        (By.XPATH, f"{_MEDIA_EDITOR}/div[1]/div[1]"),
+        (By.CSS_SELECTOR, 'div[role="dialog"] div[contenteditable="true"]'),
+    ],
+    "caption_file": [
+        (By.XPATH, f"{_MEDIA_EDITOR}/div[1]/div[1]"),
+        (By.CSS_SELECTOR, 'div[role="dialog"] div[contenteditable="true"]'),
+    ],
+    "media_thumbnail": [
+        (By.XPATH, '//div[@role="dialog"]//div[@role="listitem"][.//img or .//*[@data-icon]]'),
+        (By.CSS_SELECTOR, 'div[role="dialog"] div[role="listitem"]'),
+    ],
+    "media_send_button": [
+        (By.XPATH, '//*[@id="app"]/div[1]/div/div[3]/div[2]/span/div/span/div/div/div[2]/div/div[2]/div[2]/div/div/span'),
+        (By.XPATH, '//*[@data-icon="send"]/..'),
+    ],
+    "pending_icon": [
+        (By.XPATH, '//*[@id="main"]//*[@data-icon="msg-time"]'),
+    ],
+    "incoming_messages": [
+        (By.XPATH, '//div[@id="main"]/div[3]/div[1]/div[2]/div[3]/child::div[contains(@class,"message-in")]'),
+        (By.CSS_SELECTOR, "#main div.message-in"),
+    ],
+    "menu_button": [
+        (By.XPATH, "//div[@id='side']/header/div[2]/div/span/div[3]/div[@role='button']"),
+        (By.CSS_SELECTOR, '#side header [data-icon="menu"]'),
+    ],
+    "logout_item": [
+        (By.XPATH, "//div[@id='side']/header/div[2]/div/span/div[3]/span/div[1]/ul/li[last()]/div[@role='button']"),
+        (By.XPATH, "//div[@role='application']//li[last()]//div[@role='button']"),
+    ],
+}
+
+# Evaluates every candidate locator in order and returns the first hit, in one round trip
+PROBE_LOCATORS_JS = """
+const candidates = arguments[0];
+for (let i = 0; i < candidates.length; i++) {
+    const [using, value] = candidates[i];
+    let found = null;
+    try {
+        if (using === 'xpath') {
+            found = document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } else if (using === 'css selector') {
+            found = document.querySelector(value);
+        } else if (using === 'id') {
+            found = document.getElementById(value);
+        }
+    } catch (e) {
+        found = null;
+    }
+    if (found) return [i, found];
+}
+return null;
+"""
+
+
+class SelectorNotFound(NoSuchElementException):
+    """None of the locators of a logical element matched within its budget."""
+
+
+class SelectorRegistry(object):
+    """SelectorRegistry()
+
+    Finds WhatsApp Web elements by logical name.
+
+    Args:
+        driver: the webdriver of the session
+        selectors (dict): logical name -> ordered list of (By, value) locators
+        version (str): version of the selector set, reported in errors
+        budget (float | Callable): default seconds to keep probing before failing, or a
+            callable returning them, read on every lookup (e.g. a WaitEngine budget)
+        poll (float): longest pause between probes
+        initial_poll (float): first pause between probes, doubled after every miss
+    """
+
+    def __init__(
+        self,
+        driver,
+        selectors: dict[str, list[tuple[str, str]]] | None = None,
+        version: str = SELECTORS_VERSION,
+        budget: float | Callable[[], float] = 10,
+        poll: float = 0.05,
+        initial_poll: float = 0.005,
+        logger: logging.Logger | None = None,
+    ):
+        self.driver = driver
+        self.selectors = {name: list(locators) for name, locators in (selectors or SELECTORS).items()}
+        self.version = version
+        self._budget = budget
+        self.poll = poll
+        self.initial_poll = initial_poll
+        self.logger = logger or logging.getLogger("alright")
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._winners: dict[str, int] = {}
+
+    @property
+    def budget(self) -> float:
+        return self._budget() if callable(self._budget) else self._budget
+
+    @budget.setter
+    def budget(self, budget: float | Callable[[], float]):
+        self._budget = budget
+
+    def register(self, name: str, locators: Iterable[tuple[str, str]]):
+        """Adds or replaces the locators of a logical element, e.g. after a WhatsApp update."""
+        self.selectors[name] = list(locators)
+        self._winners.pop(name, None)
+
+    def _ordered(self, name: str) -> list[tuple[str, str]]:
+        locators = self.selectors[name]
+        winner = self._winners.get(name)
+        if winner:
+            return [locators[winner]] + locators[:winner] + locators[winner + 1:]
+        return locators
+
+    def names_for(self, candidates: Iterable) -> list[str]:
+        """Logical names owning the given locators, in order, e.g. to label a probe."""
+        names = []
+        for candidate in candidates:
+            for name, locators in self.selectors.items():
+                if tuple(candidate) in locators and name not in names:
+                    names.append(name)
+        return names
+
+    def locator(self, name: str) -> tuple[str, str]:
+        """The locator that matched last time, or the first one - for use with WebDriverWait."""
+        return self._ordered(name)[0]
+
+    def probe(self, names: Iterable[str]) -> tuple[str, object] | None:
+        """probe()
+
+        Looks for several logical elements at once, without waiting.
+
+        Returns:
+            tuple | None: (name, element) of the first match, in the order of names
+        """
+        names = list(names)
+        candidates = []
+        owners = []
+        for name in names:
+            for locator in self._ordered(name):
+                candidates.append(list(locator))
+                owners.append((name, self.selectors[name].index(locator)))
+        found = self.driver.execute_script(PROBE_LOCATORS_JS, candidates)
+        if not found:
+            return None
+        name, index = owners[found[0]]
+        self._winners[name] = index
+        self.hits[name] += 1
+        return name, found[1]
+
+    def find_any(self, names: Iterable[str], timeout: float | None = None) -> tuple[str, object]:
+        """find_any()
+
+        Probes several logical elements until one of them shows up.
+
+        Args:
+            names (Iterable[str]): logical element names, in order of preference
+            timeout (float | None): seconds to keep probing, defaults to the registry budget
+
+        Raises:
+            SelectorNotFound: none of them showed up within the budget
+        """
+        names = list(names)
+        budget = self.budget if timeout is None else timeout
+        deadline = time.monotonic() + budget
+        delays = backoff(self.initial_poll, 2.0, self.poll)
+        while True:
+            found = self.probe(names)
+            if found:
+                return found
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(next(delays))
+        for name in names:
+            self.misses[name] += 1
+        self.logger.warning(f"Selectors {names} (version {self.version}) missed after {budget}s")
+        raise SelectorNotFound(
+            f"None of the locators for {', '.join(names)} matched within {budget}s "
+            f"(selectors version {self.version})"
+        )
+
+    def find(self, name: str, timeout: float | None = None):
+        """Returns the element for the logical name, raising SelectorNotFound past the budget."""
+        return self.find_any([name], timeout=timeout)[1]
+
+    def find_all(self, name: str, timeout: float | None = None) -> list:
+        """Returns every element matched by the winning locator of the logical name."""
+        self.find(name, timeout=timeout)
+        return self.driver.find_elements(*self.locator(name))
+
+    def wait_gone(self, name: str, timeout: float | None = None):
+        """Waits until none of the locators of the logical element matches anymore."""
+        deadline = time.monotonic() + (self.budget if timeout is None else timeout)
+        delays = backoff(self.initial_poll, 2.0, self.poll)
+        while self.probe([name]):
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"{name} is still present")
+            time.sleep(next(delays))
+
+    def stats(self) -> dict[str, dict]:
+        """Per logical element hit/miss counters and the locator that won last."""
+        return {
+            name: {
+                "hits": self.hits[name],
+                "misses": self.misses[name],
+                "winner": self._winners.get(name),
+            }
+            for name in self.selectors
+        }
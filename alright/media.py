@@ -0,0 +1,219 @@
+"""
+Media preprocessing ahead of send_picture / send_video: images are downscaled and
+recompressed, videos over the size limit are re-encoded when ffmpeg is installed.
+
+The work runs on a process pool, outputs are cached by content hash so repeat campaigns
+reuse them, and MediaPreprocessor.prefetch() keeps the next files processing while the
+current one uploads.
+"""
+
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from alright.cache import default_cache_dir
+
+IMAGE_MAX_SIDE = 1600
+IMAGE_QUALITY = 80
+# WhatsApp rejects videos from 16MB, send_video keeps a margin
+VIDEO_LIMIT_MB = 14
+VIDEO_MAX_WIDTH = 1280
+AUDIO_BITRATE = 96_000
+
+
+def media_kind(path: str | Path) -> str:
+    """Returns "image", "video" or "file" from the file name."""
+    mime, _ = mimetypes.guess_type(str(path))
+    if mime and mime.startswith("image/"):
+        return "image"
+    if mime and mime.startswith("video/"):
+        return "video"
+    return "file"
+
+
+def _digest(path: str | Path, params: dict) -> str:
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def preprocess_image(src: str, cache_dir: str, max_side: int = IMAGE_MAX_SIDE,
+                     quality: int = IMAGE_QUALITY) -> str:
+    """preprocess_image()
+
+    Downscales the image so its longest side is at most max_side and recompresses it as
+    JPEG, transparent areas filled with white. Returns the original path when Pillow is
+    not installed, for animations, and when the output would not be smaller; the last two
+    leave a <digest>.orig marker so the next call does not encode the image again.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return src
+
+    params = {"kind": "image", "max_side": max_side, "quality": quality}
+    digest = _digest(src, params)
+    target = Path(cache_dir) / f"{digest}.jpg"
+    original = Path(cache_dir) / f"{digest}.orig"
+    if target.exists():
+        return str(target)
+    if original.exists():
+        return src
+
+    with Image.open(src) as image:
+        if getattr(image, "is_animated", False):
+            original.touch()
+            return src
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        if transparent:
+            image = image.convert("RGBA")
+        image.thumbnail((max_side, max_side))
+        if transparent:
+            # JPEG has no alpha channel, and convert("RGB") would turn it black
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        partial = target.with_suffix(f".{os.getpid()}.part")
+        image.save(partial, "JPEG", quality=quality, optimize=True, progressive=True)
+
+    if partial.stat().st_size >= os.path.getsize(src):
+        partial.unlink()
+        original.touch()
+        return src
+    os.replace(partial, target)
+    return str(target)
+
+
+def preprocess_video(src: str, cache_dir: str, limit_mb: float = VIDEO_LIMIT_MB,
+                     max_width: int = VIDEO_MAX_WIDTH) -> str:
+    """preprocess_video()
+
+    Re-encodes a video that is over limit_mb with a bitrate computed from its duration.
+    Returns the original path when it already fits or when ffmpeg/ffprobe are missing.
+    """
+    limit = limit_mb * 1024 * 1024
+    if os.path.getsize(src) < limit:
+        return src
+    ffmpeg, ffprobe = shutil.which("ffmpeg"), shutil.which("ffprobe")
+    if not ffmpeg or not ffprobe:
+        return src
+
+    params = {"kind": "video", "limit_mb": limit_mb, "max_width": max_width}
+    target = Path(cache_dir) / f"{_digest(src, params)}.mp4"
+    if target.exists():
+        return str(target)
+
+    probe = subprocess.run(
+        [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", src],
+        capture_output=True, text=True, check=True,
+    )
+    duration = float(probe.stdout.strip() or 0)
+    if duration <= 0:
+        return src
+    # 10% headroom for the container overhead
+    video_bitrate = int(limit * 8 * 0.9 / duration) - AUDIO_BITRATE
+    if video_bitrate <= 0:
+        return src
+
+    partial = target.with_suffix(f".{os.getpid()}.part.mp4")
+    subprocess.run(
+        [
+            ffmpeg, "-y", "-v", "error", "-i", src,
+            "-vf", f"scale='min({max_width},iw)':-2",
+            "-c:v", "libx264", "-preset", "veryfast", "-b:v", str(video_bitrate),
+            "-maxrate", str(video_bitrate), "-bufsize", str(video_bitrate * 2),
+            "-c:a", "aac", "-b:a", str(AUDIO_BITRATE),
+            "-movflags", "+faststart", str(partial),
+        ],
+        check=True,
+    )
+    os.replace(partial, target)
+    return str(target)
+
+
+def preprocess(src: str, cache_dir: str, kind: str | None = None) -> str:
+    """Runs the preprocessing matching the media kind, files are returned untouched."""
+    src = os.path.realpath(src)
+    kind = kind or media_kind(src)
+    if kind == "image":
+        return preprocess_image(src, cache_dir)
+    if kind == "video":
+        return preprocess_video(src, cache_dir)
+    return src
+
+
+class MediaPreprocessor(object):
+    """MediaPreprocessor()
+
+    Args:
+        max_workers (int | None): processes in the pool, defaults to the CPU count
+        cache_dir (str | Path | None): where processed files are kept, defaults to the
+            user cache directory
+        window (int): how many files prefetch() keeps in flight ahead of the consumer
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, max_workers: int | None = None, cache_dir: str | Path | None = None,
+                 window: int = 4, logger: logging.Logger | None = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir() / "media"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.window = window
+        self.logger = logger or logging.getLogger("alright")
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, path: str | Path, kind: str | None = None) -> Future:
+        """Starts preprocessing the file, the future resolves to the path to upload."""
+        return self._pool.submit(preprocess, str(path), str(self.cache_dir), kind)
+
+    def process(self, path: str | Path, kind: str | None = None) -> str:
+        """Preprocesses one file and waits for it; failures fall back to the original."""
+        try:
+            return self.submit(path, kind).result()
+        except Exception as bug:
+            self.logger.exception(f"Could not preprocess {path}, sending the original - {bug}")
+            return os.path.realpath(path)
+
+    def prefetch(self, paths: Iterable[str | Path]) -> Iterator[tuple[str, str]]:
+        """prefetch()
+
+        Yields (original, processed) pairs in order, while the next `window` files are
+        already being processed in the pool.
+        """
+        pending: deque[tuple[str, Future]] = deque()
+        paths = iter(paths)
+        for path in paths:
+            pending.append((str(path), self.submit(path)))
+            if len(pending) >= self.window:
+                break
+        while pending:
+            path, future = pending.popleft()
+            for following in paths:
+                pending.append((str(following), self.submit(following)))
+                break
+            try:
+                yield path, future.result()
+            except Exception as bug:
+                self.logger.exception(f"Could not preprocess {path}, sending the original - {bug}")
+                yield path, os.path.realpath(path)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,435 @@
+"""
+Durable outbound queue: jobs live in SQLite (WAL mode) until they are sent, so a worker
+that dies mid-campaign resumes where it stopped instead of starting over.
+
+Every job has an idempotency key (recipient, content and campaign); enqueueing the same
+key twice is a no-op, so a new run of the same announcement needs a new campaign name.
+Jobs are claimed in batches ("sending") in one commit before anything is typed, under a
+lease held by the claiming worker, and their results are committed in one transaction
+per batch. After a crash, the jobs still marked "sending" whose lease ran out are the
+only ones in doubt: they are checked against the chat before being sent again, so
+nothing is double-sent, and several workers can share one database.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from alright.delivery import ORDER
+from alright.media import media_kind
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+DELIVERED = "delivered"
+FAILED = "failed"
+INVALID = "invalid"
+
+STATUSES = (QUEUED, SENDING, SENT, DELIVERED, FAILED, INVALID)
+
+
+def job_key(mobile: str, message: str | None = None, path: str | None = None,
+            campaign: str = "") -> str:
+    """Default idempotency key: the recipient, the content and the campaign."""
+    digest = hashlib.sha256()
+    for part in (mobile, message or "", str(path or ""), campaign):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Outbox(object):
+    """Outbox()
+
+    Args:
+        path (str | Path): the SQLite database file
+        batch_size (int): jobs claimed and committed together
+        max_attempts (int): failures before a job is marked failed instead of retried
+        owner (str | None): name of this worker in the leases, unique among the workers
+            sharing the database. Pass the same name again when a worker restarts (e.g.
+            its account name) and it recovers its own interrupted jobs at once. The
+            default is a random name per Outbox, so after a restart those jobs wait
+            until their lease runs out
+        lease (float): seconds a claimed job stays reserved to its worker, renewed while
+            the batch is being sent; after that it is in doubt and may be recovered
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, path: str | Path, batch_size: int = 20, max_attempts: int = 3,
+                 owner: str | None = None, lease: float = 300,
+                 logger: logging.Logger | None = None):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.owner = owner or uuid.uuid4().hex
+        self.lease = lease
+        self.logger = logger or logging.getLogger("alright")
+        self._lock = threading.Lock()
+        self._followed = []
+        # Delivery.key -> id of the job that sent it, for follow()
+        self._deliveries: OrderedDict[str, int] = OrderedDict()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL UNIQUE,"
+            " mobile TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " message TEXT,"
+            " path TEXT,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("campaign", "TEXT"), ("owner", "TEXT"), ("lease_until", "REAL"),
+                             ("started_at", "REAL")):
+            if column not in columns:
+                # databases created before the column existed
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        self._db.commit()
+
+    # -- producing ------------------------------------------------------------
+
+    def enqueue(self, mobile: str, message: str | None = None, path: str | Path | None = None,
+                key: str | None = None, campaign: str = "") -> str:
+        """enqueue()
+
+        Adds a text job (message) or a media job (path, with message as caption).
+
+        Args:
+            campaign (str): part of the default key, the same message can be sent to
+                the same number again under another campaign
+
+        Returns:
+            str: the idempotency key of the job
+        """
+        key = key or job_key(mobile, message, path, campaign)
+        self.enqueue_many([(mobile, message, path, key)], campaign=campaign)
+        return key
+
+    def enqueue_many(self, jobs: Iterable[tuple], campaign: str = "") -> int:
+        """enqueue_many()
+
+        Adds (mobile, message[, path[, key]]) tuples in one transaction. Keys that are
+        already in the outbox are skipped, whatever their status.
+
+        Args:
+            jobs (Iterable[tuple]): the jobs
+            campaign (str): part of the default keys, see enqueue()
+
+        Returns:
+            int: the number of new jobs
+        """
+        now = time.time()
+        rows = []
+        for job in jobs:
+            mobile, message, path, key = (tuple(job) + (None, None))[:4]
+            if message is None and path is None:
+                raise ValueError(f"Job for {mobile} has neither a message nor a file")
+            kind = "text" if path is None else media_kind(path)
+            rows.append((
+                key or job_key(mobile, message, path, campaign), str(mobile), kind, message,
+                str(path) if path is not None else None, campaign, QUEUED, now, now,
+            ))
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs"
+                " (key, mobile, kind, message, path, campaign, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self._db.total_changes - before
+        if added < len(rows):
+            self.logger.info(
+                f"{len(rows) - added} jobs of campaign {campaign!r} were already in the outbox"
+                " and are skipped, enqueue them under another campaign to send them again."
+            )
+        return added
+
+    # -- inspecting -----------------------------------------------------------
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in STATUSES} | {status: count for status, count in rows}
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def jobs(self, status: str | None = None) -> Iterator[dict]:
+        """Iterates over the jobs in queue order, optionally only one status."""
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        return (dict(row) for row in rows)
+
+    def mark(self, keys: Iterable[str], status: str, error: str | None = None):
+        """Sets the status of jobs, e.g. DELIVERED once a delivery receipt shows up."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown job status {status!r}")
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE key = ?",
+                [(status, error, now, key) for key in keys],
+            )
+
+    def follow(self, tracker):
+        """follow()
+
+        Marks the jobs drain() sent delivered as the session's DeliveryTracker sees their
+        double tick. drain() does it for sessions created with track_deliveries=True.
+        """
+        if any(followed is tracker for followed in self._followed):
+            return
+        if ORDER[tracker.until] < ORDER[DELIVERED]:
+            # keep polling past the single tick, or no job would ever be marked delivered
+            tracker.until = DELIVERED
+
+        def delivered(delivery):
+            if ORDER[delivery.status] < ORDER[DELIVERED]:
+                return
+            with self._lock, self._db:
+                # only the job that sent this message, not the same text sent by another
+                job_id = self._deliveries.pop(delivery.key, None)
+                if job_id is None:
+                    return
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (DELIVERED, time.time(), job_id, SENT),
+                )
+
+        tracker.on_status(delivered)
+        self._followed.append(tracker)
+
+    # -- draining -------------------------------------------------------------
+
+    def _claim(self, limit: int) -> list[dict]:
+        now = time.time()
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT ?", (QUEUED, limit)
+            ).fetchall()
+            # status = QUEUED again: another worker may have claimed a job since the select
+            self._db.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, lease_until = ?,"
+                " started_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                [(SENDING, self.owner, now + self.lease, now, now, row["id"], QUEUED) for row in rows],
+            )
+            claimed = {
+                row["id"] for row in self._db.execute(
+                    f"SELECT id FROM jobs WHERE status = ? AND owner = ? AND id IN ({','.join('?' * len(rows))})",
+                    (SENDING, self.owner, *(row["id"] for row in rows)),
+                )
+            } if rows else set()
+        return [
+            dict(row, attempts=row["attempts"] + 1, owner=self.owner, started_at=now)
+            for row in rows if row["id"] in claimed
+        ]
+
+    def _renew(self, jobs: list[dict]):
+        # keeps the lease of the jobs not sent yet while a long batch is going on
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ?",
+                [(now + self.lease, job["id"], self.owner) for job in jobs],
+            )
+
+    def _finish(self, results: list[tuple[dict, str, str | None]]):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, lease_until = NULL,"
+                " updated_at = ? WHERE id = ?",
+                [(status, error, now, job["id"]) for job, status, error in results],
+            )
+
+    def _send(self, whatsapp, job: dict) -> tuple[str, str | None]:
+        if job["kind"] == "text":
+            code = whatsapp.send_message_in_app(job["mobile"], job["message"]).strip()
+            if code == "1":
+                return SENT, None
+            if code == "4":
+                return INVALID, None
+            return self._retry_or_fail(job, "send_message_in_app failed")
+        try:
+            if whatsapp.open_chat_in_app(job["mobile"]) is None:
+                return INVALID, None
+        except Exception as bug:
+            return self._retry_or_fail(job, str(bug))
+        if whatsapp.send_attachments([job["path"]], [job["message"]]):
+            return SENT, None
+        return self._retry_or_fail(job, "send_attachments failed")
+
+    def _sent_by(self, job: dict, delivery, tracker):
+        # remembers which job a tracked message belongs to, as many as the tracker keeps
+        with self._lock:
+            self._deliveries[delivery.key] = job["id"]
+            while len(self._deliveries) > tracker.max_tracked:
+                self._deliveries.popitem(last=False)
+
+    def _retry_or_fail(self, job: dict, error: str) -> tuple[str, str]:
+        return (QUEUED if job["attempts"] < self.max_attempts else FAILED), error
+
+    def _was_sent(self, whatsapp, job: dict, lookback: int) -> bool:
+        # a job in doubt counts as sent when the chat ends with the same outgoing message,
+        # sent after the job was claimed - an earlier identical message does not count
+        if whatsapp.open_chat_in_app(job["mobile"]) is None:
+            return False
+        # message timestamps have a minute precision
+        claimed = datetime.fromtimestamp(job["started_at"] or job["updated_at"]).replace(
+            second=0, microsecond=0
+        )
+        for index, message in enumerate(whatsapp.iter_chat_history(None, max_batches=0)):
+            if index >= lookback or (message.timestamp is not None and message.timestamp < claimed):
+                break
+            if message.outgoing and message.timestamp is not None \
+                    and message.text.strip() == (job["message"] or "").strip() \
+                    and (job["kind"] == "text") == (message.media is None):
+                return True
+        return False
+
+    def _take_in_doubt(self) -> list[dict]:
+        # jobs left "sending" by this worker, or by one whose lease ran out, taken over
+        # in one statement so two workers never recover the same job
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET owner = ?, lease_until = ? WHERE status = ?"
+                " AND (owner IS NULL OR owner = ? OR lease_until IS NULL OR lease_until < ?)",
+                (self.owner, now + self.lease, SENDING, self.owner, now),
+            )
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? AND owner = ? ORDER BY id", (SENDING, self.owner)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recover(self, whatsapp=None, lookback: int = 20) -> dict:
+        """recover()
+
+        Settles the jobs left "sending" by a worker that died: this worker's own, and
+        those whose lease ran out. Jobs another worker is still sending are left alone.
+        With a session, each one is looked up in its chat: found means sent, missing
+        means queued again. Without one they are marked failed, never re-sent blindly.
+
+        Returns:
+            dict: {"sent": n, "requeued": n, "failed": n}
+        """
+        in_doubt = self._take_in_doubt()
+        with self._lock:
+            (leased,) = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND owner != ?", (SENDING, self.owner)
+            ).fetchone()
+        if leased:
+            self.logger.info(
+                f"{leased} jobs are being sent by other workers, or were left by a worker that"
+                " stopped; they are recovered when their lease runs out, or at once by a worker"
+                " started again with the same owner."
+            )
+        outcome = {"sent": 0, "requeued": 0, "failed": 0}
+        for job in in_doubt:
+            if whatsapp is None:
+                self._finish([(job, FAILED, "interrupted while sending")])
+                outcome["failed"] += 1
+                continue
+            try:
+                sent = self._was_sent(whatsapp, job, lookback)
+            except Exception as bug:
+                self.logger.exception(f"Could not verify job {job['key']} - {bug}")
+                self._finish([(job, FAILED, f"interrupted while sending, not verified: {bug}")])
+                outcome["failed"] += 1
+                continue
+            self._finish([(job, SENT if sent else QUEUED, None)])
+            outcome["sent" if sent else "requeued"] += 1
+        if in_doubt:
+            self.logger.info(f"Recovered {len(in_doubt)} interrupted jobs: {outcome}")
+        return outcome
+
+    def drain(self, whatsapp, limit: int | None = None) -> dict:
+        """drain()
+
+        Sends queued jobs through the session until the queue is empty (or `limit` jobs
+        were processed). Interrupted jobs of a previous run are recovered first.
+
+        Args:
+            whatsapp (WhatsApp): the session to send with
+            limit (int, optional): stop after this many jobs
+
+        Returns:
+            dict: jobs processed per resulting status, and the elapsed seconds
+        """
+        started = time.perf_counter()
+        self.recover(whatsapp)
+        tracking = getattr(whatsapp, "track_deliveries", False)
+        if tracking:
+            self.follow(whatsapp.deliveries)
+        summary = {status: 0 for status in (SENT, QUEUED, FAILED, INVALID)}
+        processed = 0
+        while limit is None or processed < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - processed)
+            batch = self._claim(size)
+            if not batch:
+                break
+            results = []
+            renewed = time.time()
+            try:
+                for index, job in enumerate(batch):
+                    if time.time() - renewed > self.lease / 2:
+                        self._renew(batch[index:])
+                        renewed = time.time()
+                    previous = getattr(whatsapp, "last_delivery", None)
+                    status, error = self._send(whatsapp, job)
+                    if tracking and status == SENT and whatsapp.last_delivery is not previous:
+                        self._sent_by(job, whatsapp.last_delivery, whatsapp.deliveries)
+                    results.append((job, status, error))
+                    summary[status] += 1
+            finally:
+                # on an interruption, the job being sent stays "sending" (in doubt) and
+                # the ones after it go back to the queue
+                untouched = batch[len(results) + 1:]
+                results += [(job, QUEUED, None) for job in untouched]
+                self._finish(results)
+            processed += len(batch)
+            if tracking:
+                # one status query for the whole batch
+                whatsapp.deliveries.poll()
+        summary["elapsed"] = time.perf_counter() - started
+        self.logger.info(f"Outbox drained: {summary}")
+        return summary
+
+    def run(self, whatsapp, poll: float = 1.0, stop: threading.Event | None = None):
+        """Keeps draining, polling for new jobs every `poll` seconds, until stop is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if not self.drain(whatsapp)[SENT]:
+                stop.wait(poll)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
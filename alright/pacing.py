@@ -0,0 +1,109 @@
+"""
+Send pacing shared by every send path of a WhatsApp session.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class AIMDPacer(object):
+    """AIMDPacer()
+
+    Token bucket whose refill rate follows AIMD: every clean send adds a little to the
+    rate, every alert or failure divides it. The rate settles just under the point where
+    WhatsApp starts throttling instead of paying a fixed wait after every message.
+
+    Args:
+        rate (float): starting rate, in messages per minute
+        min_rate (float): the rate never drops below this
+        max_rate (float): the rate never grows above this
+        increase (float): messages per minute added after each clean send
+        decrease (float): factor applied to the rate after an alert or failure
+        burst (int): messages that may be sent back to back when tokens are saved up
+    """
+
+    def __init__(
+        self,
+        rate: float = 30,
+        min_rate: float = 2,
+        max_rate: float = 120,
+        increase: float = 1,
+        decrease: float = 0.5,
+        burst: int = 1,
+        window: float = 60,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.window = window
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._sent: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / 60)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until the next message may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * 60 / self.rate
+            time.sleep(wait)
+
+    def _prune(self, now: float):
+        # only the sends of the last window are kept, whatever the campaign length
+        while self._sent and now - self._sent[0] > self.window:
+            self._sent.popleft()
+
+    def success(self):
+        """Records a clean send and raises the rate additively."""
+        with self._lock:
+            now = time.monotonic()
+            self._sent.append(now)
+            self._prune(now)
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def back_off(self):
+        """Records an alert or a failure and cuts the rate multiplicatively."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+    @property
+    def messages_per_minute(self) -> float:
+        """Effective send rate over the last window."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if not self._sent:
+                return 0.0
+            span = max(now - self._sent[0], 60 / self.rate)
+            return len(self._sent) * 60 / span
+
+
+class NoPacer(object):
+    """Sends as fast as the driver allows, for tests and already rate limited callers."""
+
+    rate = float("inf")
+    messages_per_minute = 0.0
+
+    def acquire(self):
+        pass
+
+    def success(self):
+        pass
+
+    def back_off(self):
+        pass
@@ -0,0 +1,316 @@
+"""
+WhatsAppPool runs several WhatsApp sessions, each one in its own worker process,
+and shards work between them by consistent hashing of the recipient's phone number.
+"""
+
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Iterable, Sequence
+
+from alright.cache import normalize_number
+
+
+class HashRing(object):
+    """Consistent hash ring with virtual nodes.
+
+    Removing a node only moves the keys that node owned, every other key keeps its owner.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._hashes: list[int] = []
+        self._owners: dict[int, Hashable] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def add(self, node: Hashable):
+        for replica in range(self.replicas):
+            h = self._hash(f"{node}#{replica}")
+            if h not in self._owners:
+                bisect.insort(self._hashes, h)
+            self._owners[h] = node
+
+    def remove(self, node: Hashable):
+        for replica in range(self.replicas):
+            h = self._hash(f"{node}#{replica}")
+            if self._owners.get(h) == node:
+                del self._owners[h]
+                self._hashes.pop(bisect.bisect_left(self._hashes, h))
+
+    def get(self, key: str) -> Hashable:
+        if not self._hashes:
+            raise LookupError("The hash ring is empty")
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._owners[self._hashes[index]]
+
+    def __len__(self):
+        return len(set(self._owners.values()))
+
+
+# Exit code of a worker that could not start, after it reported why on the results queue
+STARTUP_FAILED = 3
+
+
+def _worker(session: int, driver_factory: Callable, timeout: float, tasks, results):
+    # Imported here so the parent process does not need a browser to build the pool
+    from alright import WhatsApp
+
+    logger = logging.getLogger(f"alright.pool.{session}")
+    driver = None
+    try:
+        try:
+            driver = driver_factory()
+            messenger = WhatsApp(driver, timeout=timeout)
+            messenger.login()
+        except Exception as bug:
+            logger.exception(f"Session {session} could not start: {bug}")
+            results.put((None, session, False, repr(bug)))
+            # the queue is flushed before the process exits, so the parent reads the
+            # error before it sees the process gone
+            results.close()
+            results.join_thread()
+            sys.exit(STARTUP_FAILED)
+        results.put((None, session, True, "ready"))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, method, args, kwargs = task
+            try:
+                result = getattr(messenger, method)(*args, **kwargs)
+                results.put((task_id, session, True, result))
+            except Exception as bug:
+                logger.exception(f"Task {method} failed on session {session}: {bug}")
+                results.put((task_id, session, False, repr(bug)))
+    finally:
+        if driver is not None:
+            driver.quit()
+
+
+class WhatsAppPool(object):
+    """WhatsAppPool()
+
+    Owns one worker process (and one browser) per linked account. Work that targets a
+    phone number always goes to the same session while it is alive; when a session dies
+    it leaves the hash ring and its pending tasks are dispatched to the new owners.
+
+    Args:
+        driver_factories (Sequence[Callable]): one picklable callable per account that
+            builds and returns that account's webdriver inside the worker process
+        timeout (float): WebDriverWait timeout used by each session
+        replicas (int): virtual nodes per session on the hash ring
+        redispatch (bool): move the pending tasks of a dead session to the new owners of
+            their phone numbers. A task that was running when the session died may have
+            been half done. Tasks pinned to a session (broadcast()) fail instead.
+    """
+
+    logger: logging.Logger
+
+    def __init__(
+        self,
+        driver_factories: Sequence[Callable],
+        timeout: float = 60,
+        replicas: int = 64,
+        redispatch: bool = True,
+        logger: logging.Logger | None = None,
+    ):
+        self.logger = logger or logging.getLogger("alright")
+        self.redispatch = redispatch
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._futures: dict[int, Future] = {}
+        # task id -> (session, sharding key or None when pinned to the session, payload)
+        self._pending: dict[int, tuple[int, str | None, tuple]] = {}
+        self._tasks = {}
+        self._processes = {}
+        self.ring = HashRing(replicas=replicas)
+
+        for session, factory in enumerate(driver_factories):
+            tasks = self._context.Queue()
+            process = self._context.Process(
+                target=_worker,
+                args=(session, factory, timeout, tasks, self._results),
+                daemon=True,
+            )
+            process.start()
+            self._tasks[session] = tasks
+            self._processes[session] = process
+            self.ring.add(session)
+
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    @property
+    def sessions(self) -> list[int]:
+        """Sessions that are still alive."""
+        with self._lock:
+            return sorted(self._tasks)
+
+    def session_for(self, mobile: str) -> int:
+        """Returns the session that owns the given phone number."""
+        with self._lock:
+            return self.ring.get(normalize_number(mobile))  # type: ignore
+
+    def _dispatch(self, session: int, task_id: int, key: str | None, payload: tuple):
+        self._pending[task_id] = (session, key, payload)
+        self._tasks[session].put((task_id, *payload))
+
+    def _submit(self, session: int | None, key: str | None, method: str, args, kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool is closed")
+            if session is None:
+                session = self.ring.get(key)  # type: ignore
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+            self._dispatch(session, task_id, key, (method, args, kwargs))  # type: ignore
+        return future
+
+    def submit(self, mobile: str, method: str, *args, **kwargs) -> Future:
+        """submit()
+
+        Runs a WhatsApp method on the session that owns the given phone number.
+
+        Args:
+            mobile (str): the phone number used as the sharding key
+            method (str): name of the WhatsApp method to run, e.g. "send_message1"
+
+        Returns:
+            Future: resolves to the method's return value
+        """
+        return self._submit(None, normalize_number(mobile), method, args, kwargs)
+
+    def send_message(self, mobile: str, message: str) -> Future:
+        return self.submit(mobile, "send_message1", mobile, message)
+
+    def send_many(self, recipients: Iterable[str], message: str) -> list[tuple[str, Any]]:
+        """send_many()
+
+        Sends the same message to every recipient, all sessions working in parallel.
+
+        Returns:
+            list: (mobile, send_message1 result) pairs in the order of recipients
+        """
+        futures = [(mobile, self.send_message(mobile, message)) for mobile in recipients]
+        return [(mobile, future.result()) for mobile, future in futures]
+
+    def broadcast(self, method: str, *args, **kwargs) -> dict[int, Any]:
+        """broadcast()
+
+        Runs the same method on every live session, e.g. to scrape all accounts at once.
+
+        Returns:
+            dict: session -> return value
+        """
+        with self._lock:
+            sessions = sorted(self._tasks)
+        futures = {
+            session: self._submit(session, None, method, args, kwargs)
+            for session in sessions
+        }
+        return {session: future.result() for session, future in futures.items()}
+
+    def _collect(self):
+        while True:
+            try:
+                task_id, session, ok, result = self._results.get(timeout=1)
+            except queue.Empty:
+                if self._closed and not self._futures:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if task_id is None:
+                if ok:
+                    self.logger.info(f"Session {session} is ready.")
+                else:
+                    self.logger.error(f"Session {session} could not start: {result}")
+                    with self._lock:
+                        self._drop(session, f"Session {session} could not start: {result}")
+                continue
+            with self._lock:
+                self._pending.pop(task_id, None)
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _watch(self):
+        # Waits on the worker processes themselves, so a dead session is noticed right
+        # away even while the other sessions keep the results queue busy
+        while True:
+            with self._lock:
+                # a worker that could not start is dropped by _collect(), with its error
+                sentinels = [
+                    p.sentinel for p in self._processes.values() if p.exitcode != STARTUP_FAILED
+                ]
+                if not sentinels or (self._closed and not self._futures):
+                    return
+            if multiprocessing.connection.wait(sentinels, timeout=1):
+                self._check_sessions()
+
+    def _check_sessions(self):
+        with self._lock:
+            dead = [
+                s for s, p in self._processes.items()
+                if not p.is_alive() and p.exitcode != STARTUP_FAILED
+            ]
+            for session in dead:
+                self._drop(session, f"Session {session} died")
+
+    def _drop(self, session: int, reason: str):
+        # takes a session out of the ring and moves its pending tasks, lock held
+        if session not in self._processes:
+            return
+        del self._processes[session]
+        del self._tasks[session]
+        self.ring.remove(session)
+        orphans = [t for t, (s, _, _) in self._pending.items() if s == session]
+        if orphans or not self._closed:
+            self.logger.warning(f"{reason}, rebalancing its recipients.")
+
+        for task_id in orphans:
+            _, key, payload = self._pending.pop(task_id)
+            if self.redispatch and key is not None and len(self.ring):
+                self._dispatch(self.ring.get(key), task_id, key, payload)  # type: ignore
+            else:
+                self._futures.pop(task_id).set_exception(RuntimeError(reason))
+
+    def close(self, timeout: float | None = None):
+        """Stops every worker after the tasks already queued have finished."""
+        with self._lock:
+            self._closed = True
+            for tasks in self._tasks.values():
+                tasks.put(None)
+            processes = list(self._processes.values())
+        for process in processes:
+            process.join(timeout)
+        self._collector.join(timeout)
+        self._watcher.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
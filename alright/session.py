@@ -0,0 +1,234 @@
+"""
+Persistent browser profiles per WhatsApp account, so a restarted worker reuses its
+logged in session instead of scanning a QR code and cold loading the app again.
+
+Readiness is read from the page in one script call per poll: logged in, chat list
+rendered. The time it took is kept as a metric on the session.
+"""
+
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Callable
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+LOADING = "loading"
+QR_CODE = "qr"
+READY = "ready"
+
+# One round trip: is the app booted, waiting for a QR scan, or logged in with the chat
+# list hydrated (rows rendered, or the empty state of a fresh account)
+READY_PROBE_JS = """
+const qr = document.querySelector('canvas[aria-label*="scan" i], div[data-ref] canvas');
+if (qr) return {state: 'qr', rows: 0};
+const pane = document.getElementById('pane-side');
+if (!pane) return {state: 'loading', rows: 0};
+const rows = pane.querySelectorAll('[role="row"], [aria-rowindex]').length;
+const grid = pane.querySelector('[aria-rowcount]');
+const empty = grid && grid.getAttribute('aria-rowcount') === '0';
+return {state: rows || empty ? 'ready' : 'loading', rows: rows};
+"""
+
+# Chrome leaves these behind when it is killed, and refuses to open the profile again
+_SINGLETON_FILES = ("SingletonLock", "SingletonCookie", "SingletonSocket")
+
+
+def default_profile_root() -> Path:
+    try:
+        from platformdirs import user_data_dir
+    except ImportError:
+        return Path(os.path.expanduser("~/.local/share/alright/profiles"))
+    return Path(user_data_dir("alright")) / "profiles"
+
+
+def profile_dir(account: str, root: str | Path | None = None) -> Path:
+    """Returns (and creates) the browser profile directory of an account."""
+    name = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(account))
+    if not name:
+        raise ValueError("account must not be empty")
+    path = Path(root) if root else default_profile_root()
+    path = path / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def release_stale_lock(profile: str | Path) -> bool:
+    """release_stale_lock()
+
+    Removes the singleton files of a Chrome profile whose owning browser is gone (the
+    lock names host and pid). A profile held by a live browser is left alone.
+
+    Returns:
+        bool: True when a stale lock was removed
+    """
+    profile = Path(profile)
+    lock = profile / "SingletonLock"
+    try:
+        owner = os.readlink(lock)
+    except OSError:
+        return False
+    host, _, pid = owner.rpartition("-")
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+            return False
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            return False
+    for name in _SINGLETON_FILES:
+        try:
+            os.unlink(profile / name)
+        except OSError:
+            pass
+    return True
+
+
+def chrome_options(account: str, root: str | Path | None = None, headless: bool = False):
+    """Chrome options that keep the account's session in its own profile directory."""
+    options = webdriver.ChromeOptions()
+    options.add_argument(f"--user-data-dir={profile_dir(account, root)}")
+    options.add_argument("--profile-directory=Default")
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    if headless:
+        options.add_argument("--headless=new")
+    return options
+
+
+def chrome_driver(account: str, root: str | Path | None = None, headless: bool = False):
+    """chrome_driver()
+
+    Starts Chrome on the account's persistent profile. Module level, so it can be
+    handed to WhatsAppPool through functools.partial.
+    """
+    release_stale_lock(profile_dir(account, root))
+    return webdriver.Chrome(options=chrome_options(account, root, headless=headless))
+
+
+def cdp_driver(account: str, root: str | Path | None = None, headless: bool = False):
+    """cdp_driver()
+
+    Like chrome_driver(), but drives Chrome over a DevTools websocket, see alright.cdp.
+    """
+    from alright.cdp import CDPDriver
+
+    release_stale_lock(profile_dir(account, root))
+    return CDPDriver.launch(user_data_dir=profile_dir(account, root), headless=headless)
+
+
+def wait_until_ready(driver, timeout: float = 60, poll: float = 0.05,
+                     accept_qr: bool = False) -> dict:
+    """wait_until_ready()
+
+    Polls READY_PROBE_JS until the chat list is hydrated.
+
+    Args:
+        driver: the webdriver, with WhatsApp Web loaded or loading
+        timeout (float): seconds before giving up
+        poll (float): seconds between probes
+        accept_qr (bool): return as soon as the QR code shows instead of waiting for a
+            scan
+
+    Returns:
+        dict: {"state", "rows", "seconds", "probes"}
+    """
+    started = time.perf_counter()
+    deadline = started + timeout
+    probes = 0
+    result = {"state": LOADING, "rows": 0}
+    while True:
+        probes += 1
+        try:
+            result = driver.execute_script(READY_PROBE_JS) or result
+        except WebDriverException:
+            # the page is navigating, the script context is not there yet
+            pass
+        if result["state"] == READY or (accept_qr and result["state"] == QR_CODE):
+            break
+        if time.perf_counter() >= deadline:
+            raise TimeoutException(
+                f"WhatsApp Web not ready after {timeout}s (state: {result['state']})"
+            )
+        time.sleep(poll)
+    return {**result, "seconds": time.perf_counter() - started, "probes": probes}
+
+
+class Session(object):
+    """Session()
+
+    A WhatsApp session bound to a persistent browser profile.
+
+        with Session("shop-1") as messenger:
+            messenger.send_message1("255700000000", "hello")
+
+    The first start shows the QR code (headful) and waits up to `qr_timeout` for the
+    scan. Later starts reuse the profile and are ready as soon as the chat list renders.
+
+    Args:
+        account (str): the account name, used as the profile directory name
+        root (str | Path | None): where profiles live, defaults to the user data directory
+        driver_factory (Callable | None): called with the account and root to build the
+            driver, defaults to chrome_driver
+        timeout (float): seconds to wait for a logged in profile to be ready
+        qr_timeout (float): seconds to wait for a QR code scan on a new profile
+        whatsapp_kwargs: passed on to WhatsApp()
+    """
+
+    logger: logging.Logger
+
+    def __init__(self, account: str, root: str | Path | None = None,
+                 driver_factory: Callable | None = None, timeout: float = 60,
+                 qr_timeout: float = 300, logger: logging.Logger | None = None,
+                 **whatsapp_kwargs):
+        self.account = account
+        self.root = root
+        self.driver_factory = driver_factory or chrome_driver
+        self.timeout = timeout
+        self.qr_timeout = qr_timeout
+        self.logger = logger or logging.getLogger("alright")
+        self.whatsapp_kwargs = whatsapp_kwargs
+        self.whatsapp = None
+        # seconds from driver start to a hydrated chat list, None until started
+        self.time_to_ready: float | None = None
+        self.needed_qr = False
+
+    @property
+    def profile(self) -> Path:
+        return profile_dir(self.account, self.root)
+
+    def start(self):
+        """Starts the browser on the profile and returns the ready WhatsApp session."""
+        from alright import WhatsApp
+
+        started = time.perf_counter()
+        driver = self.driver_factory(self.account, self.root)
+        messenger = WhatsApp(driver, logger=self.logger, **self.whatsapp_kwargs)
+        try:
+            state = messenger.login(wait=True, timeout=self.timeout, accept_qr=True)
+            if state["state"] == QR_CODE:
+                self.needed_qr = True
+                self.logger.info(f"Scan the QR code to log {self.account} in.")
+                messenger.wait_until_ready(timeout=self.qr_timeout)
+        except Exception:
+            driver.quit()
+            raise
+        self.time_to_ready = time.perf_counter() - started
+        self.logger.info(f"{self.account} ready in {self.time_to_ready:.2f}s.")
+        self.whatsapp = messenger
+        return messenger
+
+    def close(self):
+        if self.whatsapp is not None:
+            self.whatsapp.driver.quit()
+            self.whatsapp = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
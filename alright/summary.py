@@ -0,0 +1,176 @@
+"""
+Compact records for the chat list: ChatSummary for a single row, ChatSnapshot for a whole
+list kept column by column in arrays, cheap to hold, diff and aggregate every minute.
+"""
+
+import time
+from array import array
+from dataclasses import asdict, dataclass, fields
+from typing import Iterable, Iterator
+
+# ChatSnapshot.flags bits
+UNREAD = 1
+GROUP = 2
+PINNED = 4
+MUTED = 8
+
+
+@dataclass(slots=True)
+class ChatSummary:
+    """ChatSummary()
+
+    One row of the chat list. Reads like the dicts the chat list APIs used to return
+    (chat["sender"], chat.get("row_id"), {**chat}), so existing callers keep working.
+    """
+
+    sender: str
+    time: str
+    message: str
+    unread: bool = False
+    no_of_unread: int = 0
+    group: bool = False
+    pinned: bool = False
+    muted: bool = False
+    row_id: str | None = None
+    row_index: int | None = None
+    # pane scroll position the row was seen at, set by iter_unread_chats()
+    scroll_top: int | None = None
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in KEYS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return KEYS
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+KEYS = tuple(field.name for field in fields(ChatSummary))
+
+
+class ChatSnapshot(object):
+    """ChatSnapshot()
+
+    The chat list at one point in time, one array per column instead of one object per
+    chat. Numbers and flags live in typed arrays; only names, times and previews are
+    Python strings.
+
+    Args:
+        rows (Iterable): ChatSummary records (or chat dicts) to load
+        taken_at (float | None): unix time of the snapshot, now by default
+    """
+
+    def __init__(self, rows: Iterable = (), taken_at: float | None = None):
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.row_id: list[str] = []
+        self.sender: list[str] = []
+        self.time: list[str] = []
+        self.message: list[str] = []
+        self.no_of_unread = array("I")
+        self.row_index = array("I")
+        self.flags = array("B")
+        self._positions: dict[str, int] | None = None
+        for row in rows:
+            self.append(row)
+
+    def append(self, row):
+        """Adds one chat, a ChatSummary or a chat dict."""
+        self.row_id.append(row["row_id"] or row["sender"])
+        self.sender.append(row["sender"])
+        self.time.append(row["time"])
+        self.message.append(row["message"])
+        self.no_of_unread.append(row["no_of_unread"] or 0)
+        self.row_index.append(row.get("row_index") or 0)
+        self.flags.append(
+            (UNREAD if row["unread"] else 0)
+            | (GROUP if row["group"] else 0)
+            | (PINNED if row.get("pinned") else 0)
+            | (MUTED if row.get("muted") else 0)
+        )
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.row_id)
+
+    def __getitem__(self, position: int) -> ChatSummary:
+        flags = self.flags[position]
+        return ChatSummary(
+            sender=self.sender[position],
+            time=self.time[position],
+            message=self.message[position],
+            unread=bool(flags & UNREAD),
+            no_of_unread=self.no_of_unread[position],
+            group=bool(flags & GROUP),
+            pinned=bool(flags & PINNED),
+            muted=bool(flags & MUTED),
+            row_id=self.row_id[position],
+            row_index=self.row_index[position] or None,
+        )
+
+    def __iter__(self) -> Iterator[ChatSummary]:
+        return (self[position] for position in range(len(self)))
+
+    def position(self, row_id: str) -> int | None:
+        """Index of the chat in the columns, by row id."""
+        if self._positions is None:
+            self._positions = {key: position for position, key in enumerate(self.row_id)}
+        return self._positions.get(row_id)
+
+    def total_unread(self) -> int:
+        return sum(self.no_of_unread)
+
+    def unread_ids(self) -> list[str]:
+        return [key for key, flags in zip(self.row_id, self.flags) if flags & UNREAD]
+
+    def diff(self, previous: "ChatSnapshot") -> dict:
+        """diff()
+
+        What changed since an older snapshot.
+
+        Returns:
+            dict: {"added": [row_id], "removed": [row_id], "unread": {row_id: delta},
+            "updated": [row_id]} - "updated" lists chats whose time or preview changed
+        """
+        unread, updated, added = {}, [], []
+        for position, key in enumerate(self.row_id):
+            before = previous.position(key)
+            if before is None:
+                added.append(key)
+                continue
+            delta = self.no_of_unread[position] - previous.no_of_unread[before]
+            if delta:
+                unread[key] = delta
+            if self.time[position] != previous.time[before] \
+                    or self.message[position] != previous.message[before]:
+                updated.append(key)
+        removed = [key for key in previous.row_id if self.position(key) is None]
+        return {"added": added, "removed": removed, "unread": unread, "updated": updated}
+
+    def to_numpy(self) -> dict:
+        """to_numpy()
+
+        The columns as NumPy arrays (strings as object arrays). Needs numpy installed.
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("ChatSnapshot.to_numpy() needs numpy: pip install numpy") from None
+        return {
+            "row_id": numpy.array(self.row_id, dtype=object),
+            "sender": numpy.array(self.sender, dtype=object),
+            "time": numpy.array(self.time, dtype=object),
+            "message": numpy.array(self.message, dtype=object),
+            "no_of_unread": numpy.frombuffer(self.no_of_unread, dtype=f"u{self.no_of_unread.itemsize}").copy(),
+            "row_index": numpy.frombuffer(self.row_index, dtype=f"u{self.row_index.itemsize}").copy(),
+            "flags": numpy.frombuffer(self.flags, dtype="u1").copy(),
+        }
@@ -0,0 +1,207 @@
+"""
+Adaptive waits: poll a few milliseconds after the action first and back off
+exponentially, instead of WebDriverWait's fixed half second, with a timeout budget per
+kind of operation that can be tuned from the latencies actually observed.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Callable, Iterable, Iterator
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+# Seconds each kind of operation may take before it is given up on
+BUDGETS = {
+    "default": 60.0,
+    "lookup": 10.0,
+    "search": 10.0,
+    "chat_open": 15.0,
+    "upload": 300.0,
+    "delivery": 120.0,
+}
+
+
+def scaled_budgets(timeout: float) -> dict[str, float]:
+    """scaled_budgets()
+
+    BUDGETS for a session timeout: "default" and "page_load" are the timeout, every
+    other budget keeps its proportion to the default one (lookups get a sixth of it).
+    WhatsApp(timeout=...) builds its WaitEngine from these, so the timeout still governs
+    every wait: 60 gives BUDGETS as they are, 10 gives 10/6 s lookups and 50 s uploads.
+    """
+    scale = timeout / BUDGETS["default"]
+    return {operation: seconds * scale for operation, seconds in BUDGETS.items()} | {
+        "default": timeout, "page_load": timeout,
+    }
+
+
+def backoff(initial: float = 0.005, factor: float = 2.0, maximum: float = 0.25) -> Iterator[float]:
+    """Poll intervals: initial, initial * factor, ... capped at maximum."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+class AdaptiveWait(object):
+    """AdaptiveWait()
+
+    Drop-in for WebDriverWait (until / until_not) polling with exponential backoff.
+
+    Args:
+        driver: the webdriver passed to the condition
+        timeout (float): seconds before TimeoutException
+        initial (float): first poll interval
+        factor (float): growth of the interval after each miss
+        max_poll (float): longest interval
+        ignored_exceptions (Iterable): exceptions that count as "not yet"
+        on_done (Callable | None): called with the seconds a successful wait took
+    """
+
+    def __init__(self, driver, timeout: float, initial: float = 0.005, factor: float = 2.0,
+                 max_poll: float = 0.25, ignored_exceptions: Iterable = (NoSuchElementException,),
+                 on_done: Callable[[float], None] | None = None):
+        self._driver = driver
+        self._timeout = timeout
+        self.initial = initial
+        self.factor = factor
+        self.max_poll = max_poll
+        self.ignored_exceptions = tuple(ignored_exceptions)
+        self.on_done = on_done
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout() if callable(self._timeout) else self._timeout
+
+    def _poll(self, condition: Callable, message: str):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        delays = backoff(self.initial, self.factor, self.max_poll)
+        while True:
+            if condition():
+                if self.on_done is not None:
+                    self.on_done(time.monotonic() - started)
+                return condition.value
+            now = time.monotonic()
+            if now >= deadline:
+                raise TimeoutException(message or f"Condition not met after {self.timeout:.2f}s")
+            time.sleep(min(next(delays), deadline - now))
+
+    def until(self, method: Callable, message: str = ""):
+        """Waits until method(driver) returns something truthy, and returns it."""
+        def condition():
+            try:
+                condition.value = method(self._driver)
+            except self.ignored_exceptions:
+                return False
+            return bool(condition.value)
+
+        return self._poll(condition, message)
+
+    def until_not(self, method: Callable, message: str = ""):
+        """Waits until method(driver) returns something falsy (or raises an ignored exception)."""
+        def condition():
+            try:
+                result = method(self._driver)
+            except self.ignored_exceptions:
+                result = False
+            condition.value = True if not result else result
+            return not result
+
+        return self._poll(condition, message)
+
+
+class WaitEngine(object):
+    """WaitEngine()
+
+    Hands out AdaptiveWaits with the budget of an operation and keeps the latency of
+    every successful wait, so budgets can be tightened (or relaxed) with tune().
+
+    Args:
+        driver: the webdriver
+        budgets (dict | None): operation -> seconds, merged over BUDGETS; see
+            scaled_budgets() for budgets that follow a single timeout
+        initial (float): first poll interval of every wait
+        factor (float): poll interval growth
+        max_poll (float): longest poll interval
+        samples (int): latencies kept per operation
+    """
+
+    def __init__(self, driver, budgets: dict | None = None, initial: float = 0.005,
+                 factor: float = 2.0, max_poll: float = 0.25, samples: int = 512):
+        self.driver = driver
+        self.budgets = {**BUDGETS, **(budgets or {})}
+        # the configured budgets are the ceiling tune() never goes past
+        self.ceilings = dict(self.budgets)
+        self.initial = initial
+        self.factor = factor
+        self.max_poll = max_poll
+        self.latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=samples))
+
+    def budget(self, operation: str) -> float:
+        return self.budgets.get(operation, self.budgets["default"])
+
+    def wait(self, operation: str = "default", timeout: float | None = None) -> AdaptiveWait:
+        """wait()
+
+        An AdaptiveWait for the operation. Without an explicit timeout it follows the
+        operation's budget, also after tune() changed it.
+        """
+        return AdaptiveWait(
+            self.driver,
+            (lambda: self.budget(operation)) if timeout is None else timeout,
+            initial=self.initial,
+            factor=self.factor,
+            max_poll=self.max_poll,
+            on_done=lambda seconds: self.observe(operation, seconds),
+        )
+
+    def observe(self, operation: str, seconds: float):
+        """Records how long an operation took, for tune() and stats()."""
+        self.latencies[operation].append(seconds)
+
+    def percentile(self, operation: str, q: float) -> float | None:
+        samples = sorted(self.latencies.get(operation, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def tune(self, q: float = 0.99, headroom: float = 3.0, floor: float = 1.0,
+             min_samples: int = 20) -> dict:
+        """tune()
+
+        Sets every operation's budget to headroom times its q-th latency percentile,
+        between floor and the configured budget.
+
+        Args:
+            q (float): the percentile, 0.99 by default
+            headroom (float): multiple of the percentile to allow
+            floor (float): the smallest budget
+            min_samples (int): operations with fewer latencies keep their budget
+
+        Returns:
+            dict: the budgets that changed, operation -> seconds
+        """
+        changed = {}
+        for operation, samples in self.latencies.items():
+            if len(samples) < min_samples:
+                continue
+            ceiling = self.ceilings.get(operation, self.ceilings["default"])
+            budget = min(ceiling, max(floor, self.percentile(operation, q) * headroom))
+            if budget != self.budget(operation):
+                self.budgets[operation] = budget
+                changed[operation] = budget
+        return changed
+
+    def stats(self) -> dict:
+        """Budget and observed latency percentiles per operation."""
+        return {
+            operation: {
+                "budget": self.budget(operation),
+                "count": len(self.latencies.get(operation, ())),
+                "p50": self.percentile(operation, 0.5),
+                "p95": self.percentile(operation, 0.95),
+                "p99": self.percentile(operation, 0.99),
+            }
+            for operation in sorted(set(self.budgets) | set(self.latencies))
+        }
@@ -0,0 +1,55 @@
+# Compares the single-call chat list extraction against the old row-by-row path.
+#
+# Start Chrome with --remote-debugging-port=9222, log into WhatsApp Web, then run:
+#     python benchmarks/chat_list.py 127.0.0.1:9222
+import os
+import sys
+import time
+
+from selenium import webdriver
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alright import WhatsApp
+
+
+def count_round_trips(driver):
+    counter = {"commands": 0}
+    execute = driver.execute
+
+    def counted(*args, **kwargs):
+        counter["commands"] += 1
+        return execute(*args, **kwargs)
+
+    driver.execute = counted
+    return counter
+
+
+def measure(label, func, counter, repeat):
+    counter["commands"] = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(
+        f"{label:<12} rows={len(rows):<4} round_trips={counter['commands'] / repeat:<6.1f} "
+        f"latency={elapsed * 1000:.1f} ms"
+    )
+
+
+def main():
+    address = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:9222"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    options = webdriver.ChromeOptions()
+    options.debugger_address = address
+    driver = webdriver.Chrome(options=options)
+    messenger = WhatsApp(driver)
+    counter = count_round_trips(driver)
+
+    measure("in-page", messenger.get_list_of_messages, counter, repeat)
+    measure("per-row", messenger._get_list_of_messages_by_element, counter, repeat)
+
+
+if __name__ == "__main__":
+    main()
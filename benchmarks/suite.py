@@ -0,0 +1,149 @@
+# Offline benchmark suite: runs the WhatsApp methods against tests/fake.py and reports
+# round trips, wall time and operations per second. No browser or phone needed.
+#
+#     python benchmarks/suite.py --latency 0.002 --chats 2000
+#     python benchmarks/suite.py --json > bench.json
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alright import WhatsApp
+from tests.fake import FakeDriver, FakeWhatsAppWeb
+from alright.pacing import NoPacer
+
+
+def session(args, **web_kwargs):
+    web = FakeWhatsAppWeb.with_chats(
+        args.chats, page_load=args.page_load, navigation=args.navigation,
+        delivery=args.delivery, **web_kwargs
+    )
+    driver = FakeDriver(web, latency=args.latency)
+    logger = logging.getLogger("alright.bench")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    messenger = WhatsApp(driver, timeout=10, logger=logger, pacer=NoPacer())
+    messenger.login()
+    messenger.wait.until(lambda d: web.ready)
+    return messenger, driver, web
+
+
+def run(name, args, body, ops):
+    messenger, driver, web = session(args)
+    prepare = body(messenger, web)
+    driver.reset_counters()
+    started = time.perf_counter()
+    prepare()
+    elapsed = time.perf_counter() - started
+    return {
+        "benchmark": name,
+        "ops": ops,
+        "round_trips_per_op": driver.round_trips / ops,
+        "ms_per_op": elapsed * 1000 / ops,
+        "ops_per_second": ops / elapsed if elapsed else float("inf"),
+        "commands": dict(driver.commands),
+    }
+
+
+def bench_send_message1(args):
+    numbers = [f"2557{i:08d}" for i in range(args.messages)]
+
+    def body(messenger, web):
+        return lambda: [messenger.send_message1(n, "hello\nthere") for n in numbers]
+
+    return run("send_message1", args, body, len(numbers))
+
+
+def bench_send_bulk(args):
+    numbers = [f"2557{i:08d}" for i in range(args.messages)]
+
+    def body(messenger, web):
+        return lambda: messenger.send_bulk(numbers, "hello\nthere")
+
+    return run("send_bulk", args, body, len(numbers))
+
+
+def bench_get_list_of_messages(args):
+    def body(messenger, web):
+        return lambda: [messenger.get_list_of_messages() for _ in range(args.repeat)]
+
+    return run("get_list_of_messages", args, body, args.repeat)
+
+
+def bench_fetch_all_unread_chats(args):
+    def body(messenger, web):
+        return lambda: messenger.fetch_all_unread_chats(limit=False)
+
+    return run("fetch_all_unread_chats", args, body, 1)
+
+
+def bench_search_chat_by_name(args):
+    step = max(1, args.chats // args.repeat)
+    names = [f"Contact {i:05d}" for i in range(0, args.chats, step)][: args.repeat]
+
+    def body(messenger, web):
+        return lambda: [messenger.search_chat_by_name(name) for name in names]
+
+    return run("search_chat_by_name", args, body, len(names))
+
+
+def bench_media(method, args):
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+        f.write(b"\0" * 1024)
+    try:
+        def body(messenger, web):
+            def send():
+                messenger.find_user(web.chats[0].number)
+                for _ in range(args.repeat):
+                    getattr(messenger, method)(f.name, "caption")
+            return send
+
+        return run(method, args, body, args.repeat)
+    finally:
+        os.unlink(f.name)
+
+
+BENCHMARKS = {
+    "send_message1": bench_send_message1,
+    "send_bulk": bench_send_bulk,
+    "get_list_of_messages": bench_get_list_of_messages,
+    "fetch_all_unread_chats": bench_fetch_all_unread_chats,
+    "search_chat_by_name": bench_search_chat_by_name,
+    "send_picture": lambda args: bench_media("send_picture", args),
+    "send_video": lambda args: bench_media("send_video", args),
+    "send_file": lambda args: bench_media("send_file", args),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds per driver command")
+    parser.add_argument("--page-load", type=float, default=0.5, help="seconds per full page load")
+    parser.add_argument("--navigation", type=float, default=0.05, help="seconds per in-app chat switch")
+    parser.add_argument("--delivery", type=float, default=0.2, help="seconds a message stays pending")
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("only", nargs="*", help="benchmarks to run, all by default")
+    args = parser.parse_args()
+
+    results = [BENCHMARKS[name](args) for name in (args.only or BENCHMARKS)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'benchmark':<24}{'ops':>6}{'trips/op':>10}{'ms/op':>10}{'ops/s':>10}")
+    for r in results:
+        print(
+            f"{r['benchmark']:<24}{r['ops']:>6}{r['round_trips_per_op']:>10.1f}"
+            f"{r['ms_per_op']:>10.1f}{r['ops_per_second']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
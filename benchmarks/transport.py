@@ -0,0 +1,205 @@
+# Per-command latency of the two driver backends: Selenium (HTTP to chromedriver, which
+# relays to Chrome over DevTools) against alright.cdp.CDPDriver (DevTools websocket).
+#
+# Offline, both talk to loopback stubs answering instantly, which measures the client
+# side and transport of one command; with chromedriver the relay hop comes on top:
+#     python benchmarks/transport.py --commands 2000
+#
+# With a real browser (Chrome and chromedriver installed), the same script on both:
+#     python benchmarks/transport.py --chrome --headless
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from alright.cdp import CDPDriver
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebDriverStub(BaseHTTPRequestHandler):
+    """Answers every W3C WebDriver command like chromedriver would, with no browser."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/session":
+            value = {"sessionId": "bench", "capabilities": {"browserName": "chrome"}}
+        else:
+            value = 1
+        self._reply({"value": value})
+
+    def do_DELETE(self):
+        self._reply({"value": None})
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _read_frame(conn) -> bytes | None:
+    header = conn.recv(2, socket.MSG_WAITALL)
+    if len(header) < 2 or header[0] & 0x0F == 0x8:
+        return None
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", conn.recv(2, socket.MSG_WAITALL))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", conn.recv(8, socket.MSG_WAITALL))[0]
+    mask = conn.recv(4, socket.MSG_WAITALL)
+    payload = conn.recv(length, socket.MSG_WAITALL) if length else b""
+    return bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def _write_frame(conn, payload: bytes):
+    if len(payload) < 126:
+        header = struct.pack(">BB", 0x81, len(payload))
+    elif len(payload) < 1 << 16:
+        header = struct.pack(">BBH", 0x81, 126, len(payload))
+    else:
+        header = struct.pack(">BBQ", 0x81, 127, len(payload))
+    conn.sendall(header + payload)
+
+
+def _devtools_client(conn):
+    request = b""
+    while b"\r\n\r\n" not in request:
+        request += conn.recv(4096)
+    key = next(
+        line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+        if line.lower().startswith(b"sec-websocket-key:")
+    )
+    accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID.encode()).digest())
+    conn.sendall(
+        b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+    )
+    with conn:
+        while (payload := _read_frame(conn)) is not None:
+            message = json.loads(payload)
+            if message["method"] == "Runtime.evaluate":
+                result = {"result": {"type": "number", "value": 1}}
+            elif message["method"] == "Page.getNavigationHistory":
+                result = {"currentIndex": 0, "entries": [{"url": "about:blank"}]}
+            else:
+                result = {}
+            _write_frame(conn, json.dumps({"id": message["id"], "result": result}).encode())
+
+
+def devtools_stub() -> str:
+    """A DevTools page endpoint answering every command instantly, returns its ws:// url."""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        while True:
+            conn, _ = server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=_devtools_client, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return f"ws://127.0.0.1:{server.getsockname()[1]}/devtools/page/bench"
+
+
+def measure(call, commands: int) -> dict:
+    for _ in range(min(50, commands)):
+        call()
+    samples = []
+    for _ in range(commands):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "commands": commands,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+
+
+def offline(args) -> list[dict]:
+    http = ThreadingHTTPServer(("127.0.0.1", 0), WebDriverStub)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    selenium = webdriver.Remote(
+        command_executor=f"http://127.0.0.1:{http.server_address[1]}", options=webdriver.ChromeOptions()
+    )
+    cdp = CDPDriver(devtools_stub())
+    try:
+        return [
+            {"backend": "selenium (stub)", "command": "execute_script",
+             **measure(lambda: selenium.execute_script("return 1"), args.commands)},
+            {"backend": "cdp (stub)", "command": "execute_script",
+             **measure(lambda: cdp.execute_script("return 1"), args.commands)},
+        ]
+    finally:
+        selenium.quit()
+        cdp.quit()
+        http.shutdown()
+
+
+def chrome(args) -> list[dict]:
+    page = "data:text/html,<div id='box' title='Type a message'>hello</div>"
+    options = webdriver.ChromeOptions()
+    if args.headless:
+        options.add_argument("--headless=new")
+    results = []
+    for name, driver in (
+        ("selenium", lambda: webdriver.Chrome(options=options)),
+        ("cdp", lambda: CDPDriver.launch(headless=args.headless)),
+    ):
+        driver = driver()
+        try:
+            driver.get(page)
+            box = driver.find_element(By.ID, "box")
+            for command, call in (
+                ("execute_script", lambda: driver.execute_script("return 1")),
+                ("find_element", lambda: driver.find_element(By.ID, "box")),
+                ("get_attribute", lambda: box.get_attribute("title")),
+            ):
+                results.append({"backend": name, "command": command, **measure(call, args.commands)})
+        finally:
+            driver.quit()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=1000, help="commands timed per row")
+    parser.add_argument("--chrome", action="store_true", help="drive a real Chrome instead of stubs")
+    parser.add_argument("--headless", action="store_true", help="headless Chrome, with --chrome")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = chrome(args) if args.chrome else offline(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'backend':<18}{'command':<16}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['backend']:<18}{r['command']:<16}{r['mean_ms']:>10.3f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,16 +31,21 @@ setup(
         "selenium",
         "webdriver-manager",
     ],
+    extras_require={
+        "media": ["Pillow"],
+        "cdp": ["websocket-client"],
+    },
+    entry_points={
+        "console_scripts": ["alright = alright.cli:main"],
+    },
     include_package_data=False,
-    python_requires=">=3.6",
+    python_requires=">=3.13",
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
         "Topic :: Software Development :: Build Tools",
         "License :: OSI Approved :: MIT License",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.13",
     ],
 )
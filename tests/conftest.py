@@ -0,0 +1,29 @@
+import logging
+
+import pytest
+
+from alright import WhatsApp
+from alright.pacing import NoPacer
+from tests.fake import FakeDriver, FakeWhatsAppWeb
+
+INVALID_NUMBER = "255799999999"
+
+
+@pytest.fixture
+def web():
+    return FakeWhatsAppWeb.with_chats(
+        30, page_load=0.01, navigation=0.005, delivery=0.01, invalid_numbers={INVALID_NUMBER}
+    )
+
+
+@pytest.fixture
+def driver(web):
+    return FakeDriver(web)
+
+
+@pytest.fixture
+def whatsapp(driver):
+    logger = logging.getLogger("alright.tests")
+    messenger = WhatsApp(driver, timeout=5, pacer=NoPacer(), logger=logger)
+    messenger.login(wait=True)
+    return messenger
@@ -0,0 +1,197 @@
+// A minimal DOM for running alright's in-page scripts under node, without a browser.
+// Enough for the selectors those scripts use: tag, #id, .class and [attr], [attr="v"],
+// [attr^="v"], [attr*="v" i] compounds, descendant combinators and comma lists.
+
+const FOLLOWING = 4;
+const PRECEDING = 2;
+
+class Node {
+    constructor(tag, attrs = {}, text = '') {
+        this.tagName = tag.toUpperCase();
+        this.attrs = {...attrs};
+        this.text = text;
+        this.children = [];
+        this.parentElement = null;
+        this.nodeType = 1;
+    }
+
+    get classList() {
+        return (this.attrs.class || '').split(/\s+/).filter(Boolean);
+    }
+
+    get id() {
+        return this.attrs.id || '';
+    }
+
+    get innerText() {
+        return this.text + this.children.map((child) => child.innerText).join('');
+    }
+
+    get textContent() {
+        return this.innerText;
+    }
+
+    get isConnected() {
+        let node = this;
+        while (node.parentElement) node = node.parentElement;
+        return node instanceof Document;
+    }
+
+    getAttribute(name) {
+        return name in this.attrs ? this.attrs[name] : null;
+    }
+
+    append(...children) {
+        for (const child of children) {
+            child.remove();
+            child.parentElement = this;
+            this.children.push(child);
+        }
+        return this;
+    }
+
+    prepend(...children) {
+        for (const child of children.reverse()) {
+            child.remove();
+            child.parentElement = this;
+            this.children.unshift(child);
+        }
+        return this;
+    }
+
+    remove() {
+        if (this.parentElement) {
+            const siblings = this.parentElement.children;
+            siblings.splice(siblings.indexOf(this), 1);
+            this.parentElement = null;
+        }
+    }
+
+    descendants() {
+        return this.children.flatMap((child) => [child, ...child.descendants()]);
+    }
+
+    matches(selector) {
+        return parse(selector).some((chain) => matchChain(this, chain));
+    }
+
+    closest(selector) {
+        for (let node = this; node; node = node.parentElement) {
+            if (!(node instanceof Document) && node.matches(selector)) return node;
+        }
+        return null;
+    }
+
+    querySelectorAll(selector) {
+        const chains = parse(selector);
+        return this.descendants().filter((node) => chains.some((chain) => matchChain(node, chain)));
+    }
+
+    querySelector(selector) {
+        return this.querySelectorAll(selector)[0] || null;
+    }
+
+    compareDocumentPosition(other) {
+        let root = this;
+        while (root.parentElement) root = root.parentElement;
+        const order = root.descendants();
+        return order.indexOf(other) > order.indexOf(this) ? FOLLOWING : PRECEDING;
+    }
+}
+Node.DOCUMENT_POSITION_FOLLOWING = FOLLOWING;
+Node.DOCUMENT_POSITION_PRECEDING = PRECEDING;
+
+class Document extends Node {
+    constructor() {
+        super('#document');
+        this.body = new Node('body');
+        this.append(this.body);
+    }
+
+    getElementById(id) {
+        return this.descendants().find((node) => node.id === id) || null;
+    }
+}
+
+const splitOutside = (text, separator) => {
+    const parts = [];
+    let depth = 0;
+    let current = '';
+    for (const ch of text) {
+        if (ch === '[') depth++;
+        if (ch === ']') depth--;
+        if (depth === 0 && separator.test(ch)) {
+            if (current.trim()) parts.push(current.trim());
+            current = '';
+        } else {
+            current += ch;
+        }
+    }
+    if (current.trim()) parts.push(current.trim());
+    return parts;
+};
+
+const parseCompound = (text) => {
+    const test = {tag: null, id: null, classes: [], attrs: []};
+    const pattern = /^([a-z*]+)|#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:([\^*]?=)"([^"]*)"(\s+i)?)?\]/gi;
+    for (const m of text.matchAll(pattern)) {
+        if (m[1]) test.tag = m[1].toUpperCase();
+        else if (m[2]) test.id = m[2];
+        else if (m[3]) test.classes.push(m[3]);
+        else test.attrs.push({name: m[4], op: m[5], value: m[6], fold: !!m[7]});
+    }
+    return test;
+};
+
+const parse = (selector) => splitOutside(selector, /,/).map(
+    (chain) => splitOutside(chain, /\s/).map(parseCompound)
+);
+
+const matchCompound = (node, test) => {
+    if (!node || node instanceof Document) return false;
+    if (test.tag && test.tag !== '*' && node.tagName !== test.tag) return false;
+    if (test.id && node.id !== test.id) return false;
+    if (!test.classes.every((name) => node.classList.includes(name))) return false;
+    return test.attrs.every(({name, op, value, fold}) => {
+        let actual = node.getAttribute(name);
+        if (actual === null) return false;
+        if (!op) return true;
+        if (fold) [actual, value] = [actual.toLowerCase(), value.toLowerCase()];
+        if (op === '=') return actual === value;
+        if (op === '^=') return actual.startsWith(value);
+        return actual.includes(value);
+    });
+};
+
+const matchChain = (node, chain) => {
+    if (!matchCompound(node, chain[chain.length - 1])) return false;
+    let index = chain.length - 2;
+    for (let ancestor = node.parentElement; index >= 0 && ancestor; ancestor = ancestor.parentElement) {
+        if (matchCompound(ancestor, chain[index])) index--;
+    }
+    return index < 0;
+};
+
+// Records observers, mutations are delivered by hand with notify()
+const observers = [];
+class MutationObserver {
+    constructor(callback) {
+        this.callback = callback;
+    }
+
+    observe() {
+        observers.push(this);
+    }
+}
+
+const notify = (target, addedNodes) => {
+    for (const observer of observers) observer.callback([{target, addedNodes}]);
+};
+
+let now = 1_000_000;
+const clock = {
+    now: () => now,
+    advance: (ms) => { now += ms; },
+};
+
+module.exports = {Node, Document, MutationObserver, notify, clock};
@@ -0,0 +1,826 @@
+"""
+In-process fake of the WebDriver surface alright uses, running against a scripted model
+of WhatsApp Web, with a configurable latency per command.
+
+It makes performance work measurable without a phone or a live session:
+
+    web = FakeWhatsAppWeb.with_chats(500)
+    driver = FakeDriver(web, latency=0.002)
+    messenger = WhatsApp(driver)
+
+Every driver call goes through FakeDriver.execute(), like it does on a real remote
+WebDriver, so round trips can be counted (driver.commands) and instrumented the same way.
+In-page scripts are recognised by identity and answered by the model; any other script
+raises JavascriptException, which sends alright down its element-by-element fallbacks.
+"""
+
+import itertools
+import mimetypes
+import time
+import zlib
+from collections import Counter
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoAlertPresentException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    UnexpectedAlertPresentException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.switch_to import SwitchTo
+
+import alright
+from alright import chats, compose, delivery, events, history, locators, session
+
+ROW_HEIGHT = 72
+PANE_HEIGHT = 720
+# messages of the open chat rendered initially, and added per scroll back
+HISTORY_BATCH = 40
+
+_ALERT_COMMANDS = {Command.W3C_GET_ALERT_TEXT, Command.W3C_ACCEPT_ALERT, Command.W3C_DISMISS_ALERT}
+
+
+class FakeChat(object):
+    def __init__(self, name: str, number: str | None = None, group: bool = False,
+                 pinned: bool = False, muted: bool = False, unread: int = 0,
+                 preview: str = "", time: str = "12:00"):
+        self.name = name
+        self.number = number
+        self.group = group
+        self.pinned = pinned
+        self.muted = muted
+        self.unread = unread
+        self.preview = preview
+        self.time = time
+        self.id = f"chat-{number or name}"
+        self.messages: list[dict] = []
+
+
+class FakeWhatsAppWeb(object):
+    """FakeWhatsAppWeb()
+
+    Scripted model of a logged in WhatsApp Web page.
+
+    Args:
+        chats (list[FakeChat]): the chat list, top first
+        invalid_numbers (set[str]): numbers that are not on WhatsApp
+        page_load (float): seconds a full page load takes before the app is usable
+        navigation (float): seconds an in-app chat switch takes
+        delivery (float): seconds an outgoing message stays pending (clock icon)
+        throttle (float): an alert pops when two sends are closer than this, 0 disables it
+        logged_in (bool): False shows the QR code instead of the app until scan() is called
+    """
+
+    def __init__(self, chats: list[FakeChat] | None = None, invalid_numbers=(),
+                 page_load: float = 0.5, navigation: float = 0.05,
+                 delivery: float = 0.2, throttle: float = 0.0, logged_in: bool = True):
+        self.chats = list(chats or [])
+        self.invalid_numbers = set(invalid_numbers)
+        self.page_load = page_load
+        self.navigation = navigation
+        self.delivery = delivery
+        self.throttle = throttle
+
+        self.loaded = False
+        self.logged_in = logged_in
+        self.ready_at = 0.0
+        self.open_chat: FakeChat | None = None
+        self.generation = 0
+        self.invalid_dialog = False
+        self.menu_open = False
+        self.attach_open = False
+        self.staged: list[str] = []
+        # caption per staged file, and the file the media editor currently shows
+        self.captions: dict[int, str] = {}
+        self.selected = 0
+        self.compose = ""
+        self.rendered = HISTORY_BATCH
+        self.search = ""
+        self.scroll_top = 0
+        self.focus: tuple[str, Any] | None = None
+        self.alert: str | None = None
+        self.last_send = 0.0
+        self.observer = False
+        # window.__alrightChatRows: chat index token -> row id -> fingerprint
+        self.fingerprints: dict[str, dict[str, str]] = {}
+        self.events: list[dict] = []
+        self._seq = itertools.count(1)
+        self._msg_ids = itertools.count(1)
+
+    @classmethod
+    def with_chats(cls, count: int, unread_every: int = 7, pinned: int = 3, **kwargs):
+        """Builds a model with `count` chats, some unread, the first few pinned."""
+        chats = [
+            FakeChat(
+                name=f"Contact {i:05d}",
+                number=f"2557{i:08d}",
+                group=i % 11 == 0,
+                pinned=i < pinned,
+                muted=i % 13 == 0,
+                unread=(i % 5) + 1 if i % unread_every == 0 else 0,
+                preview=f"last message {i}",
+                time=f"{(i // 60) % 24:02d}:{i % 60:02d}",
+            )
+            for i in range(count)
+        ]
+        return cls(chats, **kwargs)
+
+    # -- state ------------------------------------------------------------------
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded and time.monotonic() >= self.ready_at
+
+    def chat_by_number(self, number: str) -> FakeChat:
+        for chat in self.chats:
+            if chat.number == number:
+                return chat
+        chat = FakeChat(name=f"+{number}", number=number)
+        self.chats.insert(0, chat)
+        return chat
+
+    def navigate(self, number: str | None, delay: float):
+        self.ready_at = time.monotonic() + delay
+        self.generation += 1
+        self.compose = ""
+        self.rendered = HISTORY_BATCH
+        self.attach_open = False
+        self.staged = []
+        if number is None:
+            self.open_chat = None
+        elif number in self.invalid_numbers:
+            self.open_chat = None
+            self.invalid_dialog = True
+        else:
+            self.open_chat = self.chat_by_number(number)
+            self.open_chat.unread = 0
+
+    def select(self, chat: FakeChat):
+        self.generation += 1
+        self.open_chat = chat
+        self.compose = ""
+        self.rendered = HISTORY_BATCH
+        chat.unread = 0
+
+    def visible_rows(self) -> list[tuple[int, FakeChat]]:
+        first = self.scroll_top // ROW_HEIGHT
+        last = (self.scroll_top + PANE_HEIGHT) // ROW_HEIGHT + 1
+        return list(enumerate(self.chats))[first:last]
+
+    def pending(self) -> bool:
+        now = time.monotonic()
+        return bool(self.open_chat) and any(
+            m["outgoing"] and m["sent_at"] + self.delivery > now
+            for m in self.open_chat.messages[-20:]
+        )
+
+    def tick(self, message: dict) -> str:
+        """Status of an outgoing message: every `delivery` seconds it moves one step on."""
+        steps = (time.monotonic() - message["sent_at"]) / self.delivery if self.delivery else 3
+        return ("pending", "sent", "delivered", "delivered", "read")[min(int(steps), 4)]
+
+    def post(self, chat: FakeChat, text: str, outgoing: bool = True, media: str | None = None):
+        now = time.monotonic()
+        if outgoing and self.throttle and now - self.last_send < self.throttle:
+            self.alert = "You are sending messages too fast"
+        self.last_send = now
+        message = {
+            "id": f"{'true' if outgoing else 'false'}_{chat.number or chat.name}_{next(self._msg_ids)}",
+            "outgoing": outgoing,
+            "text": text,
+            "media": media,
+            "sent_at": now,
+            "time": time.strftime("%H:%M"),
+            "date": time.strftime("%d/%m/%Y"),
+            "sender": None if outgoing else chat.name,
+        }
+        chat.messages.append(message)
+        chat.preview = text or (media or "")
+        chat.time = message["time"]
+        if chat in self.chats:
+            self.chats.remove(chat)
+        self.chats.insert(sum(1 for c in self.chats if c.pinned), chat)
+        return message
+
+    def scan(self):
+        """Logs the page in, as if the QR code was scanned with the phone."""
+        self.logged_in = True
+
+    def receive(self, name: str, text: str):
+        """Delivers an incoming message to the chat, as if somebody sent it."""
+        chat = next((c for c in self.chats if c.name == name), None) or FakeChat(name)
+        message = self.post(chat, text, outgoing=False)
+        if chat is not self.open_chat:
+            chat.unread += 1
+        if self.observer:
+            self.events.append({
+                "type": "message" if chat is self.open_chat else "unread",
+                "chat": chat.name,
+                "count": None if chat is self.open_chat else chat.unread,
+                "text": text,
+                "id": message["id"],
+                "seq": next(self._seq),
+                "timestamp": time.time(),
+            })
+
+    def row_dict(self, index: int, chat: FakeChat) -> dict:
+        return {
+            "sender": chat.name,
+            "time": chat.time,
+            "message": chat.preview,
+            "no_of_unread": chat.unread,
+            "marked_unread": False,
+            "group": chat.group,
+            "pinned": chat.pinned,
+            "muted": chat.muted,
+            "row_id": chat.id,
+            "row_index": index + 1,
+        }
+
+    def row_fingerprint(self, chat: FakeChat) -> str:
+        flags = (chat.group, chat.pinned, chat.muted)
+        return format(zlib.crc32(f"{self.row_text(chat)}\x01{flags}".encode()), "x")
+
+    def row_text(self, chat: FakeChat) -> str:
+        lines = [chat.name, chat.time, chat.preview]
+        if chat.unread:
+            lines.append(str(chat.unread))
+        return "\n".join(lines)
+
+
+class FakeElement(object):
+    """The WebElement surface alright uses, backed by FakeDriver.execute()."""
+
+    def __init__(self, parent: "FakeDriver", kind: str, key: Any = None):
+        self.parent = parent
+        self.kind = kind
+        self.key = key
+        self.id = f"{kind}:{key}"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeElement) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<FakeElement {self.id}>"
+
+    def _execute(self, command: str, params: dict | None = None):
+        return self.parent.execute(command, {"id": self.id, **(params or {})})["value"]
+
+    @property
+    def text(self) -> str:
+        return self._execute(Command.GET_ELEMENT_TEXT)
+
+    @property
+    def aria_role(self) -> str:
+        return self._execute(Command.GET_ELEMENT_ARIA_ROLE)
+
+    def get_attribute(self, name: str):
+        return self._execute(Command.GET_ELEMENT_ATTRIBUTE, {"name": name})
+
+    def send_keys(self, *value):
+        self._execute(Command.SEND_KEYS_TO_ELEMENT, {"text": "".join(map(str, value))})
+
+    def click(self):
+        self._execute(Command.CLICK_ELEMENT)
+
+    def clear(self):
+        self._execute(Command.CLEAR_ELEMENT)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._execute(Command.FIND_CHILD_ELEMENTS, {"using": by, "value": value})
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+
+class FakeDriver(object):
+    """FakeDriver()
+
+    Args:
+        web (FakeWhatsAppWeb): the page model, a fresh one with 100 chats by default
+        latency (float): seconds added to every command, like a WebDriver HTTP round trip
+    """
+
+    def __init__(self, web: FakeWhatsAppWeb | None = None, latency: float = 0.0):
+        self.web = web if web is not None else FakeWhatsAppWeb.with_chats(100)
+        self.latency = latency
+        self.commands: Counter = Counter()
+        self.scripts: Counter = Counter()
+        self.switch_to = SwitchTo(self)
+        self.current_url = "about:blank"
+        self._locators = {}
+        for name, candidates in locators.SELECTORS.items():
+            for locator in candidates:
+                self._locators[tuple(locator)] = name
+        self._locators[(By.XPATH, alright.CHAT_ROWS_XPATH)] = "chat_row"
+        self._locators[(By.ID, "app")] = "app"
+        self._scripts = {
+            locators.PROBE_LOCATORS_JS: self._probe,
+            alright.REFRESH_CHAT_ROWS_JS: self._refresh_rows,
+            alright.SCROLL_CHAT_PANE_JS: self._scroll_pane,
+            alright.OPEN_CHAT_IN_APP_JS: self._open_in_app,
+            chats.JUMP_TO_ROW_JS: self._jump_to_row,
+            events.INSTALL_OBSERVER_JS: self._install_observer,
+            events.DRAIN_EVENTS_JS: self._drain_events,
+            session.READY_PROBE_JS: self._ready_probe,
+            history.EXTRACT_HISTORY_JS: self._extract_history,
+            history.LAST_MESSAGE_JS: self._last_message,
+            delivery.TRACK_OUTGOING_JS: self._track_outgoing,
+            delivery.DELIVERY_STATUS_JS: self._delivery_status,
+            compose.INSERT_TEXT_JS: self._insert_text,
+            compose.CLEAR_BOX_JS: self._clear_box,
+            alright.DIALOG_TEXT_JS: self._dialog_text,
+        }
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.commands.values())
+
+    def reset_counters(self):
+        self.commands.clear()
+        self.scripts.clear()
+
+    # -- WebDriver API --------------------------------------------------------
+
+    def execute(self, driver_command: str, params: dict | None = None) -> dict:
+        self.commands[driver_command] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = params or {}
+        if self.web.alert and driver_command not in _ALERT_COMMANDS:
+            text, self.web.alert = self.web.alert, None
+            raise UnexpectedAlertPresentException(alert_text=text)
+        handler = getattr(self, f"_cmd_{driver_command}", None)
+        if handler is None:
+            raise NotImplementedError(f"FakeDriver does not support {driver_command}")
+        return {"value": handler(**params)}
+
+    def get(self, url: str):
+        self.execute(Command.GET, {"url": url})
+
+    def find_element(self, by=By.ID, value=None):
+        return self.execute(Command.FIND_ELEMENT, {"using": by, "value": value})["value"]
+
+    def find_elements(self, by=By.ID, value=None):
+        return self.execute(Command.FIND_ELEMENTS, {"using": by, "value": value})["value"]
+
+    def execute_script(self, script: str, *args):
+        return self.execute(Command.W3C_EXECUTE_SCRIPT, {"script": script, "args": list(args)})["value"]
+
+    def execute_async_script(self, script: str, *args):
+        return self.execute(Command.W3C_EXECUTE_SCRIPT_ASYNC, {"script": script, "args": list(args)})["value"]
+
+    def close(self):
+        self.execute(Command.CLOSE)
+
+    def quit(self):
+        self.execute(Command.QUIT)
+
+    # -- commands -------------------------------------------------------------
+
+    def _cmd_get(self, url: str):
+        web = self.web
+        self.current_url = url
+        web.loaded = True
+        web.invalid_dialog = False
+        query = parse_qs(urlparse(url).query)
+        web.navigate(query["phone"][0] if "phone" in query else None, web.page_load)
+        web.observer = False
+        web.fingerprints = {}
+        web.scroll_top = 0
+
+    def _cmd_findElement(self, using: str, value: str):
+        found = self._resolve(using, value)
+        if not found:
+            raise NoSuchElementException(f"{using}={value}")
+        return found[0]
+
+    def _cmd_findElements(self, using: str, value: str):
+        return self._resolve(using, value)
+
+    def _cmd_findChildElements(self, id: str, using: str, value: str):
+        element = self._element(id)
+        if element.kind == "chat_row" and using == By.TAG_NAME and value == "span":
+            return [FakeElement(self, "row_span", element.key)]
+        return []
+
+    def _cmd_w3cExecuteScript(self, script: str, args: list):
+        handler = self._scripts.get(script)
+        if handler is None:
+            raise JavascriptException("Script not supported by FakeDriver")
+        self.scripts[handler.__name__.lstrip("_")] += 1
+        return handler(*args)
+
+    def _cmd_w3cExecuteScriptAsync(self, script: str, args: list):
+        return self._cmd_w3cExecuteScript(script, args)
+
+    def _cmd_getElementText(self, id: str):
+        element = self._live(id)
+        web = self.web
+        if element.kind == "chat_row":
+            return web.row_text(web.chats[element.key])
+        if element.kind == "invalid_number_ok":
+            return "OK"
+        if element.kind == "chat_title":
+            return web.open_chat.name
+        if element.kind == "chat_subtitle":
+            return "click here for contact info"
+        if element.kind == "incoming_messages":
+            message = web.open_chat.messages[element.key]
+            return f"{message['text']}\n{message['time']}"
+        return ""
+
+    def _cmd_getElementAriaRole(self, id: str):
+        return {"message_box": "textbox", "invalid_number_ok": "button"}.get(
+            self._live(id).kind, "generic"
+        )
+
+    def _cmd_getElementAttribute(self, id: str, name: str):
+        element = self._live(id)
+        web = self.web
+        if element.kind == "chat_title" and name == "title":
+            return web.open_chat.name
+        if element.kind == "chat_avatar" and name == "data-testid":
+            return "default-group" if web.open_chat.group else "default-user"
+        if element.kind == "row_span" and name == "innerHTML":
+            return '<span data-icon="pinned"></span>' if web.chats[element.key].pinned else ""
+        if element.kind == "incoming_messages" and name == "innerHTML":
+            return "media-play" if web.open_chat.messages[element.key]["media"] else ""
+        if element.kind == "pane" and name == "aria-rowcount":
+            return str(len(web.chats))
+        return None
+
+    def _cmd_sendKeysToElement(self, id: str, text: str):
+        element = self._live(id)
+        if compose.outside_bmp(text):
+            raise WebDriverException("unknown error: ChromeDriver only supports characters in the BMP")
+        web = self.web
+        web.focus = (element.kind, element.key)
+        kind = element.kind
+        if kind == "message_box":
+            self._type(text)
+        elif kind.startswith("caption_"):
+            web.captions[web.selected] = web.captions.get(web.selected, "") + text.replace(Keys.ENTER, "")
+        elif kind in ("search_box", "chat_list_search"):
+            if Keys.ARROW_DOWN in text:
+                web.focus = ("chat_row", web.visible_rows()[0][0])
+            elif Keys.ESCAPE in text:
+                web.search = ""
+            elif Keys.ENTER in text:
+                match = next((c for c in web.chats if web.search.upper() in c.name.upper()), None)
+                if match:
+                    web.select(match)
+            else:
+                web.search += text
+        elif kind == "chat_row":
+            if Keys.ARROW_DOWN in text:
+                index = min(element.key + 1, len(web.chats) - 1)
+                if (index + 1) * ROW_HEIGHT > web.scroll_top + PANE_HEIGHT:
+                    web.scroll_top += ROW_HEIGHT
+                web.focus = ("chat_row", index)
+            elif Keys.ENTER in text:
+                web.select(web.chats[element.key])
+        elif kind == "invalid_number_ok":
+            web.invalid_dialog = False
+        elif kind in ("attach_media_input", "attach_document_input"):
+            web.staged.extend(path for path in text.split("\n") if path)
+            web.attach_open = False
+            web.captions = {}
+            web.selected = 0
+        elif kind == "pane":
+            if Keys.PAGE_DOWN in text:
+                web.scroll_top = min(web.scroll_top + PANE_HEIGHT, self._max_scroll())
+
+    def _cmd_clickElement(self, id: str):
+        element = self._live(id)
+        web = self.web
+        if element.kind == "attach_button":
+            web.attach_open = True
+        elif element.kind == "media_send_button":
+            for index, path in enumerate(web.staged):
+                web.post(web.open_chat, web.captions.get(index, ""), media=path)
+            web.staged = []
+            web.captions = {}
+            web.selected = 0
+        elif element.kind == "media_thumbnail":
+            web.selected = element.key
+        elif element.kind == "chat_row":
+            web.select(web.chats[element.key])
+        elif element.kind == "menu_button":
+            web.menu_open = True
+        elif element.kind == "logout_item":
+            web.loaded = False
+        elif element.kind in ("message_box", "search_box", "chat_list_search"):
+            web.focus = (element.kind, element.key)
+
+    def _cmd_clearElement(self, id: str):
+        if self._live(id).kind in ("search_box", "chat_list_search"):
+            self.web.search = ""
+
+    def _cmd_w3cGetActiveElement(self):
+        if self.web.focus is None:
+            return FakeElement(self, "body")
+        kind, key = self.web.focus
+        return FakeElement(self, kind, key)
+
+    def _cmd_w3cGetAlertText(self):
+        if self.web.alert is None:
+            raise NoAlertPresentException()
+        return self.web.alert
+
+    def _cmd_w3cAcceptAlert(self):
+        if self.web.alert is None:
+            raise NoAlertPresentException()
+        self.web.alert = None
+
+    _cmd_w3cDismissAlert = _cmd_w3cAcceptAlert
+
+    def _cmd_actions(self, actions: list):
+        typed = []
+        shift = False
+        for device in actions:
+            if device["type"] != "key":
+                continue
+            for action in device["actions"]:
+                if action["type"] == "keyDown":
+                    if action["value"] == Keys.SHIFT:
+                        shift = True
+                    elif action["value"] == Keys.ENTER and shift:
+                        typed.append("\n")
+                    else:
+                        typed.append(action["value"])
+                elif action["type"] == "keyUp" and action["value"] == Keys.SHIFT:
+                    shift = False
+        text = "".join(typed)
+        focus = self.web.focus
+        if focus and focus[0].startswith("caption_"):
+            self.web.captions[self.web.selected] = self.web.captions.get(self.web.selected, "") + text
+        elif focus and focus[0] == "message_box":
+            self._type(text)
+
+    def _cmd_clearActionState(self):
+        pass
+
+    def _cmd_close(self):
+        self.web.loaded = False
+
+    def _cmd_quit(self):
+        self.web.loaded = False
+
+    # -- model helpers --------------------------------------------------------
+
+    def _type(self, text: str):
+        web = self.web
+        text = text.replace(Keys.SPACE, " ")
+        head, enter, tail = text.partition(Keys.ENTER)
+        web.compose += head
+        if enter:
+            body = web.compose.rstrip("\n")
+            web.compose = ""
+            if body.strip():
+                web.post(web.open_chat, body)
+            if tail:
+                self._type(tail)
+
+    def _max_scroll(self) -> int:
+        return max(0, len(self.web.chats) * ROW_HEIGHT - PANE_HEIGHT)
+
+    def _exists(self, name: str) -> list:
+        web = self.web
+        if not web.loaded:
+            return []
+        if name == "app":
+            return [FakeElement(self, "app")]
+        if not web.ready or not web.logged_in:
+            return []
+        gen = web.generation
+        in_chat = web.open_chat is not None and not web.invalid_dialog
+        if name in ("search_box", "chat_list_search", "menu_button"):
+            return [FakeElement(self, name)]
+        if name == "chat_row":
+            return [FakeElement(self, "chat_row", index) for index, _ in web.visible_rows()]
+        if name == "logout_item":
+            return [FakeElement(self, name)] if web.menu_open else []
+        if name == "invalid_number_ok":
+            return [FakeElement(self, name)] if web.invalid_dialog else []
+        if name in ("chat_title", "chat_avatar", "chat_subtitle", "message_box", "attach_button"):
+            return [FakeElement(self, name, gen)] if in_chat else []
+        if name in ("attach_media_input", "attach_document_input"):
+            return [FakeElement(self, name, gen)] if web.attach_open else []
+        if name == "media_thumbnail":
+            return [FakeElement(self, name, index) for index in range(len(web.staged))]
+        if name.startswith("caption_") or name == "media_send_button":
+            return [FakeElement(self, name, gen)] if web.staged else []
+        if name == "pending_icon":
+            return [FakeElement(self, name, gen)] if web.pending() else []
+        if name == "incoming_messages" and in_chat:
+            return [
+                FakeElement(self, name, index)
+                for index, message in enumerate(web.open_chat.messages)
+                if not message["outgoing"]
+            ]
+        return []
+
+    def _resolve(self, using: str, value: str) -> list:
+        if (using, value) == (By.XPATH, '//div[@id="pane-side"]/div[2]'):
+            return [FakeElement(self, "pane")] if self.web.ready else []
+        name = self._locators.get((using, value))
+        if name is None:
+            return []
+        return self._exists(name)
+
+    def _element(self, id: str) -> FakeElement:
+        kind, _, key = id.partition(":")
+        if key == "None":
+            key = None
+        elif key.lstrip("-").isdigit():
+            key = int(key)
+        return FakeElement(self, kind, key)
+
+    def _live(self, id: str) -> FakeElement:
+        element = self._element(id)
+        generational = {"chat_title", "chat_avatar", "chat_subtitle", "message_box",
+                        "attach_button", "attach_media_input", "attach_document_input",
+                        "media_send_button", "pending_icon"}
+        if (element.kind in generational or element.kind.startswith("caption_")) \
+                and element.key != self.web.generation:
+            raise StaleElementReferenceException(f"{id} is no longer attached to the DOM")
+        return element
+
+    # -- in-page scripts ------------------------------------------------------
+
+    def _probe(self, candidates):
+        for index, (using, value) in enumerate(candidates):
+            found = self._resolve(using, value)
+            if found:
+                return [index, found[0]]
+        return None
+
+    def _refresh_rows(self, xpath, token, forget):
+        if not self.web.ready:
+            return []
+        known = self.web.fingerprints.setdefault(token, {})
+        for row_id in forget:
+            known.pop(row_id, None)
+        rows = []
+        for index, chat in self.web.visible_rows():
+            fingerprint = self.web.row_fingerprint(chat)
+            if known.get(chat.id) == fingerprint:
+                rows.append({"row_id": chat.id, "row_index": index + 1})
+            else:
+                known[chat.id] = fingerprint
+                rows.append(self.web.row_dict(index, chat))
+        return rows
+
+    def _dialog_text(self, ok):
+        if self.web.invalid_dialog:
+            return "Phone number shared via url is invalid.\nOK"
+        return "OK"
+
+    def _scroll_pane(self, position):
+        web = self.web
+        web.scroll_top = max(0, min(int(position), self._max_scroll()))
+        return {
+            "scroll_top": web.scroll_top,
+            "scroll_height": len(web.chats) * ROW_HEIGHT,
+            "client_height": PANE_HEIGHT,
+            "row_count": len(web.chats),
+        }
+
+    def _open_in_app(self, url):
+        web = self.web
+        number = urlparse(url).path.strip("/")
+        web.invalid_dialog = False
+        web.navigate(number, web.navigation)
+        return True
+
+    def _jump_to_row(self, row_index, row_id, name, xpath):
+        web = self.web
+        web.scroll_top = max(0, min((row_index - 1) * ROW_HEIGHT - PANE_HEIGHT // 2, self._max_scroll()))
+        for index, chat in web.visible_rows():
+            if chat.id == row_id or chat.name == name:
+                return FakeElement(self, "chat_row", index)
+        return None
+
+    def _install_observer(self, capacity):
+        installed = not self.web.observer
+        self.web.observer = True
+        return installed
+
+    def _drain_events(self, max_events):
+        if not self.web.observer:
+            return None
+        count = max_events or len(self.web.events)
+        batch, self.web.events = self.web.events[:count], self.web.events[count:]
+        return {"events": batch, "dropped": 0}
+
+    def _ready_probe(self):
+        web = self.web
+        if not web.ready:
+            return {"state": "loading", "rows": 0}
+        if not web.logged_in:
+            return {"state": "qr", "rows": 0}
+        return {"state": "ready", "rows": len(web.visible_rows())}
+
+    def _extract_history(self, before_id, scroll, timeout_ms):
+        web = self.web
+        chat = web.open_chat
+        if not web.ready or chat is None or not chat.messages:
+            return {"rows": [], "at_top": True, "date_order": "DMY"}
+        loaded = web.rendered
+        if scroll:
+            web.rendered = min(len(chat.messages), web.rendered + HISTORY_BATCH)
+        rows = []
+        for message in chat.messages[-web.rendered:]:
+            if message["id"] == before_id:
+                break
+            rows.append(self._message_row(message))
+        return {"rows": rows, "at_top": bool(scroll) and web.rendered == loaded, "date_order": "DMY"}
+
+    def _last_message(self, title, timeout_ms):
+        web = self.web
+        chat = web.open_chat
+        if not web.ready or chat is None or web.invalid_dialog:
+            return None
+        if not title or chat.name.upper() != title.upper():
+            return None
+        incoming = [message for message in chat.messages if not message["outgoing"]]
+        return {
+            "title": chat.name,
+            "group": chat.group,
+            "date_order": "DMY",
+            "message": self._message_row(incoming[-1]) if incoming else None,
+        }
+
+    def _message_row(self, message: dict) -> dict:
+        sender = "You" if message["outgoing"] else message["sender"]
+        media = message["media"] and mimetypes.guess_type(message["media"])[0]
+        return {
+            "id": message["id"],
+            "outgoing": message["outgoing"],
+            "pre": f"[{message['time']}, {message['date']}] {sender}: ",
+            "text": message["text"],
+            "media": media.split("/")[0] if media else None,
+            "quoted": message.get("quoted"),
+        }
+
+    def _track_outgoing(self, text, timeout_ms):
+        chat = self.web.open_chat
+        outgoing = [m for m in chat.messages if m["outgoing"]] if chat else []
+        if not outgoing:
+            return None
+        message = outgoing[-1]
+        if text and message["text"].strip() != text.strip():
+            return None
+        return {"id": message["id"], "chat": chat.name, "status": self.web.tick(message)}
+
+    def _insert_text(self, box, text):
+        element = self._live(box.id)
+        web = self.web
+        web.focus = (element.kind, element.key)
+        if element.kind == "message_box":
+            before, web.compose = web.compose, web.compose + text
+            return {"before": before, "after": web.compose}
+        if element.kind.startswith("caption_"):
+            before = web.captions.get(web.selected, "")
+            web.captions[web.selected] = before + text
+            return {"before": before, "after": web.captions[web.selected]}
+        return {"before": "", "after": ""}
+
+    def _clear_box(self, box):
+        element = self._live(box.id)
+        web = self.web
+        if element.kind == "message_box":
+            web.compose = ""
+        elif element.kind.startswith("caption_"):
+            web.captions.pop(web.selected, None)
+        return ""
+
+    def _delivery_status(self, records):
+        web = self.web
+        visible = {chat.name: chat for _, chat in web.visible_rows()}
+        statuses = []
+        for message_id, name, text in records:
+            status = None
+            if message_id and web.open_chat:
+                found = next((m for m in web.open_chat.messages if m["id"] == message_id), None)
+                status = found and web.tick(found)
+            chat = visible.get(name)
+            first = (text or "").split("\n")[0].strip()
+            if status is None and chat and chat.messages and chat.messages[-1]["outgoing"] \
+                    and first and first in chat.preview:
+                status = web.tick(chat.messages[-1])
+            statuses.append(status)
+        return statuses
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from alright.aio import AsyncWhatsApp
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_calls_run_off_the_loop_in_order(web, whatsapp):
+    facade = AsyncWhatsApp(whatsapp)
+    loop_thread = threading.get_ident()
+    threads = []
+    sent = whatsapp.send_message_in_app
+
+    def recording(mobile, message):
+        threads.append(threading.get_ident())
+        return sent(mobile, message)
+
+    whatsapp.send_message_in_app = recording
+    numbers = [chat.number for chat in web.chats[5:8]]
+
+    async def main():
+        results = await asyncio.gather(
+            *(facade.send_message_in_app(number, f"hello {number}") for number in numbers)
+        )
+        await facade.close()
+        return results
+
+    assert run(main()) == ["1 "] * 3
+    assert len(set(threads)) == 1 and loop_thread not in threads
+    assert [web.chat_by_number(n).messages[-1]["text"] for n in numbers] == [
+        f"hello {n}" for n in numbers
+    ]
+
+
+def test_missed_deadline_and_queued_call_skipped(web, whatsapp):
+    facade = AsyncWhatsApp(whatsapp)
+    calls = []
+
+    def slow(seconds):
+        calls.append(seconds)
+        time.sleep(seconds)
+        return seconds
+
+    whatsapp.slow = slow
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await facade.call("slow", 0.3, deadline=0.05)
+        # queued behind the running call, cancelled before it reaches the browser
+        with pytest.raises(asyncio.TimeoutError):
+            await facade.call("slow", 0.1, deadline=0.05)
+        assert await facade.slow(0.01) == 0.01
+        await facade.close()
+
+    run(main())
+    assert calls == [0.3, 0.01]
+
+
+def test_close_waits_for_the_running_call_before_quitting(web, driver, whatsapp):
+    facade = AsyncWhatsApp(whatsapp)
+    events = []
+    quit = driver.quit
+    driver.quit = lambda: (events.append("quit"), quit())
+
+    def slow():
+        time.sleep(0.2)
+        events.append("done")
+
+    whatsapp.slow = slow
+
+    async def main():
+        running = asyncio.ensure_future(facade.call("slow"))
+        queued = asyncio.ensure_future(facade.call("slow"))
+        await asyncio.sleep(0.05)
+        await facade.close(quit_driver=True, cancel_pending=True)
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    run(main())
+    assert events == ["done", "quit"]
+
+
+def test_private_and_unknown_names_are_not_proxied(whatsapp):
+    facade = AsyncWhatsApp(whatsapp)
+    with pytest.raises(AttributeError):
+        facade._sent
+    with pytest.raises(AttributeError):
+        facade.no_such_method
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in ["a.jpg", "b.jpg", "c.mp4", "d.pdf"]:
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def chat(web, whatsapp):
+    chat = web.chats[5]
+    whatsapp.find_user(chat.number)
+    return chat
+
+
+def sent(chat):
+    return [(os.path.basename(m["media"]), m["text"]) for m in chat.messages if m["media"]]
+
+
+def test_album_and_documents_in_two_dialogs(driver, whatsapp, chat, files):
+    driver.reset_counters()
+    assert whatsapp.send_attachments(files, ["first", None, "third\nline", "doc"])
+    assert sent(chat) == [("a.jpg", "first"), ("b.jpg", ""), ("c.mp4", "third\nline"), ("d.pdf", "doc")]
+    assert driver.commands["get"] == 0
+
+
+def test_single_caption_goes_on_every_file(whatsapp, chat, files):
+    assert whatsapp.send_attachments(files[:3], "hello")
+    assert sent(chat) == [("a.jpg", "hello"), ("b.jpg", "hello"), ("c.mp4", "hello")]
+
+
+def test_next_dialog_waits_for_the_upload(web, whatsapp, chat, files, monkeypatch):
+    web.delivery = 0.2
+    find_attachment = whatsapp.find_attachment
+    pending = []
+
+    def opening():
+        pending.append(web.pending())
+        find_attachment()
+
+    monkeypatch.setattr(whatsapp, "find_attachment", opening)
+    assert whatsapp.send_attachments(files)
+    assert pending == [False, False]
+
+
+def test_nothing_is_sent_when_a_file_is_rejected(whatsapp, chat, files, tmp_path):
+    big = tmp_path / "big.mp4"
+    big.write_bytes(b"x" * (15 * 1024 * 1024))
+    assert not whatsapp.send_attachments([files[0], str(big), str(tmp_path / "missing.jpg")])
+    assert sent(chat) == []
@@ -0,0 +1,35 @@
+import alright
+from alright import FAILED_CODE, INVALID_CODE, SENT_CODE
+from tests.conftest import INVALID_NUMBER
+
+
+def test_both_send_paths_share_their_codes(web, whatsapp):
+    mobile = web.chats[5].number
+    assert whatsapp.send_message1(mobile, "reloaded") == SENT_CODE
+    assert whatsapp.send_message_in_app(mobile, "in app") == SENT_CODE
+    assert whatsapp.send_message1(INVALID_NUMBER, "x") == INVALID_CODE
+    assert whatsapp.send_message_in_app(INVALID_NUMBER, "x") == INVALID_CODE
+
+
+def test_bulk_keeps_the_page_loaded(web, driver, whatsapp):
+    numbers = [chat.number for chat in web.chats[5:10]] + [INVALID_NUMBER]
+    driver.reset_counters()
+    result = whatsapp.send_bulk(numbers, "hello")
+    assert [r["status"] for r in result["results"]] == [SENT_CODE] * 5 + [INVALID_CODE]
+    assert result["summary"]["sent"] == 5 and result["summary"]["invalid"] == 1
+    # one page load at most, for the invalid number's dialog
+    assert driver.commands["get"] <= 1
+
+
+def test_chat_link_not_handled_by_the_app_loads_the_chat(web, driver, whatsapp):
+    driver._scripts[alright.OPEN_CHAT_IN_APP_JS] = lambda url: False
+    mobile = web.chats[5].number
+    driver.reset_counters()
+    assert whatsapp.send_message_in_app(mobile, "hello") == SENT_CODE
+    assert web.chat_by_number(mobile).messages[-1]["text"] == "hello"
+    assert driver.commands["get"] == 1
+
+
+def test_failure_code(web, driver, whatsapp):
+    driver._scripts[alright.OPEN_CHAT_IN_APP_JS] = lambda url: 1 / 0
+    assert whatsapp.send_message_in_app(web.chats[5].number, "hello") == FAILED_CODE
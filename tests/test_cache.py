@@ -0,0 +1,70 @@
+import csv
+
+import pytest
+
+import alright
+from alright.cache import INVALID, UNKNOWN, VALID, RecipientCache
+from tests.conftest import INVALID_NUMBER
+
+
+@pytest.fixture
+def recipients(tmp_path):
+    cache = RecipientCache(tmp_path / "recipients.sqlite3")
+    yield cache
+    cache.close()
+
+
+def test_numbers_match_whatever_their_formatting(recipients):
+    recipients.set("+255 (71) 200-0001", INVALID)
+    assert recipients.get("255712000001") == INVALID
+    assert recipients.get("255712000002") == UNKNOWN
+
+
+def test_statuses_expire(tmp_path):
+    cache = RecipientCache(tmp_path / "recipients.sqlite3", valid_ttl=60, invalid_ttl=0)
+    cache.set_many([("1", VALID), ("2", INVALID)])
+    assert cache.statuses(["1", "2", "3"]) == {"1": VALID, "2": UNKNOWN, "3": UNKNOWN}
+    cache.close()
+
+
+def test_bulk_lookup_and_forgetting(recipients):
+    numbers = [str(255700000000 + i) for i in range(1200)]
+    recipients.set_many((number, VALID) for number in numbers)
+    recipients.set_many([(numbers[0], UNKNOWN)])
+    statuses = recipients.statuses(numbers)
+    assert statuses[numbers[0]] == UNKNOWN
+    assert sum(status == VALID for status in statuses.values()) == 1199
+    with pytest.raises(ValueError):
+        recipients.set("1", "maybe")
+
+
+def test_export_filters_by_status(recipients, tmp_path):
+    recipients.set_many([("1", VALID), ("2", INVALID)])
+    assert recipients.export(tmp_path / "invalid.csv", status=INVALID) == 1
+    with open(tmp_path / "invalid.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["number", "status", "checked_at"]
+    assert [row[:2] for row in rows[1:]] == [["2", INVALID]]
+
+
+def test_dead_number_is_not_probed_again(whatsapp, driver, recipients):
+    whatsapp.recipients = recipients
+    assert not whatsapp.find_user(INVALID_NUMBER)
+    assert recipients.get(INVALID_NUMBER) == INVALID
+    driver.reset_counters()
+    assert not whatsapp.find_user(INVALID_NUMBER)
+    assert driver.commands["get"] == 0
+
+
+def test_other_dialogs_are_not_cached(whatsapp, driver, recipients):
+    whatsapp.recipients = recipients
+    driver._scripts[alright.DIALOG_TEXT_JS] = lambda ok: "Couldn't open the chat, try again.\nOK"
+    assert not whatsapp.find_user(INVALID_NUMBER)
+    assert recipients.get(INVALID_NUMBER) == UNKNOWN
+
+
+def test_precheck_caches_valid_and_invalid(whatsapp, web, recipients):
+    whatsapp.recipients = recipients
+    valid = web.chats[5].number
+    assert whatsapp.precheck_numbers([valid, INVALID_NUMBER]) == {valid: VALID, INVALID_NUMBER: INVALID}
+    assert recipients.statuses([valid, INVALID_NUMBER]) == {valid: VALID, INVALID_NUMBER: INVALID}
@@ -0,0 +1,82 @@
+import json
+from collections import deque
+
+import pytest
+
+websocket = pytest.importorskip("websocket")
+
+from alright import cdp
+from alright.cdp import CDPDriver
+
+
+class FakeWebSocket(object):
+    """websocket-client's WebSocket, with frames it already buffered and no socket to
+    select on."""
+
+    def __init__(self):
+        self.frames = deque()
+        self.sent = []
+        self.timeouts = []
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def send(self, data):
+        message = json.loads(data)
+        self.sent.append(message)
+        self.frames.append(json.dumps({"id": message["id"], "result": {"result": {"value": 1}}}))
+
+    def recv(self):
+        self.timeouts.append(self.timeout)
+        if self.frames:
+            return self.frames.popleft()
+        if self.timeout == 0:
+            raise BlockingIOError("would block")
+        raise websocket.WebSocketTimeoutException("timed out")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def ws(monkeypatch):
+    ws = FakeWebSocket()
+    def connect(url, timeout=None, **kwargs):
+        ws.settimeout(timeout)
+        return ws
+
+    monkeypatch.setattr(cdp.websocket, "create_connection", connect)
+    return ws
+
+
+def event(method, **params):
+    return json.dumps({"method": method, "params": params})
+
+
+def test_pump_handles_buffered_events(ws):
+    driver = CDPDriver("ws://devtools", timeout=5)
+    ws.frames.extend([
+        event("Page.javascriptDialogOpening", message="hi", type="alert"),
+        event("Page.navigatedWithinDocument", url="https://web.whatsapp.com/#chat"),
+    ])
+    driver.pump()
+    assert driver.dialog["message"] == "hi"
+    assert driver.current_url == "https://web.whatsapp.com/#chat"
+    assert not ws.frames
+    assert ws.timeout == 5
+
+
+def test_pump_without_events_does_not_wait(ws):
+    driver = CDPDriver("ws://devtools", timeout=5)
+    driver.pump()
+    assert ws.timeout == 5
+
+
+def test_async_scripts_outlast_the_script_timeout(ws):
+    driver = CDPDriver("ws://devtools", timeout=5, script_timeout=30)
+    ws.timeouts.clear()
+    assert driver.execute_async_script("arguments[0](1)") == 1
+    assert ws.timeouts[-1] > driver.script_timeout
+    assert driver.execute_script("return 1") == 1
+    assert ws.timeouts[-1] == 5
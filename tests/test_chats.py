@@ -0,0 +1,128 @@
+import logging
+
+import pytest
+from selenium.webdriver.remote.command import Command
+
+from alright.chats import ChatIndex
+from alright.summary import ChatSummary
+
+
+class Session(object):
+    logger = logging.getLogger("alright.tests")
+
+
+def row(index, name, message="hi", unread=0):
+    return {
+        "row_id": f"id-{name}", "row_index": index, "sender": name, "time": "12:00",
+        "message": message, "unread": bool(unread), "no_of_unread": unread, "group": False,
+        "pinned": False, "muted": False,
+    }
+
+
+def unchanged(index, name):
+    return {"row_id": f"id-{name}", "row_index": index}
+
+
+def parse(data):
+    return ChatSummary(**data)
+
+
+@pytest.fixture
+def index():
+    index = ChatIndex(Session(), "//row")
+    index.apply([row(1, "Alice"), row(2, "Bob"), row(3, "Carol")], parse)
+    return index
+
+
+def test_first_scrape_is_all_changes(index):
+    changes = index.changes_since(0)
+    assert changes["version"] == 3
+    assert [chat.sender for chat in changes["changed"]] == ["Alice", "Bob", "Carol"]
+    assert changes["removed"] == []
+
+
+def test_unchanged_rows_are_answered_from_memory(index):
+    version = index.version
+    chats = index.apply([unchanged(1, "Alice"), unchanged(2, "Bob")], parse)
+    assert [chat.sender for chat in chats] == ["Alice", "Bob"]
+    assert index.changes_since(version) == {"version": version, "changed": [], "removed": []}
+
+
+def test_changed_row_is_a_new_record(index):
+    version = index.version
+    before = index.lookup("Bob")
+    index.apply([row(2, "Bob", "new message", unread=1)], parse)
+    changes = index.changes_since(version)
+    assert [(chat["sender"], chat["message"]) for chat in changes["changed"]] == [("Bob", "new message")]
+    assert before.message == "hi"
+    assert index.lookup("Bob") is not before
+
+
+def test_moved_row_is_not_a_change(index):
+    version = index.version
+    before = index.lookup("Carol")
+    (moved,) = index.apply([unchanged(1, "Carol")], parse)
+    assert moved.row_index == 1
+    assert before.row_index == 3
+    assert index.changes_since(version)["changed"] == []
+
+
+def test_removed_rows(index):
+    version = index.version
+    index.prune({"id-Alice", "id-Carol"})
+    changes = index.changes_since(version)
+    assert changes["removed"] == ["id-Bob"]
+    assert changes["version"] == version + 1
+    assert index.lookup("Bob", exact=True) is None
+    # the page still fingerprints the row, it is told to forget it
+    assert index.take_forgotten() == ["id-Bob"]
+    assert index.take_forgotten() == []
+
+
+def test_unknown_unchanged_row_is_forgotten(index):
+    assert index.apply([unchanged(4, "Dave")], parse) == []
+    assert index.take_forgotten() == ["id-Dave"]
+
+
+def test_changes_since_current_version_is_empty(index):
+    changes = index.changes_since(index.version)
+    assert changes["changed"] == [] and changes["removed"] == []
+
+
+def test_through_the_session(web, whatsapp):
+    whatsapp.get_list_of_messages()
+    version = whatsapp.chat_changes_since(0)["version"]
+    name = web.chats[5].name
+    web.receive(name, "hey there")
+    changes = whatsapp.chat_changes_since(version)
+    # the other rows only moved down one place
+    assert [(chat["sender"], chat["message"]) for chat in changes["changed"]] == [(name, "hey there")]
+
+
+def test_search_opens_a_chat_below_the_fold(web, driver, whatsapp):
+    name = web.chats[25].name
+    driver.reset_counters()
+    whatsapp.search_chat_by_name(name[-6:].lower())
+    assert web.open_chat.name == name
+    # straight to the row, no arrow-key walk through the list
+    assert driver.commands[Command.SEND_KEYS_TO_ELEMENT] == 0
+
+
+def test_indexed_lookup_is_answered_from_memory(web, driver, whatsapp):
+    whatsapp.search_chat_by_name(web.chats[25].name)
+    driver.reset_counters()
+    chat = whatsapp.chat_index.lookup(web.chats[20].name, exact=True)
+    assert chat["sender"] == web.chats[20].name
+    assert sum(driver.commands.values()) == 0
+
+
+def test_unknown_chat_opens_nothing(web, whatsapp):
+    whatsapp.search_chat_by_name("nobody by that name")
+    assert web.open_chat is None
+
+
+def test_first_chat_skips_the_pinned_ones(web, whatsapp):
+    whatsapp.get_first_chat()
+    assert web.open_chat.name == web.chats[3].name
+    whatsapp.get_first_chat(ignore_pinned=False)
+    assert web.open_chat.name == web.chats[0].name
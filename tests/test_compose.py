@@ -0,0 +1,113 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.keys import Keys
+
+from alright.compose import CLEAR_BOX_JS, HUMAN, INSERT_TEXT_JS, KEYS, Composer, outside_bmp
+
+
+class Page(object):
+    """A compose box whose in-page insertion takes, lands partly, or fails."""
+
+    def __init__(self, insertion="takes", text=""):
+        self.insertion = insertion
+        self.text = text
+        self.calls = []
+        self.typed = []
+
+    def execute_script(self, script, box, *args):
+        if script == INSERT_TEXT_JS:
+            self.calls.append("insert")
+            if self.insertion == "fails":
+                raise WebDriverException("javascript error")
+            before = self.text
+            self.text += args[0] if self.insertion == "takes" else args[0][:2]
+            return {"before": before, "after": self.text}
+        assert script == CLEAR_BOX_JS
+        self.calls.append("clear")
+        if self.insertion != "sticky":
+            self.text = ""
+        return self.text
+
+
+class Box(object):
+    def __init__(self, page):
+        self.page = page
+
+    def send_keys(self, text):
+        self.page.typed.append(text)
+        self.page.text += text
+
+
+@pytest.fixture
+def composer(monkeypatch):
+    def composer(page, **kwargs):
+        composer = Composer(page, **kwargs)
+        monkeypatch.setattr(composer, "_line_break", lambda: Box(page).send_keys("\n"))
+        return composer
+
+    return composer
+
+
+def test_whole_text_in_one_call(composer):
+    page = Page()
+    composer(page).write(Box(page), "first line\nsecond 👋")
+    assert page.calls == ["insert"]
+    assert page.text == "first line\nsecond 👋" and page.typed == []
+
+
+def test_partial_insertion_is_typed_once_from_an_empty_box(composer):
+    page = Page("partly", text="draft ")
+    composer(page).write(Box(page), "hello\nthere")
+    assert page.calls == ["insert", "clear"]
+    # what the box held before goes back in, the text is not doubled
+    assert page.text == "draft hello\nthere"
+    assert page.typed == ["draft hello", "\n", "there"]
+
+
+def test_failed_insertion_is_typed_instead(composer):
+    page = Page("fails")
+    composer(page).write(Box(page), "hello")
+    assert page.calls == ["insert", "clear"]
+    assert page.text == "hello"
+
+
+def test_box_that_cannot_be_emptied_is_not_typed_into(composer):
+    page = Page("sticky")
+    with pytest.raises(ValueError, match="empty the box"):
+        composer(page).write(Box(page), "hello")
+    assert page.typed == []
+
+
+def test_emoji_cannot_fall_back_to_keys(composer):
+    page = Page("fails")
+    with pytest.raises(ValueError, match="send_keys cannot type"):
+        composer(page).write(Box(page), "hi 👋")
+    assert page.typed == []
+
+
+def test_keys_mode_inserts_what_send_keys_cannot_type(composer):
+    page = Page()
+    composer(page, mode=KEYS).write(Box(page), "plain\ntext")
+    assert page.calls == [] and page.typed == ["plain", "\n", "text"]
+    composer(page, mode=KEYS).write(Box(page), "👋")
+    assert page.calls == ["insert"]
+
+
+def test_human_mode_types_word_by_word(composer, monkeypatch):
+    monkeypatch.setattr("alright.compose.time.sleep", lambda seconds: None)
+    page = Page()
+    composer(page).write(Box(page), "two words", mode=HUMAN)
+    assert page.typed == ["two" + Keys.SPACE, "words" + Keys.SPACE]
+
+
+def test_modes():
+    assert outside_bmp("👋") and not outside_bmp("é")
+    with pytest.raises(ValueError):
+        Composer(None, mode="telepathy")
+
+
+def test_multiline_emoji_message_in_one_bubble(web, whatsapp):
+    chat = web.chats[5]
+    text = "hello 👋\nsecond line"
+    whatsapp.send_message_in_app(chat.number, text)
+    assert [m["text"] for m in chat.messages if m["outgoing"]] == [text]
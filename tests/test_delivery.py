@@ -0,0 +1,66 @@
+import pytest
+
+from alright.delivery import DELIVERED, READ, SENT, DeliveryTracker
+
+
+@pytest.fixture
+def tracking(whatsapp):
+    whatsapp.track_deliveries = True
+    return whatsapp
+
+
+def test_sends_are_tracked_until_sent(web, tracking):
+    numbers = [chat.number for chat in web.chats[:3]]
+    for number in numbers:
+        tracking.send_message_in_app(number, f"hello {number}")
+    deliveries = tracking.deliveries
+    assert len(deliveries) == 3
+    assert deliveries.wait(SENT, timeout=5)
+    # the last chat is open, the others are read from the chat list preview
+    assert all(status == SENT for status in deliveries.statuses().values())
+    assert deliveries.pending() == []
+
+
+def test_callbacks_follow_the_status(web, tracking):
+    seen = []
+    tracking.deliveries.until = READ
+    tracking.deliveries.on_status(lambda delivery: seen.append(delivery.status))
+    tracking.send_message_in_app(web.chats[0].number, "hello")
+    assert tracking.deliveries.wait(READ, timeout=5)
+    assert seen[-1] == READ
+    assert DELIVERED in seen
+
+
+def test_wait_for_one_message(web, tracking):
+    first, second = web.chats[5].number, web.chats[6].number
+    tracking.send_message_in_app(first, "first")
+    tracking.send_message_in_app(second, "second")
+    last = tracking.last_delivery
+    assert last.text == "second"
+    assert tracking.deliveries.wait(SENT, timeout=5, deliveries=[last])
+    assert last.status == SENT
+
+
+def test_message_that_cannot_be_seen_anymore(web, tracking):
+    web.delivery = 60
+    mobile, other = web.chats[5].number, web.chats[6].number
+    tracking.send_message_in_app(mobile, "first")
+    first = tracking.last_delivery
+    # another message replaced the preview and the chat is closed
+    tracking.send_message_in_app(mobile, "second")
+    tracking.open_chat_in_app(other)
+    assert not tracking.deliveries.wait(SENT, timeout=5, deliveries=[first])
+    assert not first.observable
+    assert first not in tracking.deliveries.pending()
+    assert tracking.deliveries.forget() >= 1
+    assert first.key not in tracking.deliveries.statuses()
+
+
+def test_records_are_bounded(web, whatsapp):
+    tracker = DeliveryTracker(whatsapp, max_tracked=2)
+    whatsapp.open_chat_in_app(web.chats[0].number)
+    for text in ("one", "two", "three"):
+        whatsapp.send_message_to_current_chat(text)
+        tracker.track(text)
+    assert len(tracker) == 2
+    assert [d.text for d in tracker._tracked.values()] == ["two", "three"]
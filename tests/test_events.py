@@ -0,0 +1,157 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from alright.events import DRAIN_EVENTS_JS, INSTALL_OBSERVER_JS, MessageStream
+
+DOM = Path(__file__).with_name("dom.js")
+
+
+def run_observer(scenario: str) -> dict:
+    """Runs INSTALL_OBSERVER_JS against tests/dom.js under node, then the scenario, which
+    returns what to check."""
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    program = f"""
+const {{Node, Document, MutationObserver, notify, clock}} = require({json.dumps(str(DOM))});
+Object.assign(globalThis, {{Node, MutationObserver, document: new Document(), window: {{}}}});
+Date.now = clock.now;
+const el = (tag, attrs = {{}}, text = '', ...children) => new Node(tag, attrs, text).append(...children);
+const message = (id, text, direction = 'in') => el(
+    'div', {{role: 'row'}}, '',
+    el('div', {{'data-id': id}}, '', el('div', {{class: `message-${{direction}}`}}, '', el('span', {{class: 'selectable-text'}}, text))),
+);
+const chat = (title, ...rows) => el(
+    'div', {{id: 'main'}}, '',
+    el('header', {{}}, '', el('span', {{title}})),
+    el('div', {{class: 'list'}}, '', ...rows),
+);
+const install = new Function({json.dumps(INSTALL_OBSERVER_JS)});
+const drain = new Function({json.dumps(DRAIN_EVENTS_JS)});
+const events = () => drain().events.map((event) => [event.chat, event.text]);
+const app = el('div', {{id: 'app'}});
+document.body.append(app);
+const result = (() => {{
+{scenario}
+}})();
+console.log(JSON.stringify(result));
+"""
+    done = subprocess.run([node, "-e", program], capture_output=True, text=True, timeout=60)
+    assert done.returncode == 0, done.stderr
+    return json.loads(done.stdout)
+
+
+def test_new_messages_are_reported_history_is_not():
+    result = run_observer("""
+    app.append(chat('Alice', message('a1', 'old'), message('a2', 'older still')));
+    install(1000);
+    const list = document.getElementById('main').querySelector('.list');
+    const opened = events();
+    clock.advance(2000);
+    const fresh = message('a3', 'new');
+    list.append(fresh);
+    notify(list, [fresh]);
+    const received = events();
+    const older = message('a0', 'from the history');
+    list.prepend(older);
+    notify(list, [older]);
+    const scrolled = events();
+    return {opened, received, scrolled};
+    """)
+    assert result == {"opened": [], "received": [["Alice", "new"]], "scrolled": []}
+
+
+def test_every_message_of_an_added_subtree():
+    result = run_observer("""
+    app.append(chat('Alice', message('a1', 'old')));
+    install(1000);
+    clock.advance(2000);
+    const list = document.getElementById('main').querySelector('.list');
+    const block = el('div', {}, '', message('a2', 'one'), message('a3', 'mine', 'out'), message('a4', 'two'));
+    list.append(block);
+    notify(list, [block]);
+    return events();
+    """)
+    assert result == [["Alice", "one"], ["Alice", "two"]]
+
+
+def test_opening_a_chat_is_not_incoming():
+    result = run_observer("""
+    app.append(chat('Alice', message('a1', 'old')));
+    install(1000);
+    clock.advance(2000);
+    document.getElementById('main').remove();
+    const bob = chat('Bob', message('b1', 'hi'), message('b2', 'there'));
+    app.append(bob);
+    notify(app, [bob]);
+    // rows that render a moment after the chat opened are part of it too
+    const list = bob.querySelector('.list');
+    const late = message('b3', 'rendered late');
+    list.append(late);
+    notify(list, [late]);
+    const opened = events();
+    clock.advance(2000);
+    const fresh = message('b4', 'new');
+    list.append(fresh);
+    notify(list, [fresh]);
+    return {opened, received: events()};
+    """)
+    assert result == {"opened": [], "received": [["Bob", "new"]]}
+
+
+def test_rerendered_rows_are_not_reported_again_past_the_limit():
+    result = run_observer("""
+    app.append(chat('Alice'));
+    install(10000);
+    clock.advance(2000);
+    const list = document.getElementById('main').querySelector('.list');
+    const block = el('div');
+    for (let i = 0; i < 5002; i++) block.append(message(`m${i}`, `text ${i}`));
+    list.append(block);
+    notify(list, [block]);
+    const received = events().length;
+    // the list re-renders its last rows as new nodes with the same ids
+    const rows = block.children.slice(-2);
+    rows.forEach((row) => row.remove());
+    const again = rows.map((row) => message(row.querySelector('[data-id]').getAttribute('data-id'), 'same'));
+    block.append(...again);
+    notify(block, again);
+    return {received, rerendered: events()};
+    """)
+    assert result == {"received": 5002, "rerendered": []}
+
+
+def test_stream_dispatches_by_kind_and_reinstalls_after_a_reload(web, driver, whatsapp):
+    stream = MessageStream(whatsapp)
+    messages, everything = [], []
+    stream.on_message(messages.append)
+    stream.on_message(everything.append, kind=None)
+    assert stream.install()
+    assert not stream.install()
+    web.receive(web.open_chat.name if web.open_chat else web.chats[4].name, "open chat")
+    web.receive(web.chats[9].name, "elsewhere")
+    stream.poll()
+    assert [event["type"] for event in everything] == [
+        "message" if web.open_chat else "unread", "unread"
+    ]
+    assert len(messages) == sum(event["type"] == "message" for event in everything)
+
+    driver.get("https://web.whatsapp.com/")
+    assert stream.drain() == []
+    web.receive(web.chats[9].name, "after the reload")
+    assert [event["text"] for event in stream.poll()] == ["after the reload"]
+
+
+def test_failing_callback_does_not_stop_the_others(web, whatsapp):
+    stream = MessageStream(whatsapp)
+    seen = []
+    stream.on_message(lambda event: 1 / 0, kind=None)
+    stream.on_message(seen.append, kind=None)
+    stream.install()
+    web.receive(web.chats[9].name, "hello")
+    stream.poll()
+    assert [event["text"] for event in seen] == ["hello"]
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from alright.history import parse_pre_plain_text
+
+
+def test_day_first_by_default():
+    assert parse_pre_plain_text("[14:05, 03/04/2024] Alice: ") == (
+        datetime(2024, 4, 3, 14, 5), "Alice"
+    )
+
+
+def test_month_first_order():
+    assert parse_pre_plain_text("[2:05 PM, 3/4/2024] Bob: ", "MDY") == (
+        datetime(2024, 3, 4, 14, 5), "Bob"
+    )
+
+
+def test_year_first_dates_parse_under_any_order():
+    for order in ("DMY", "MDY", "YMD"):
+        assert parse_pre_plain_text("[09:30, 2024-12-25] Carol: ", order)[0] == datetime(
+            2024, 12, 25, 9, 30
+        )
+
+
+def test_dotted_dates_and_seconds():
+    assert parse_pre_plain_text("[09:30:15, 25.12.24] Dan:")[0] == datetime(2024, 12, 25, 9, 30, 15)
+
+
+def test_date_not_valid_in_the_order_is_not_guessed():
+    # 25 is not a month, a month first page never renders it
+    assert parse_pre_plain_text("[09:30, 25/12/2024] Eve: ", "MDY") == (None, "Eve")
+
+
+def test_not_a_header():
+    assert parse_pre_plain_text("hello") == (None, None)
+    assert parse_pre_plain_text(None) == (None, None)
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        parse_pre_plain_text("[09:30, 25/12/2024] Eve: ", "DYM")
+
+
+def test_last_message_by_number_and_by_name(web, whatsapp):
+    chat = web.chats[8]
+    web.receive(chat.name, "hello there")
+    assert whatsapp.get_last_message_received(chat.number).text == "hello there"
+    assert whatsapp.get_last_message_received(chat.name).chat == chat.name
+
+
+def test_last_message_never_reads_another_chat(web, whatsapp):
+    web.receive(web.chats[8].name, "hello there")
+    whatsapp.get_last_message_received(web.chats[8].name)
+    # the search finds nothing, the chat left open must not be read instead
+    assert whatsapp.get_last_message_received("Nobody by that name") is None
+    assert not whatsapp.query_chats("Nobody by that name")
+
+
+def test_unchanged_chats_are_not_opened_again(web, driver, whatsapp):
+    by_number, by_name = web.chats[8], web.chats[9]
+    web.receive(by_number.name, "to the number")
+    web.receive(by_name.name, "to the name")
+    chats = [by_number.number, by_name.name]
+    first = whatsapp.get_last_messages(chats)
+    assert [first[chat].text for chat in chats] == ["to the number", "to the name"]
+
+    driver.reset_counters()
+    assert whatsapp.get_last_messages(chats) == first
+    assert driver.commands["get"] == 0
+    assert web.open_chat.name == by_name.name
+
+    web.receive(by_number.name, "something new")
+    assert whatsapp.get_last_messages(chats)[by_number.number].text == "something new"
@@ -0,0 +1,74 @@
+import json
+import logging
+
+import pytest
+
+from alright import WhatsApp
+from alright.instrument import Histogram, Instrumentation
+from alright.pacing import NoPacer
+
+
+@pytest.fixture
+def metrics():
+    return Instrumentation()
+
+
+@pytest.fixture
+def instrumented(driver, metrics):
+    messenger = WhatsApp(driver, timeout=5, pacer=NoPacer(), logger=logging.getLogger("alright.tests"),
+                         instrumentation=metrics)
+    messenger.login(wait=True)
+    return messenger
+
+
+def test_histogram_percentiles():
+    hist = Histogram()
+    for seconds in [0.002] * 90 + [0.3] * 9 + [100]:
+        hist.observe(seconds)
+    assert (hist.percentile(0.5), hist.percentile(0.95), hist.percentile(1)) == (0.0025, 0.5, float("inf"))
+    assert hist.to_dict()["count"] == 100
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_commands_are_charged_to_the_innermost_method(web, driver, instrumented, metrics):
+    instrumented.find_user(web.chats[5].number)
+    report = metrics.to_dict()
+    assert report["commands"] == dict(driver.commands)
+    assert sum(h["count"] for h in report["method_commands"].values()) == sum(driver.commands.values())
+    assert "find_user" in report["method_commands"]
+    # find_user calls get_phone_link, which issues no command of its own
+    assert "get_phone_link" in report["method_latency"]
+    assert "get_phone_link" not in report["method_commands"]
+    latency = report["method_latency"]["find_user"]
+    assert latency["count"] == 1
+    assert latency["driver_seconds"] + latency["idle_seconds"] == pytest.approx(latency["sum"])
+    assert "message_box,invalid_number_ok" in report["selector_latency"]
+
+
+def test_generator_methods_are_timed_per_item(web, instrumented, metrics):
+    chats = list(instrumented.iter_unread_chats())
+    assert chats
+    assert metrics.method_latency["iter_unread_chats"].count == len(chats) + 1
+
+
+def test_exports(web, instrumented, metrics):
+    instrumented.find_user(web.chats[5].number)
+    assert json.loads(metrics.to_json())["commands"]
+    text = metrics.to_prometheus()
+    assert '# TYPE alright_method_seconds histogram' in text
+    assert 'alright_method_seconds_count{method="find_user"} 1' in text
+    assert 'alright_method_seconds_bucket{method="find_user",le="+Inf"} 1' in text
+
+
+def test_detach_restores_the_session(web, driver, instrumented, metrics):
+    metrics.detach()
+    assert "find_user" not in vars(instrumented)
+    assert "execute" not in vars(driver)
+    before = dict(metrics.commands)
+    instrumented.find_user(web.chats[5].number)
+    assert dict(metrics.commands) == before
+
+
+def test_a_session_without_instrumentation_is_not_wrapped(whatsapp):
+    assert whatsapp.instrumentation is None
+    assert "find_user" not in vars(whatsapp)
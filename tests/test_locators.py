@@ -0,0 +1,81 @@
+import pytest
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+from alright.locators import PROBE_LOCATORS_JS, SelectorNotFound, SelectorRegistry
+
+OLD = (By.XPATH, '//div[@id="main"]/footer/div[1]/div')
+NEW = (By.CSS_SELECTOR, '#main footer [role="textbox"]')
+SEND = (By.XPATH, '//*[@data-icon="send"]/..')
+
+
+class Page(object):
+    """A driver whose page holds the elements of the locators in `present`."""
+
+    def __init__(self, *present):
+        self.present = set(present)
+        self.probes = []
+
+    def execute_script(self, script, candidates):
+        assert script == PROBE_LOCATORS_JS
+        self.probes.append([tuple(candidate) for candidate in candidates])
+        for index, candidate in enumerate(candidates):
+            if tuple(candidate) in self.present:
+                return [index, f"element:{candidate[1]}"]
+        return None
+
+    def find_elements(self, using, value):
+        return [f"element:{value}"] if (using, value) in self.present else []
+
+
+@pytest.fixture
+def page():
+    return Page(NEW, SEND)
+
+
+@pytest.fixture
+def registry(page):
+    return SelectorRegistry(page, {"message_box": [OLD, NEW], "send": [SEND]}, version="test", budget=0.05)
+
+
+def test_falls_back_in_one_probe_and_remembers_the_winner(page, registry):
+    assert registry.find("message_box") == f"element:{NEW[1]}"
+    assert page.probes == [[OLD, NEW]]
+    assert registry.locator("message_box") == NEW
+
+    registry.find("message_box")
+    assert page.probes[-1] == [NEW, OLD]
+    assert registry.stats()["message_box"] == {"hits": 2, "misses": 0, "winner": 1}
+
+
+def test_find_any_returns_the_first_name_present(page, registry):
+    page.present = {SEND}
+    assert registry.find_any(["message_box", "send"]) == ("send", f"element:{SEND[1]}")
+    assert page.probes == [[OLD, NEW, SEND]]
+
+
+def test_missing_element_fails_within_the_budget(page, registry):
+    page.present = set()
+    with pytest.raises(SelectorNotFound, match="message_box.*version test"):
+        registry.find("message_box")
+    assert 1 < len(page.probes) < 20
+    assert registry.stats()["message_box"]["misses"] == 1
+
+
+def test_register_replaces_the_locators_and_forgets_the_winner(page, registry):
+    registry.find("message_box")
+    registry.register("message_box", [SEND, OLD])
+    assert registry.locator("message_box") == SEND
+    assert registry.names_for([OLD, SEND]) == ["message_box", "send"]
+
+
+def test_find_all_uses_the_winning_locator(registry):
+    assert registry.find_all("message_box") == [f"element:{NEW[1]}"]
+
+
+def test_wait_gone(page, registry):
+    page.present = set()
+    registry.wait_gone("send")
+    page.present = {SEND}
+    with pytest.raises(TimeoutException):
+        registry.wait_gone("send", timeout=0.02)
@@ -0,0 +1,84 @@
+import os
+import random
+
+import pytest
+
+from alright.media import MediaPreprocessor, media_kind, preprocess_image
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def noisy(path, size=(2400, 1800)):
+    rng = random.Random(1)
+    image = Image.new("RGB", size)
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                   for _ in range(size[0] * size[1] // 64)] * 64)
+    image.save(path, "PNG")
+    return str(path)
+
+
+def already_compressed(path):
+    # saved the way preprocess_image would save it, so encoding again gains nothing
+    Image.new("RGB", (40, 30), "navy").save(path, "JPEG", quality=80, optimize=True, progressive=True)
+    return path
+
+
+def test_media_kind():
+    assert [media_kind(name) for name in ("a.jpg", "b.MP4", "c.pdf")] == ["image", "video", "file"]
+
+
+def test_large_image_is_downscaled_once(tmp_path):
+    src = noisy(tmp_path / "big.png")
+    out = preprocess_image(src, str(tmp_path))
+    assert out.endswith(".jpg") and os.path.dirname(out) == str(tmp_path)
+    with Image.open(out) as image:
+        assert max(image.size) == 1600
+    modified = os.stat(out).st_mtime_ns
+    assert preprocess_image(src, str(tmp_path)) == out
+    assert os.stat(out).st_mtime_ns == modified
+
+
+def test_no_gain_is_remembered(tmp_path, monkeypatch):
+    src = already_compressed(tmp_path / "small.jpg")
+    assert preprocess_image(str(src), str(tmp_path)) == str(src)
+    assert [path.suffix for path in tmp_path.iterdir() if path != src] == [".orig"]
+
+    def encode(*args, **kwargs):
+        raise AssertionError("encoded again")
+
+    monkeypatch.setattr(Image.Image, "save", encode)
+    assert preprocess_image(str(src), str(tmp_path)) == str(src)
+
+
+def test_transparency_becomes_white(tmp_path):
+    src = tmp_path / "logo.png"
+    image = Image.new("RGBA", (2000, 2000), (0, 0, 0, 0))
+    image.paste((200, 0, 0, 255), (0, 0, 1000, 2000))
+    image.save(src)
+    out = preprocess_image(str(src), str(tmp_path), max_side=200)
+    with Image.open(out) as image:
+        assert image.mode == "RGB"
+        red, transparent = image.getpixel((20, 100)), image.getpixel((180, 100))
+    assert red[0] > 180 and red[1] < 30
+    assert min(transparent) > 245
+
+
+def test_send_media_uploads_the_prepared_files_once(web, whatsapp, tmp_path, monkeypatch):
+    big = noisy(tmp_path / "big.png")
+    small = already_compressed(tmp_path / "small.jpg")
+    document = tmp_path / "notes.pdf"
+    document.write_bytes(b"%PDF-1.4")
+    chat = web.chats[5]
+    whatsapp.find_user(chat.number)
+    with MediaPreprocessor(max_workers=1, cache_dir=tmp_path / "cache") as media:
+        whatsapp.media = media
+
+        def process(path, kind=None):
+            raise AssertionError(f"{path} was preprocessed twice")
+
+        monkeypatch.setattr(media, "process", process)
+        whatsapp.send_media([big, str(small), str(document)], "caption")
+    uploads = [message["media"] for message in chat.messages if message["media"]]
+    assert len(uploads) == 3
+    assert os.path.dirname(uploads[0]) == str(tmp_path / "cache")
+    assert uploads[1:] == [os.path.realpath(small), os.path.realpath(document)]
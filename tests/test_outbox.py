@@ -0,0 +1,137 @@
+import logging
+import time
+
+import pytest
+
+from alright import WhatsApp
+from alright.outbox import DELIVERED, FAILED, INVALID, QUEUED, SENDING, SENT, Outbox, job_key
+from alright.pacing import NoPacer
+from tests.conftest import INVALID_NUMBER
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "outbox.sqlite3"
+
+
+@pytest.fixture
+def outbox(path):
+    box = Outbox(path, batch_size=4, owner="w1")
+    yield box
+    box.close()
+
+
+def outgoing(web, text):
+    return [m for chat in web.chats for m in chat.messages if m["outgoing"] and m["text"] == text]
+
+
+def test_enqueue_is_idempotent(outbox):
+    jobs = [("255700000001", "hello"), ("255700000002", "hello")]
+    assert outbox.enqueue_many(jobs) == 2
+    assert outbox.enqueue_many(jobs) == 0
+    assert outbox.enqueue("255700000001", "hello") == job_key("255700000001", "hello")
+    assert outbox.counts()[QUEUED] == 2
+
+
+def test_campaign_is_part_of_the_key(outbox):
+    outbox.enqueue("255700000001", "hello", campaign="monday")
+    outbox.enqueue("255700000001", "hello", campaign="tuesday")
+    assert outbox.counts()[QUEUED] == 2
+    assert job_key("255700000001", "hello", campaign="monday") != job_key("255700000001", "hello")
+
+
+def test_job_needs_content(outbox):
+    with pytest.raises(ValueError):
+        outbox.enqueue("255700000001")
+
+
+def test_drain_sends_every_job_once(web, whatsapp, outbox):
+    numbers = [chat.number for chat in web.chats[5:10]]
+    outbox.enqueue_many((number, f"hello {number}") for number in numbers)
+    outbox.enqueue(INVALID_NUMBER, "hello")
+    summary = outbox.drain(whatsapp)
+    assert summary[SENT] == 5 and summary[INVALID] == 1
+    assert outbox.counts()[SENT] == 5
+    for number in numbers:
+        assert len(outgoing(web, f"hello {number}")) == 1
+    # draining again sends nothing
+    assert outbox.drain(whatsapp)[SENT] == 0
+
+
+def test_crash_mid_batch_never_double_sends(web, whatsapp, path, outbox):
+    numbers = [chat.number for chat in web.chats[5:11]]
+    outbox.enqueue_many((number, f"hello {number}") for number in numbers)
+    send = whatsapp.send_message_in_app
+    calls = []
+
+    def crashing(mobile, message):
+        calls.append(mobile)
+        if len(calls) == 3:
+            send(mobile, message)  # the message goes out, then the worker dies
+            raise KeyboardInterrupt
+        return send(mobile, message)
+
+    whatsapp.send_message_in_app = crashing
+    with pytest.raises(KeyboardInterrupt):
+        outbox.drain(whatsapp)
+    assert outbox.counts()[SENDING] == 1
+    del whatsapp.send_message_in_app
+    outbox.close()
+
+    restarted = Outbox(path, batch_size=4, owner="w1")
+    assert restarted.recover(whatsapp) == {"sent": 1, "requeued": 0, "failed": 0}
+    restarted.drain(whatsapp)
+    assert restarted.counts()[SENT] == 6
+    for number in numbers:
+        assert len(outgoing(web, f"hello {number}")) == 1
+    restarted.close()
+
+
+def test_interrupted_job_not_in_the_chat_is_requeued(web, whatsapp, outbox):
+    key = outbox.enqueue(web.chats[5].number, "never typed")
+    outbox._claim(1)
+    assert outbox.recover(whatsapp) == {"sent": 0, "requeued": 1, "failed": 0}
+    assert outbox.get(key)["status"] == QUEUED
+
+
+def test_recover_without_session_never_resends(outbox):
+    key = outbox.enqueue("255700000001", "hello")
+    outbox._claim(1)
+    assert outbox.recover() == {"sent": 0, "requeued": 0, "failed": 1}
+    assert outbox.get(key)["status"] == FAILED
+
+
+def test_other_workers_jobs_wait_for_their_lease(web, whatsapp, path, outbox):
+    other = Outbox(path, owner="w2", lease=0.2)
+    key = other.enqueue(web.chats[5].number, "hello")
+    other._claim(1)
+    assert outbox.recover(whatsapp) == {"sent": 0, "requeued": 0, "failed": 0}
+    assert outbox.get(key)["status"] == SENDING
+    time.sleep(0.3)
+    assert outbox.recover(whatsapp)["requeued"] == 1
+    other.close()
+
+
+def test_earlier_identical_message_does_not_count(web, whatsapp, outbox):
+    mobile = web.chats[5].number
+    whatsapp.send_message_in_app(mobile, "hello")
+    key = outbox.enqueue(mobile, "hello", campaign="again")
+    outbox._claim(1)
+    with outbox._db:
+        # claimed a few minutes after the message already in the chat
+        outbox._db.execute("UPDATE jobs SET started_at = ? WHERE key = ?", (time.time() + 180, key))
+    assert outbox.recover(whatsapp)["requeued"] == 1
+
+
+def test_delivery_marks_only_the_job_that_sent_it(web, driver, outbox):
+    tracking = WhatsApp(driver, timeout=5, pacer=NoPacer(), logger=logging.getLogger("alright.tests"),
+                        track_deliveries=True)
+    tracking.login(wait=True)
+    mobile = web.chats[5].number
+    monday = outbox.enqueue(mobile, "hello", campaign="monday")
+    outbox.mark([monday], SENT)
+    tuesday = outbox.enqueue(mobile, "hello", campaign="tuesday")
+    assert outbox.drain(tracking)[SENT] == 1
+    assert tracking.deliveries.wait(DELIVERED, timeout=2)
+    assert outbox.get(tuesday)["status"] == DELIVERED
+    assert outbox.get(monday)["status"] == SENT
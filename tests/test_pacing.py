@@ -0,0 +1,70 @@
+import pytest
+
+from alright import pacing
+from alright.pacing import AIMDPacer
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pacing.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(pacing.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_rate_grows_additively_up_to_max(clock):
+    pacer = AIMDPacer(rate=30, max_rate=32, increase=1)
+    for _ in range(5):
+        pacer.success()
+    assert pacer.rate == 32
+
+
+def test_back_off_cuts_rate_down_to_min(clock):
+    pacer = AIMDPacer(rate=30, min_rate=5, decrease=0.5)
+    pacer.back_off()
+    assert pacer.rate == 15
+    for _ in range(5):
+        pacer.back_off()
+    assert pacer.rate == 5
+
+
+def test_acquire_spends_burst_then_waits_for_refill(clock):
+    pacer = AIMDPacer(rate=60, burst=2)
+    pacer.acquire()
+    pacer.acquire()
+    assert clock.slept == []
+    pacer.acquire()
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+
+def test_back_off_empties_the_bucket(clock):
+    pacer = AIMDPacer(rate=60, burst=3, decrease=0.5)
+    pacer.back_off()
+    pacer.acquire()
+    # no saved token left, and the rate is now 30 per minute
+    assert sum(clock.slept) == pytest.approx(2.0)
+
+
+def test_send_history_is_bounded_by_the_window(clock):
+    pacer = AIMDPacer(rate=60, max_rate=60, window=60)
+    for _ in range(500):
+        pacer.success()
+        clock.now += 1
+    assert len(pacer._sent) <= 61
+    assert pacer.messages_per_minute == pytest.approx(60, rel=0.05)
+    clock.now += 120
+    assert pacer.messages_per_minute == 0.0
+    assert not pacer._sent
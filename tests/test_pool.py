@@ -0,0 +1,97 @@
+import pytest
+
+from alright.pool import HashRing, WhatsAppPool
+
+KEYS = [f"2557{i:08d}" for i in range(2000)]
+
+
+def test_same_key_same_owner():
+    ring = HashRing(range(4))
+    again = HashRing(range(4))
+    assert [ring.get(key) for key in KEYS] == [again.get(key) for key in KEYS]
+
+
+def test_keys_spread_over_every_node():
+    ring = HashRing(range(4))
+    owners = [ring.get(key) for key in KEYS]
+    for node in range(4):
+        assert owners.count(node) > len(KEYS) / 8
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(range(4))
+    before = {key: ring.get(key) for key in KEYS}
+    ring.remove(2)
+    assert len(ring) == 3
+    for key, owner in before.items():
+        if owner != 2:
+            assert ring.get(key) == owner
+        else:
+            assert ring.get(key) != 2
+
+
+def test_adding_a_node_back_restores_ownership():
+    ring = HashRing(range(4))
+    before = {key: ring.get(key) for key in KEYS}
+    ring.remove(1)
+    ring.add(1)
+    assert {key: ring.get(key) for key in KEYS} == before
+
+
+def test_empty_ring():
+    with pytest.raises(LookupError):
+        HashRing().get("255700000001")
+
+
+def fake_session():
+    # runs in the worker process
+    from tests.fake import FakeDriver, FakeWhatsAppWeb
+
+    return FakeDriver(FakeWhatsAppWeb.with_chats(20, page_load=0.01, navigation=0.005, delivery=0.01))
+
+
+def slow_session():
+    from tests.fake import FakeDriver, FakeWhatsAppWeb
+
+    return FakeDriver(FakeWhatsAppWeb.with_chats(20, page_load=0.3, navigation=0.005, delivery=0.01))
+
+
+def broken_session():
+    raise RuntimeError("chrome did not start")
+
+
+def test_pool_sends_through_every_session():
+    with WhatsAppPool([fake_session, fake_session], timeout=5) as pool:
+        numbers = [f"2557{i:08d}" for i in range(12)]
+        assert {pool.session_for(number) for number in numbers} == {0, 1}
+        # one number per session, each session paces its own sends
+        first = {pool.session_for(number): number for number in numbers}
+        assert pool.send_many(first.values(), "hello") == [(number, "1 ") for number in first.values()]
+        lookups = [pool.submit(number, "find_user", number) for number in numbers]
+        assert [future.result(timeout=30) for future in lookups] == [True] * len(numbers)
+        found = pool.broadcast("find_user", "255700000003")
+        assert found == {0: True, 1: True}
+
+
+def test_dead_session_tasks_move_to_the_new_owner():
+    with WhatsAppPool([slow_session, slow_session, slow_session], timeout=5) as pool:
+        numbers = [f"2557{i:08d}" for i in range(9)]
+        victim = pool.session_for(numbers[0])
+        futures = [pool.submit(number, "find_user", number) for number in numbers]
+        pinned = pool._submit(victim, None, "find_user", ("255700000003",), {})
+        pool._processes[victim].kill()
+        assert [future.result(timeout=60) for future in futures] == [True] * len(numbers)
+        # a task meant for that session only is not re-run elsewhere
+        with pytest.raises(RuntimeError, match=f"Session {victim} died"):
+            pinned.result(timeout=30)
+        assert victim not in pool.sessions
+        assert pool.session_for(numbers[0]) != victim
+
+
+def test_session_that_cannot_start_reports_why():
+    with WhatsAppPool([fake_session, broken_session], timeout=5) as pool:
+        pinned = pool._submit(1, None, "find_user", ("255700000003",), {})
+        with pytest.raises(RuntimeError, match="could not start: RuntimeError\\('chrome did not start'\\)"):
+            pinned.result(timeout=60)
+        assert pool.sessions == [0]
+        assert pool.send_message("255700000004", "hello").result(timeout=30) == "1 "
@@ -0,0 +1,90 @@
+import os
+import socket
+import threading
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.remote.command import Command
+
+from alright.pacing import NoPacer
+from alright.session import QR_CODE, READY, Session, profile_dir, release_stale_lock, wait_until_ready
+from tests.fake import FakeDriver, FakeWhatsAppWeb
+
+
+def exited_pid() -> int:
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def test_profile_dir_is_per_account(tmp_path):
+    shop = profile_dir("shop 1/../x", tmp_path)
+    assert shop == tmp_path / "shop_1_.._x" and shop.is_dir()
+    assert profile_dir("shop 1/../x", tmp_path) == shop
+    with pytest.raises(ValueError):
+        profile_dir("", tmp_path)
+
+
+def test_stale_lock_is_released_live_one_kept(tmp_path):
+    dead = exited_pid()
+    os.symlink(f"{socket.gethostname()}-{dead}", tmp_path / "SingletonLock")
+    (tmp_path / "SingletonCookie").write_text("")
+    assert release_stale_lock(tmp_path)
+    assert not os.path.lexists(tmp_path / "SingletonLock")
+    assert not (tmp_path / "SingletonCookie").exists()
+
+    os.symlink(f"{socket.gethostname()}-{os.getpid()}", tmp_path / "SingletonLock")
+    assert not release_stale_lock(tmp_path)
+    assert os.path.lexists(tmp_path / "SingletonLock")
+    assert not release_stale_lock(tmp_path / "no profile here")
+
+
+def test_ready_once_the_chat_list_renders(web, driver):
+    driver.get("https://web.whatsapp.com/")
+    result = wait_until_ready(driver, timeout=5, poll=0.001)
+    assert result["state"] == READY and result["rows"] > 0
+    assert result["probes"] > 1
+
+
+def test_qr_code(tmp_path):
+    web = FakeWhatsAppWeb.with_chats(5, page_load=0.01, logged_in=False)
+    driver = FakeDriver(web)
+    driver.get("https://web.whatsapp.com/")
+    with pytest.raises(TimeoutException, match="state: qr"):
+        wait_until_ready(driver, timeout=0.1)
+    assert wait_until_ready(driver, timeout=1, accept_qr=True)["state"] == QR_CODE
+
+
+def test_session_waits_for_the_scan_on_a_new_profile(tmp_path):
+    web = FakeWhatsAppWeb.with_chats(5, page_load=0.01, logged_in=False)
+    built = []
+
+    def factory(account, root):
+        built.append((account, root, FakeDriver(web)))
+        return built[-1][2]
+
+    threading.Timer(0.2, web.scan).start()
+    session = Session("shop", root=tmp_path, driver_factory=factory, timeout=1, qr_timeout=5,
+                      pacer=NoPacer())
+    with session as messenger:
+        assert session.needed_qr and session.time_to_ready >= 0.2
+        assert [(account, root) for account, root, _ in built] == [("shop", tmp_path)]
+        assert messenger.readiness["state"] == READY
+        assert isinstance(messenger.pacer, NoPacer)
+    assert built[0][2].commands[Command.QUIT] == 1
+
+
+def test_session_quits_the_driver_when_startup_fails(tmp_path):
+    web = FakeWhatsAppWeb.with_chats(5, page_load=10)
+    drivers = []
+
+    def factory(account, root):
+        drivers.append(FakeDriver(web))
+        return drivers[-1]
+
+    session = Session("shop", root=tmp_path, driver_factory=factory, timeout=0.1)
+    with pytest.raises(TimeoutException):
+        session.start()
+    assert drivers[0].commands[Command.QUIT] == 1
@@ -0,0 +1,45 @@
+import json
+import logging
+
+from alright import WhatsApp
+from alright.pacing import NoPacer
+from alright.summary import ChatSnapshot, ChatSummary
+
+
+def chat(row_id, unread=0, message="hi"):
+    return ChatSummary(sender=row_id.title(), time="12:00", message=message, unread=bool(unread),
+                       no_of_unread=unread, group=row_id == "team", row_id=row_id)
+
+
+def test_chat_list_is_plain_dicts_by_default(whatsapp):
+    chats = whatsapp.get_list_of_messages()
+    assert all(type(row) is dict for row in chats)
+    json.dumps(chats)
+    chats[0]["note"] = "callers may annotate the rows"
+
+
+def test_records_when_asked(web, driver):
+    messenger = WhatsApp(driver, timeout=5, pacer=NoPacer(), logger=logging.getLogger("alright.tests"),
+                         chats_as_dicts=False)
+    messenger.login(wait=True)
+    chats = messenger.get_list_of_messages()
+    assert all(isinstance(row, ChatSummary) for row in chats)
+    assert chats[0]["sender"] == chats[0].sender == web.chats[0].name
+    assert chats[0].to_dict()["sender"] == chats[0].get("sender")
+    assert "row_id" in chats[0] and "note" not in chats[0]
+
+
+def test_snapshot_round_trip_and_diff():
+    before = ChatSnapshot([chat("alice"), chat("bob", unread=2), chat("team")], taken_at=1)
+    after = ChatSnapshot([chat("bob", unread=5, message="later"), chat("team"), {**chat("carol").to_dict()}])
+    assert list(before)[1] == chat("bob", unread=2)
+    assert after.total_unread() == 5 and after.unread_ids() == ["bob"]
+    assert after.diff(before) == {
+        "added": ["carol"], "removed": ["alice"], "unread": {"bob": 3}, "updated": ["bob"],
+    }
+
+
+def test_snapshot_of_the_whole_list(web, whatsapp):
+    snapshot = whatsapp.snapshot_chats()
+    assert len(snapshot) == len(web.chats)
+    assert snapshot.total_unread() == sum(chat.unread for chat in web.chats)
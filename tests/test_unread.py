@@ -0,0 +1,39 @@
+import pytest
+
+from tests.fake import FakeWhatsAppWeb
+
+
+@pytest.fixture
+def web():
+    return FakeWhatsAppWeb.with_chats(300, page_load=0.01, navigation=0.005)
+
+
+def unread_names(web):
+    return [chat.name for chat in web.chats if chat.unread]
+
+
+def test_every_unread_chat_once(web, whatsapp):
+    chats = whatsapp.fetch_all_unread_chats(limit=False)
+    assert [chat["sender"] for chat in chats] == unread_names(web)
+
+
+def test_scan_costs_a_few_commands_per_page(web, driver, whatsapp):
+    driver.reset_counters()
+    list(whatsapp.iter_unread_chats())
+    # 300 rows of 72px in a 720px pane: 30 pages, each scrolled, waited for and read once
+    assert sum(driver.commands.values()) == 3 * 30
+
+
+def test_limit_counts_scanned_chats(web, whatsapp):
+    chats = whatsapp.fetch_all_unread_chats(limit=True, top=50)
+    assert [chat["sender"] for chat in chats] == [c.name for c in web.chats[:50] if c.unread]
+
+
+def test_resume_from_the_scroll_position(web, whatsapp):
+    scan = whatsapp.iter_unread_chats()
+    first = [next(scan) for _ in range(20)]
+    scan.close()
+    resumed = whatsapp.iter_unread_chats(start=first[-1]["scroll_top"])
+    names = [chat["sender"] for chat in first]
+    names += [chat["sender"] for chat in resumed if chat["sender"] not in names]
+    assert names == unread_names(web)
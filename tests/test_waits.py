@@ -0,0 +1,27 @@
+import pytest
+
+from alright import WhatsApp
+from alright.locators import SelectorNotFound
+from alright.waits import BUDGETS, scaled_budgets
+
+
+def test_default_timeout_keeps_the_budgets():
+    assert scaled_budgets(BUDGETS["default"]) == {**BUDGETS, "page_load": BUDGETS["default"]}
+
+
+def test_session_timeout_governs_every_budget(driver):
+    waits = WhatsApp(driver, timeout=12).waits
+    assert waits.budget("page_load") == 12
+    assert waits.budget("lookup") == pytest.approx(2)
+    assert waits.budget("chat_open") == pytest.approx(3)
+    assert waits.budget("upload") == pytest.approx(60)
+    assert waits.budget("unknown") == 12
+    assert all(waits.budget(operation) < BUDGETS[operation] for operation in BUDGETS)
+
+
+def test_selector_lookups_follow_the_lookup_budget(driver):
+    messenger = WhatsApp(driver, timeout=12)
+    assert messenger.selectors.budget == pytest.approx(2)
+    messenger.waits.budgets["lookup"] = 0.05
+    with pytest.raises(SelectorNotFound, match="within 0.05s"):
+        messenger.selectors.find("media_send_button")